@@ -0,0 +1,13 @@
+"""Make the repository's shared `botcommon` package importable.
+
+The bot runs from its own directory (python daemon.py, pytest), so the
+repository root is not on sys.path by default. It is appended, so modules
+of the bot itself still win.
+"""
+
+import sys
+from pathlib import Path
+
+_ROOT = str(Path(__file__).resolve().parent.parent)
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
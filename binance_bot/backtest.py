@@ -0,0 +1,427 @@
+"""Vectorized backtest of strategy.decide_signal with TP/SL/HOLD_SECONDS exits.
+
+Replays closed candles: the signal is evaluated once per candle at its close
+(the value the daemon sees on its last poll before the close), with indicators
+over the full history like the daemon's streaming IndicatorSet. Entry is at
+that close.
+
+Exits:
+- OCO mode (hold_seconds=None, the live default): take profit / stop loss are
+  resting orders, hit on the candle's high/low and filled at their price.
+- No-OCO mode (hold_seconds set, TESTNET_NO_OCO): TP/SL are checked against
+  the close (like the exit loop's last_close); otherwise the position is
+  sold at the close of the first candle ending at or after entry + hold.
+If TP and SL are both reachable inside one candle, the stop is assumed first.
+
+Position limits follow the daemon's entry gates (from_env):
+- OCO mode: positions may overlap. A new entry is skipped once today's
+  (UTC) entries would exceed DAILY_QUOTE_CAP.
+- No-OCO mode: at most MAX_OPEN_POSITIONS open at once (0: no limit).
+The daemon applies both limits across all its symbols, while a backtest sees
+one symbol, so multi-symbol runs are more permissive here than live. The
+StrategyParams defaults (one position at a time, no cap) are the
+conservative single-position policy.
+
+Entries, scores and exit searches are array operations; Python only loops
+over the entry candidates to apply the position limits.
+
+Usage:
+  python backtest.py BTCUSDT 15m 30     # symbol, interval, days (params from .env)
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+
+import indicators_np as inp
+from kline_store import KLINE_DTYPE, MAX_PAGE, interval_ms
+
+REASONS = ("tp_hit", "sl_hit", "hold_expired", "end_of_data")
+_TP, _SL, _HOLD, _END = range(4)
+
+TRADE_DTYPE = np.dtype(
+    [
+        ("entry_idx", "<i8"),
+        ("exit_idx", "<i8"),
+        ("entry_time", "<i8"),
+        ("exit_time", "<i8"),
+        ("entry_price", "<f8"),
+        ("exit_price", "<f8"),
+        ("reason", "<i1"),
+        ("pnl", "<f8"),
+    ]
+)
+
+BLOG_WINDOW_MS = 7 * 86_400_000  # daemon.blog_scores: bullish posts of the last 7 days
+
+# Exit search: candidates per batch, and the first look-ahead width (doubles while unresolved).
+_ROW_BATCH = 8192
+_FIRST_WIDTH = 16
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    ema_fast: int = 9
+    ema_slow: int = 21
+    rsi_period: int = 14
+    min_score: float = 0.7
+    tp_pct: float = 0.006
+    sl_pct: float = 0.004
+    hold_seconds: Optional[int] = None  # None: OCO exits (no time limit)
+    quote: float = 1.0
+    fee_rate: float = 0.001
+    max_open_positions: Optional[int] = 1  # None: no limit on overlapping positions
+    daily_cap: Optional[float] = None  # quote entered per UTC day; None: no cap
+
+    @classmethod
+    def from_env(cls) -> "StrategyParams":
+        """Same env knobs (and defaults) as daemon.main."""
+        no_oco = (os.getenv("TESTNET_NO_OCO") or "").strip().lower() in ("1", "true", "yes", "y", "on")
+        hold = max(5, min(int(os.getenv("HOLD_SECONDS") or "60"), 3600)) if no_oco else None
+        max_open = max(0, min(int(os.getenv("MAX_OPEN_POSITIONS") or "1"), 100))
+        return cls(
+            ema_fast=int(os.getenv("EMA_FAST") or "9"),
+            ema_slow=int(os.getenv("EMA_SLOW") or "21"),
+            rsi_period=int(os.getenv("RSI_PERIOD") or "14"),
+            min_score=float(os.getenv("MIN_SIGNAL_SCORE") or "0.7"),
+            tp_pct=float(os.getenv("TAKE_PROFIT_PCT") or "0.006"),
+            sl_pct=float(os.getenv("STOP_LOSS_PCT") or "0.004"),
+            hold_seconds=hold,
+            quote=float(os.getenv("MAX_QUOTE_PER_TRADE") or "1.0"),
+            fee_rate=float(os.getenv("BACKTEST_FEE_RATE") or "0.001"),
+            # The daemon gates OCO entries on the daily cap, no-OCO entries on open positions.
+            max_open_positions=(max_open or None) if no_oco else None,
+            daily_cap=None if no_oco else float(os.getenv("DAILY_QUOTE_CAP") or "5.0"),
+        )
+
+
+@dataclass(frozen=True)
+class BacktestResult:
+    params: StrategyParams
+    trades: np.ndarray  # TRADE_DTYPE
+    n_candles: int
+    n_signals: int
+
+    @property
+    def n_trades(self) -> int:
+        return int(len(self.trades))
+
+    @property
+    def pnl(self) -> float:
+        return float(self.trades["pnl"].sum())
+
+    @property
+    def hit_rate(self) -> float:
+        return float((self.trades["pnl"] > 0).mean()) if len(self.trades) else 0.0
+
+    @property
+    def max_drawdown(self) -> float:
+        """Largest peak-to-trough drop of cumulative PnL (quote units, >= 0), in exit order."""
+        if not len(self.trades):
+            return 0.0
+        pnl = self.trades["pnl"][np.argsort(self.trades["exit_idx"], kind="stable")]
+        equity = np.concatenate([[0.0], np.cumsum(pnl)])
+        return float((np.maximum.accumulate(equity) - equity).max())
+
+    def summary(self) -> dict:
+        reasons = np.bincount(self.trades["reason"], minlength=len(REASONS)) if len(self.trades) else [0] * len(REASONS)
+        return {
+            "candles": self.n_candles,
+            "signals": self.n_signals,
+            "trades": self.n_trades,
+            "hit_rate": self.hit_rate,
+            "pnl": self.pnl,
+            "pnl_pct_of_quote": self.pnl / self.params.quote if self.params.quote else 0.0,
+            "max_drawdown": self.max_drawdown,
+            "avg_hold_candles": float((self.trades["exit_idx"] - self.trades["entry_idx"]).mean()) if len(self.trades) else 0.0,
+            **{r: int(c) for r, c in zip(REASONS, reasons)},
+        }
+
+
+# ---- data ----
+
+
+def klines_array(rows: list) -> np.ndarray:
+    """REST /api/v3/klines rows -> KLINE_DTYPE array (sorted, duplicates dropped)."""
+    out = np.zeros(len(rows), dtype=KLINE_DTYPE)
+    if not rows:
+        return out
+    out["open_time"] = [int(r[0]) for r in rows]
+    out["open"] = [float(r[1]) for r in rows]
+    out["high"] = [float(r[2]) for r in rows]
+    out["low"] = [float(r[3]) for r in rows]
+    out["close"] = [float(r[4]) for r in rows]
+    out["volume"] = [float(r[5]) for r in rows]
+    out["close_time"] = [int(r[6]) for r in rows]
+    out["quote_volume"] = [float(r[7]) if len(r) > 7 else 0.0 for r in rows]
+    _, first = np.unique(out["open_time"], return_index=True)
+    return out[first]
+
+
+def fetch_history(api, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None) -> np.ndarray:
+    """Closed candles in [start_ms, end_ms), paged through REST."""
+    end = int(end_ms if end_ms is not None else time.time() * 1000)
+    step = interval_ms(interval)
+    rows: list = []
+    start = int(start_ms)
+    while start < end:
+        page = api.klines(symbol, interval, limit=MAX_PAGE, start_time=start)
+        if not page:
+            break
+        rows.extend(r for r in page if int(r[6]) < end)
+        if len(page) < MAX_PAGE:
+            break
+        start = int(page[-1][0]) + step
+    return klines_array(rows)
+
+
+def rolling_blog_scores(
+    times_ms: np.ndarray,
+    event_ms: np.ndarray,
+    ma_flags: np.ndarray,
+    rsi_flags: np.ndarray,
+    window_ms: int = BLOG_WINDOW_MS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(blog_ma_score, blog_rsi_score) as seen at each time: counts of tagged
+    bullish posts in the trailing window, like daemon.blog_scores."""
+    order = np.argsort(event_ms, kind="stable")
+    ev = np.asarray(event_ms, dtype=np.int64)[order]
+    cum_ma = np.concatenate([[0.0], np.cumsum(np.asarray(ma_flags, dtype=np.float64)[order])])
+    cum_rsi = np.concatenate([[0.0], np.cumsum(np.asarray(rsi_flags, dtype=np.float64)[order])])
+    t = np.asarray(times_ms, dtype=np.int64)
+    hi = np.searchsorted(ev, t, side="right")
+    lo = np.searchsorted(ev, t - window_ms, side="left")
+    return cum_ma[hi] - cum_ma[lo], cum_rsi[hi] - cum_rsi[lo]
+
+
+def load_blog_events(conn, start_ms: int, end_ms: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bullish content_signal rows (ms, has MA tag, has RSI tag) for rolling_blog_scores."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT (extract(epoch FROM created_at) * 1000)::bigint,
+                   COALESCE(tags @> ARRAY['移動平均'], false),
+                   COALESCE(tags @> ARRAY['RSI'], false)
+            FROM content_signal
+            WHERE label='bullish'
+              AND created_at >= to_timestamp(%s / 1000.0)
+              AND created_at <  to_timestamp(%s / 1000.0)
+            """,
+            (int(start_ms) - BLOG_WINDOW_MS, int(end_ms)),
+        )
+        rows = cur.fetchall() or []
+    if not rows:
+        return np.zeros(0, np.int64), np.zeros(0, bool), np.zeros(0, bool)
+    ms, ma, rs = zip(*rows)
+    return np.array(ms, np.int64), np.array(ma, bool), np.array(rs, bool)
+
+
+# ---- signals ----
+
+
+def indicator_arrays(closes: np.ndarray, ema_fast: int, ema_slow: int, rsi_period: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return inp.ema(closes, ema_fast), inp.ema(closes, ema_slow), inp.rsi(closes, rsi_period)
+
+
+def signal_scores(ef, es, rv, blog_ma_score, blog_rsi_score) -> tuple[np.ndarray, np.ndarray]:
+    """(has_kind, score) per candle, term for term as decide_signal (without always_buy)."""
+    ma = np.broadcast_to(np.asarray(blog_ma_score, dtype=np.float64), np.shape(ef))
+    rs = np.broadcast_to(np.asarray(blog_rsi_score, dtype=np.float64), np.shape(ef))
+    total = np.maximum(1e-9, ma + rs)
+    w_ma = ma / total
+    w_rsi = rs / total
+    valid = ~(np.isnan(ef) | np.isnan(es) | np.isnan(rv))
+    with np.errstate(invalid="ignore"):
+        cross = valid & (ef > es)
+        dip = valid & (rv < 30)
+    score = np.where(cross, 0.6 * w_ma, 0.0)
+    score = score + np.where(dip, 0.6 * w_rsi, 0.0)
+    score = score + np.where(cross & dip, 0.4, 0.0)
+    return cross | dip, score
+
+
+def entry_mask(ef, es, rv, blog_ma_score, blog_rsi_score, min_score: float) -> np.ndarray:
+    has_kind, score = signal_scores(ef, es, rv, blog_ma_score, blog_rsi_score)
+    return has_kind & (score >= min_score)
+
+
+# ---- exits ----
+
+
+def _first_exits(
+    entries: np.ndarray,
+    tp: np.ndarray,
+    sl: np.ndarray,
+    hit_high: np.ndarray,
+    hit_low: np.ndarray,
+    limit: Optional[np.ndarray],
+) -> tuple[np.ndarray, np.ndarray]:
+    """(exit_idx, reason) of the first candle after each entry that hits SL/TP or the time limit.
+
+    Looks ahead in widening windows for all still-open candidates at once.
+    """
+    n = len(hit_high)
+    exit_idx = np.full(len(entries), n - 1, dtype=np.int64)
+    reason = np.full(len(entries), _END, dtype=np.int8)
+    pending = np.arange(len(entries))
+    offset, width = 1, _FIRST_WIDTH
+    while len(pending) and offset < n:
+        e = entries[pending]
+        idx = e[:, None] + offset + np.arange(width)
+        inside = idx < n
+        idx = np.minimum(idx, n - 1)
+        hit_sl = inside & (hit_low[idx] <= sl[pending, None])
+        hit_tp = inside & (hit_high[idx] >= tp[pending, None])
+        hit_time = inside & (idx >= limit[pending, None]) if limit is not None else np.zeros_like(inside)
+        hit = hit_sl | hit_tp | hit_time
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        rows = np.arange(len(pending))
+        r = np.where(hit_sl[rows, first], _SL, np.where(hit_tp[rows, first], _TP, _HOLD)).astype(np.int8)
+        done = pending[found]
+        exit_idx[done] = idx[rows, first][found]
+        reason[done] = r[found]
+        pending = pending[~found & (e + offset + width < n)]
+        offset += width
+        width *= 2
+    return exit_idx, reason
+
+
+def _apply_limits(cand: np.ndarray, exit_idx: np.ndarray, close_time: np.ndarray, params: StrategyParams) -> list[int]:
+    """Indexes into `cand` of the entries the daemon's limits let through.
+
+    A position exiting on candle j is closed by j's close, so an entry on j may take its slot.
+    """
+    taken: list[int] = []
+    open_exits: list[int] = []  # heap of exit candles of open positions
+    spent: dict[int, float] = {}
+    for k, i in enumerate(cand.tolist()):
+        while open_exits and open_exits[0] <= i:
+            heapq.heappop(open_exits)
+        if params.max_open_positions is not None and len(open_exits) >= params.max_open_positions:
+            continue
+        day = int(close_time[i]) // 86_400_000
+        if params.daily_cap is not None and spent.get(day, 0.0) + params.quote > params.daily_cap + 1e-12:
+            continue
+        spent[day] = spent.get(day, 0.0) + params.quote
+        heapq.heappush(open_exits, int(exit_idx[k]))
+        taken.append(k)
+    return taken
+
+
+def simulate(
+    klines: np.ndarray,
+    params: StrategyParams,
+    *,
+    blog_ma_score=1.0,
+    blog_rsi_score=1.0,
+    indicators: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+) -> BacktestResult:
+    """Replay one symbol's closed candles (KLINE_DTYPE array, or a mapping with its
+    close/high/low/close_time fields; oldest first).
+
+    blog_*_score: constants or arrays aligned with the candles (rolling_blog_scores).
+    indicators: precomputed (ema_fast, ema_slow, rsi) series, e.g. shared by a sweep.
+    """
+    close = np.ascontiguousarray(klines["close"], dtype=np.float64)
+    n = len(close)
+    if indicators is None:
+        indicators = indicator_arrays(close, params.ema_fast, params.ema_slow, params.rsi_period)
+    mask = entry_mask(*indicators, blog_ma_score, blog_rsi_score, params.min_score)
+    mask[-1:] = False  # nothing left to exit into
+    cand = np.flatnonzero(mask)
+
+    close_time = np.asarray(klines["close_time"], dtype=np.int64)
+    if params.hold_seconds is None:
+        hit_high, hit_low = np.asarray(klines["high"], np.float64), np.asarray(klines["low"], np.float64)
+    else:
+        hit_high = hit_low = close  # exit loop compares the last close
+
+    trades = np.zeros(0, dtype=TRADE_DTYPE)
+    if len(cand):
+        entry_price = close[cand]
+        tp = entry_price * (1.0 + params.tp_pct)
+        sl = entry_price * (1.0 - params.sl_pct)
+        limit = None
+        if params.hold_seconds is not None:
+            limit = np.searchsorted(close_time, close_time[cand] + int(params.hold_seconds) * 1000, side="left")
+        exit_idx = np.empty(len(cand), np.int64)
+        reason = np.empty(len(cand), np.int8)
+        for b in range(0, len(cand), _ROW_BATCH):
+            s = slice(b, b + _ROW_BATCH)
+            exit_idx[s], reason[s] = _first_exits(
+                cand[s], tp[s], sl[s], hit_high, hit_low, None if limit is None else limit[s]
+            )
+
+        taken = np.array(_apply_limits(cand, exit_idx, close_time, params), dtype=np.int64)
+
+        trades = np.zeros(len(taken), dtype=TRADE_DTYPE)
+        ei, xi, rs = cand[taken], exit_idx[taken], reason[taken]
+        trades["entry_idx"] = ei
+        trades["exit_idx"] = xi
+        trades["entry_time"] = close_time[ei]
+        trades["exit_time"] = close_time[xi]
+        trades["entry_price"] = close[ei]
+        if params.hold_seconds is None:
+            px = np.where(rs == _TP, tp[taken], np.where(rs == _SL, sl[taken], close[xi]))
+        else:
+            px = close[xi]
+        trades["exit_price"] = px
+        trades["reason"] = rs
+        keep = 1.0 - params.fee_rate
+        trades["pnl"] = params.quote * (px / close[ei] * keep * keep - 1.0)
+
+    return BacktestResult(params=params, trades=trades, n_candles=n, n_signals=int(mask.sum()))
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from binance_api import BinanceApi
+
+    load_dotenv(dotenv_path=".env", override=False)
+    symbol = (sys.argv[1] if len(sys.argv) > 1 else "BTCUSDT").upper()
+    interval = sys.argv[2] if len(sys.argv) > 2 else (os.getenv("INTERVAL") or "15m").strip()
+    days = float(sys.argv[3]) if len(sys.argv) > 3 else 30.0
+
+    api = BinanceApi(
+        os.getenv("BINANCE_API_KEY") or "",
+        os.getenv("BINANCE_API_SECRET") or "",
+        base_url=os.getenv("BINANCE_BASE_URL") or "https://api.binance.com",
+    )
+    end = int(time.time() * 1000)
+    start = end - int(days * 86_400_000)
+    kl = fetch_history(api, symbol, interval, start, end)
+    if not len(kl):
+        raise RuntimeError(f"no klines for {symbol} {interval}")
+
+    params = StrategyParams.from_env()
+    if os.getenv("DATABASE_URL"):
+        from db import connect
+
+        with connect() as conn:
+            ev, ma, rs = load_blog_events(conn, start, end)
+        blog_ma, blog_rsi = rolling_blog_scores(kl["close_time"], ev, ma, rs)
+    else:
+        blog_ma = float(os.getenv("BACKTEST_BLOG_MA_SCORE") or "1.0")
+        blog_rsi = float(os.getenv("BACKTEST_BLOG_RSI_SCORE") or "1.0")
+
+    t0 = time.perf_counter()
+    res = simulate(kl, params, blog_ma_score=blog_ma, blog_rsi_score=blog_rsi)
+    dt = time.perf_counter() - t0
+
+    print(f"{symbol} {interval} {days:g}d  params={asdict(params)}")
+    for k, v in res.summary().items():
+        print(f"  {k:18s} {v:.6g}" if isinstance(v, float) else f"  {k:18s} {v}")
+    print(f"  simulate           {dt * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: vectorized indicator series vs. the pure-Python streaming loop.
+
+Usage:
+  python bench_indicators.py            # 1M candles
+  python bench_indicators.py 200000 8   # candles, symbols for the 2-D case
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+
+import indicators_np as inp
+from indicators import EmaState, RsiState
+
+
+def _timed(fn, repeat: int = 3):
+    """Best-of-`repeat` wall time (shared hosts are noisy)."""
+    best = None
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return out, best
+
+
+def _python_series(xs: list[float]) -> tuple[list, list]:
+    e, r = EmaState(21), RsiState(14)
+    es, rs = [], []
+    for x in xs:
+        es.append(e.update(x))
+        rs.append(r.update(x))
+    return es, rs
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    symbols = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    rng = np.random.default_rng(0)
+    closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    xs = closes.tolist()
+
+    (py_ema, py_rsi), t_py = _timed(lambda: _python_series(xs))
+    (np_ema, np_rsi), t_np = _timed(lambda: (inp.ema(closes, 21), inp.rsi(closes, 14)))
+
+    err_ema = float(np.nanmax(np.abs(np_ema[20:] - np.array(py_ema[20:], dtype=float)) / closes[20:]))
+    err_rsi = float(np.nanmax(np.abs(np_rsi[14:] - np.array(py_rsi[14:], dtype=float))))
+
+    print(f"candles={n}")
+    print(f"python loop  EMA21+RSI14: {t_py:8.3f}s")
+    print(f"numpy        EMA21+RSI14: {t_np:8.3f}s  speedup x{t_py / t_np:.1f}")
+    print(f"max rel err EMA={err_ema:.2e}  max abs err RSI={err_rsi:.2e}")
+
+    m = max(1, n // symbols)
+    panel = closes[: m * symbols].reshape(symbols, m)
+    _, t_2d = _timed(lambda: (inp.ema(panel, 21), inp.rsi(panel, 14), inp.macd(panel), inp.bollinger(panel)))
+    print(f"numpy 2-D {symbols}x{m} EMA+RSI+MACD+BB: {t_2d:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
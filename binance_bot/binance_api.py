@@ -3,90 +3,329 @@ from __future__ import annotations
 import hashlib
 import hmac
 import os
+import threading
 import time
+from typing import Optional
 from urllib.parse import urlencode
 
 import requests
 
 
+class ClockSync:
+    """Cached local/server clock offset for signed requests.
+
+    The offset is measured with the RTT midpoint of /api/v3/time (best of a few
+    samples) and refreshed off the order path via `maybe_resync()`, so signing
+    never needs an extra round trip. `error_ms` (half the best RTT) bounds how
+    far the stamped timestamp can be from server time; use it to tune recvWindow.
+    """
+
+    def __init__(self, fetch_server_time, *, resync_seconds: float = 300.0, samples: int = 3):
+        self._fetch = fetch_server_time
+        self.resync_seconds = resync_seconds
+        self.samples = max(1, samples)
+        self.offset_ms = 0.0
+        self.error_ms: float | None = None
+        self.synced_at = 0.0
+
+    def sync(self) -> None:
+        best_rtt = None
+        best_offset = 0.0
+        for _ in range(self.samples):
+            t0 = time.time() * 1000.0
+            server_ms = self._fetch()
+            t1 = time.time() * 1000.0
+            rtt = t1 - t0
+            if best_rtt is None or rtt < best_rtt:
+                best_rtt = rtt
+                best_offset = server_ms - (t0 + t1) / 2.0
+        self.offset_ms = best_offset
+        self.error_ms = (best_rtt or 0.0) / 2.0
+        self.synced_at = time.time()
+
+    def is_stale(self) -> bool:
+        return self.error_ms is None or (time.time() - self.synced_at) > self.resync_seconds
+
+    def maybe_resync(self) -> bool:
+        """Resync if the cached offset is older than resync_seconds. Call between orders."""
+        if not self.is_stale():
+            return False
+        self.sync()
+        return True
+
+    def now_ms(self) -> int:
+        if self.error_ms is None:
+            self.sync()
+        return int(time.time() * 1000.0 + self.offset_ms)
+
+
+# Request priorities for the weight governor (lower value = more important).
+PRIORITY_HIGH = 0  # protective orders: exit sells, OCO
+PRIORITY_NORMAL = 1  # entries, signal inputs
+PRIORITY_LOW = 2  # indicator refresh, balance snapshot: dropped first
+
+
+class RateLimitedError(RuntimeError):
+    """Raised when the governor drops a call instead of spending weight on it."""
+
+
+class WeightGovernor:
+    """Per-minute request-weight budget fed by Binance usage headers.
+
+    - X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-10S replace the local estimate
+      after every response (the server is authoritative).
+    - Each priority may only use a share of the budget, so low-priority calls
+      run out first and exits keep headroom.
+    - 429/418 responses block every call site until Retry-After has passed.
+    - A call that would have to wait longer than its priority allows is
+      dropped with RateLimitedError (LOW never waits).
+    """
+
+    SHARES = {PRIORITY_HIGH: 1.0, PRIORITY_NORMAL: 0.85, PRIORITY_LOW: 0.6}
+    MAX_WAIT_SECONDS = {PRIORITY_HIGH: 60.0, PRIORITY_NORMAL: 5.0, PRIORITY_LOW: 0.0}
+
+    def __init__(self, *, weight_limit: int = 6000, order_limit_10s: int = 100, now=None):
+        self.weight_limit = int(weight_limit)
+        self.order_limit_10s = int(order_limit_10s)
+        self._now = now or time.time
+        self._lock = threading.Lock()
+        self._minute = -1
+        self._window_10s = -1
+        self.used_weight = 0
+        self.order_count_10s = 0
+        self.blocked_until = 0.0
+        self.dropped = 0
+
+    def _roll(self, now: float) -> None:
+        minute = int(now // 60)
+        if minute != self._minute:
+            self._minute = minute
+            self.used_weight = 0
+        window = int(now // 10)
+        if window != self._window_10s:
+            self._window_10s = window
+            self.order_count_10s = 0
+
+    def try_acquire(self, weight: int, priority: int = PRIORITY_NORMAL, *, orders: int = 0) -> float:
+        """Reserve budget and return 0, or return how long to wait before retrying.
+
+        Raises RateLimitedError when the wait exceeds what the priority allows.
+        """
+        with self._lock:
+            now = self._now()
+            wait = 0.0
+            reason = ""
+            if now < self.blocked_until:
+                wait = self.blocked_until - now
+                reason = "retry-after"
+            else:
+                self._roll(now)
+                cap = self.weight_limit * self.SHARES.get(priority, 1.0)
+                if self.used_weight + weight > cap:
+                    wait = 60.0 - (now % 60.0)
+                    reason = f"weight budget {self.used_weight}/{int(cap)}"
+                elif orders and self.order_count_10s + orders > self.order_limit_10s:
+                    wait = 10.0 - (now % 10.0)
+                    reason = f"order budget {self.order_count_10s}/{self.order_limit_10s}"
+            if wait <= 0:
+                self.used_weight += weight
+                self.order_count_10s += orders
+                return 0.0
+            if wait > self.MAX_WAIT_SECONDS.get(priority, 0.0):
+                self.dropped += 1
+                raise RateLimitedError(f"rate limited ({reason}), retry in {wait:.1f}s")
+            return wait
+
+    def acquire(self, weight: int, priority: int = PRIORITY_NORMAL, *, orders: int = 0) -> None:
+        while True:
+            wait = self.try_acquire(weight, priority, orders=orders)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def observe(self, status_code: int, headers) -> None:
+        with self._lock:
+            now = self._now()
+            self._roll(now)
+            used = headers.get("X-MBX-USED-WEIGHT-1M")
+            if used is not None:
+                self.used_weight = int(used)
+            orders = headers.get("X-MBX-ORDER-COUNT-10S")
+            if orders is not None:
+                self.order_count_10s = int(orders)
+            if status_code in (418, 429):
+                try:
+                    retry_after = float(headers.get("Retry-After") or 60)
+                except ValueError:
+                    retry_after = 60.0
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
 class BinanceApi:
-    def __init__(self, api_key: str, api_secret: str, base_url: str = "https://api.binance.com"):
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: str = "https://api.binance.com",
+        *,
+        recv_window: int = 5000,
+        clock_resync_seconds: float = 300.0,
+        weight_limit: int = 6000,
+        order_limit_10s: int = 100,
+    ):
         self.api_key = api_key
         self.api_secret = api_secret.encode("utf-8")
         self.base_url = base_url.rstrip("/")
+        self.recv_window = int(recv_window)
         self.session = requests.Session()
         self.session.headers.update({"X-MBX-APIKEY": api_key})
+        self.clock = ClockSync(self.server_time, resync_seconds=clock_resync_seconds)
+        # Budget windows follow server time (clock offset is 0 until the first sync).
+        self.governor = WeightGovernor(
+            weight_limit=weight_limit,
+            order_limit_10s=order_limit_10s,
+            now=lambda: time.time() + self.clock.offset_ms / 1000.0,
+        )
 
     def _sign(self, params: dict) -> str:
         qs = urlencode(params, doseq=True)
         sig = hmac.new(self.api_secret, qs.encode("utf-8"), hashlib.sha256).hexdigest()
         return qs + "&signature=" + sig
 
-    def server_time(self) -> int:
-        r = requests.get(self.base_url + "/api/v3/time", timeout=10)
-        r.raise_for_status()
-        return int(r.json()["serverTime"])
+    def _send(self, method: str, url: str, *, weight: int, priority: int, orders: int = 0, **kwargs) -> requests.Response:
+        self.governor.acquire(weight, priority, orders=orders)
+        r = self.session.request(method, url, timeout=10, **kwargs)
+        self.governor.observe(r.status_code, r.headers)
+        return r
 
-    def klines(self, symbol: str, interval: str, limit: int = 200) -> list:
-        r = requests.get(
-            self.base_url + "/api/v3/klines",
-            params={"symbol": symbol, "interval": interval, "limit": limit},
-            timeout=10,
-        )
+    def _public(self, path: str, params: dict | None, *, weight: int, priority: int):
+        r = self._send("GET", self.base_url + path, params=params, weight=weight, priority=priority)
         r.raise_for_status()
         return r.json()
 
+    def _signed(
+        self,
+        method: str,
+        path: str,
+        params: dict,
+        label: str,
+        *,
+        weight: int = 1,
+        priority: int = PRIORITY_NORMAL,
+        orders: int = 0,
+    ) -> dict:
+        """Sign with the cached clock offset and send on the keep-alive session.
+
+        One HTTP round trip; only a -1021 (timestamp outside recvWindow) answer
+        triggers a resync and a single retry.
+        """
+        for attempt in range(2):
+            q = self._sign({**params, "timestamp": self.clock.now_ms(), "recvWindow": self.recv_window})
+            if method == "GET":
+                r = self._send(method, self.base_url + path + "?" + q, weight=weight, priority=priority)
+            else:
+                r = self._send(method, self.base_url + path, data=q, weight=weight, priority=priority, orders=orders)
+            if r.status_code == 200:
+                return r.json()
+            if attempt == 0 and r.status_code == 400 and '"code":-1021' in r.text.replace(" ", ""):
+                self.clock.sync()
+                continue
+            # Include response body for debugging (does not contain secrets)
+            raise RuntimeError(f"{label} failed: {r.status_code} {r.text}")
+        raise RuntimeError(f"{label} failed: timestamp outside recvWindow after resync")
+
+    def server_time(self) -> int:
+        return int(self._public("/api/v3/time", None, weight=1, priority=PRIORITY_HIGH)["serverTime"])
+
+    def klines(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int = 200,
+        *,
+        start_time: Optional[int] = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> list:
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        return self._public("/api/v3/klines", params, weight=2, priority=priority)
+
     def exchange_info(self, symbol: str) -> dict:
-        r = requests.get(self.base_url + "/api/v3/exchangeInfo", params={"symbol": symbol}, timeout=10)
-        r.raise_for_status()
-        return r.json()
+        return self._public("/api/v3/exchangeInfo", {"symbol": symbol}, weight=20, priority=PRIORITY_NORMAL)
 
-    def account(self) -> dict:
-        ts = self.server_time()
-        params = {"timestamp": ts, "recvWindow": 5000}
-        q = self._sign(params)
-        r = self.session.get(self.base_url + "/api/v3/account?" + q, timeout=10)
+    def exchange_info_bulk(self, symbols: list[str]) -> dict:
+        """exchangeInfo for many symbols in one call (same weight as a single symbol)."""
+        syms = "[" + ",".join(f'"{s.upper()}"' for s in symbols) + "]"
+        return self._public("/api/v3/exchangeInfo", {"symbols": syms}, weight=20, priority=PRIORITY_NORMAL)
+
+    def depth(self, symbol: str, limit: int = 500, *, priority: int = PRIORITY_NORMAL) -> dict:
+        """Order book snapshot (lastUpdateId, bids, asks); weight grows with limit."""
+        weight = 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+        return self._public("/api/v3/depth", {"symbol": symbol, "limit": int(limit)}, weight=weight, priority=priority)
+
+    # ---- user data stream (API key only, not signed) ----
+
+    def _user_stream(self, method: str, params: Optional[dict] = None) -> dict:
+        r = self._send(method, self.base_url + "/api/v3/userDataStream", params=params, weight=2, priority=PRIORITY_HIGH)
         if r.status_code != 200:
-            # Include response body for debugging (does not contain secrets)
-            raise RuntimeError(f"/api/v3/account failed: {r.status_code} {r.text}")
+            raise RuntimeError(f"{method} /api/v3/userDataStream failed: {r.status_code} {r.text}")
         return r.json()
 
+    def new_listen_key(self) -> str:
+        return str(self._user_stream("POST")["listenKey"])
+
+    def keepalive_listen_key(self, listen_key: str) -> None:
+        self._user_stream("PUT", {"listenKey": listen_key})
+
+    def close_listen_key(self, listen_key: str) -> None:
+        self._user_stream("DELETE", {"listenKey": listen_key})
+
+    def ticker_prices(self, *, priority: int = PRIORITY_NORMAL) -> dict[str, float]:
+        """Last price of every symbol in one call (symbol -> price)."""
+        rows = self._public("/api/v3/ticker/price", None, weight=4, priority=priority)
+        return {r["symbol"]: float(r["price"]) for r in rows}
+
+    def ticker_24hr(self, *, priority: int = PRIORITY_NORMAL) -> list[dict]:
+        """24h rolling stats (quoteVolume, bidPrice, askPrice, ...) for every symbol in one call."""
+        return self._public("/api/v3/ticker/24hr", None, weight=80, priority=priority)
+
+    def account(self, *, priority: int = PRIORITY_NORMAL) -> dict:
+        return self._signed("GET", "/api/v3/account", {}, "/api/v3/account", weight=20, priority=priority)
+
+    def order_list(self, order_list_id: str, *, priority: int = PRIORITY_NORMAL) -> dict:
+        """An OCO's status (listOrderStatus) and its legs (orders: symbol/orderId)."""
+        params = {"orderListId": int(order_list_id)}
+        return self._signed("GET", "/api/v3/orderList", params, "GET /api/v3/orderList", weight=4, priority=priority)
+
+    def my_trades(self, symbol: str, order_id: str, *, priority: int = PRIORITY_NORMAL) -> list[dict]:
+        """Every fill of one order (qty, quoteQty, commission, commissionAsset)."""
+        params = {"symbol": symbol, "orderId": int(order_id)}
+        return self._signed("GET", "/api/v3/myTrades", params, "GET /api/v3/myTrades", weight=5, priority=priority)
+
     def new_order_market_buy_quote(self, symbol: str, quote_qty: float) -> dict:
         # MARKET BUY with quoteOrderQty is easiest for a "$-capped" constraint.
-        ts = self.server_time()
         params = {
             "symbol": symbol,
             "side": "BUY",
             "type": "MARKET",
             "quoteOrderQty": f"{quote_qty:.2f}",
-            "timestamp": ts,
-            "recvWindow": 5000,
         }
-        q = self._sign(params)
-        r = self.session.post(self.base_url + "/api/v3/order", data=q, timeout=10)
-        if r.status_code != 200:
-            raise RuntimeError(f"POST /api/v3/order failed: {r.status_code} {r.text}")
-        return r.json()
+        return self._signed("POST", "/api/v3/order", params, "POST /api/v3/order", orders=1)
 
     def new_order_market_sell_quantity(self, symbol: str, quantity: str) -> dict:
-        ts = self.server_time()
         params = {
             "symbol": symbol,
             "side": "SELL",
             "type": "MARKET",
             "quantity": quantity,
-            "timestamp": ts,
-            "recvWindow": 5000,
         }
-        q = self._sign(params)
-        r = self.session.post(self.base_url + "/api/v3/order", data=q, timeout=10)
-        if r.status_code != 200:
-            raise RuntimeError(f"POST /api/v3/order (SELL) failed: {r.status_code} {r.text}")
-        return r.json()
+        return self._signed(
+            "POST", "/api/v3/order", params, "POST /api/v3/order (SELL)", priority=PRIORITY_HIGH, orders=1
+        )
 
     def new_oco_sell(self, symbol: str, quantity: str, price: str, stop_price: str, stop_limit_price: str) -> dict:
         """Place an OCO SELL order for spot."""
-        ts = self.server_time()
         params = {
             "symbol": symbol,
             "side": "SELL",
@@ -95,11 +334,7 @@ class BinanceApi:
             "stopPrice": stop_price,
             "stopLimitPrice": stop_limit_price,
             "stopLimitTimeInForce": "GTC",
-            "timestamp": ts,
-            "recvWindow": 5000,
         }
-        q = self._sign(params)
-        r = self.session.post(self.base_url + "/api/v3/order/oco", data=q, timeout=10)
-        if r.status_code != 200:
-            raise RuntimeError(f"POST /api/v3/order/oco failed: {r.status_code} {r.text}")
-        return r.json()
+        return self._signed(
+            "POST", "/api/v3/order/oco", params, "POST /api/v3/order/oco", priority=PRIORITY_HIGH, orders=2
+        )
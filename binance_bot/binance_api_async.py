@@ -0,0 +1,193 @@
+"""asyncio variant of BinanceApi (pooled httpx client).
+
+Used for concurrent per-symbol fan-out: one tick fetches klines for every
+symbol at once instead of one request after another.
+
+The clock offset and weight governor are shared with the sync client
+(`AsyncBinanceApi.from_sync`), so both clients draw from one IP budget.
+Clock syncs go through the sync client's /api/v3/time call, so they run in a
+worker thread instead of blocking the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+from typing import Optional
+from urllib.parse import urlencode
+
+import httpx
+
+from binance_api import PRIORITY_HIGH, PRIORITY_NORMAL, BinanceApi, ClockSync, WeightGovernor
+
+
+class AsyncBinanceApi:
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: str = "https://api.binance.com",
+        *,
+        clock: ClockSync,
+        governor: WeightGovernor,
+        recv_window: int = 5000,
+        max_connections: int = 20,
+    ):
+        self.api_key = api_key
+        self.api_secret = api_secret.encode("utf-8")
+        self.base_url = base_url.rstrip("/")
+        self.clock = clock
+        self.governor = governor
+        self.recv_window = int(recv_window)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"X-MBX-APIKEY": api_key},
+            timeout=10,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    @classmethod
+    def from_sync(cls, api: BinanceApi, *, max_connections: int = 20) -> "AsyncBinanceApi":
+        return cls(
+            api.api_key,
+            api.api_secret.decode("utf-8"),
+            api.base_url,
+            clock=api.clock,
+            governor=api.governor,
+            recv_window=api.recv_window,
+            max_connections=max_connections,
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def _sign(self, params: dict) -> str:
+        qs = urlencode(params, doseq=True)
+        sig = hmac.new(self.api_secret, qs.encode("utf-8"), hashlib.sha256).hexdigest()
+        return qs + "&signature=" + sig
+
+    async def _timestamp(self) -> int:
+        if self.clock.error_ms is None:
+            await asyncio.to_thread(self.clock.sync)
+        return self.clock.now_ms()
+
+    async def _send(self, method: str, path: str, *, weight: int, priority: int, orders: int = 0, **kwargs) -> httpx.Response:
+        while True:
+            wait = self.governor.try_acquire(weight, priority, orders=orders)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        r = await self.client.request(method, path, **kwargs)
+        self.governor.observe(r.status_code, r.headers)
+        return r
+
+    async def _public(self, path: str, params: Optional[dict], *, weight: int, priority: int):
+        r = await self._send("GET", path, params=params, weight=weight, priority=priority)
+        r.raise_for_status()
+        return r.json()
+
+    async def _signed(
+        self,
+        method: str,
+        path: str,
+        params: dict,
+        label: str,
+        *,
+        weight: int = 1,
+        priority: int = PRIORITY_NORMAL,
+        orders: int = 0,
+    ) -> dict:
+        for attempt in range(2):
+            q = self._sign({**params, "timestamp": await self._timestamp(), "recvWindow": self.recv_window})
+            if method == "GET":
+                r = await self._send(method, path + "?" + q, weight=weight, priority=priority)
+            else:
+                r = await self._send(
+                    method,
+                    path,
+                    content=q,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                    weight=weight,
+                    priority=priority,
+                    orders=orders,
+                )
+            if r.status_code == 200:
+                return r.json()
+            if attempt == 0 and r.status_code == 400 and '"code":-1021' in r.text.replace(" ", ""):
+                await asyncio.to_thread(self.clock.sync)
+                continue
+            raise RuntimeError(f"{label} failed: {r.status_code} {r.text}")
+        raise RuntimeError(f"{label} failed: timestamp outside recvWindow after resync")
+
+    async def klines(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int = 200,
+        *,
+        start_time: Optional[int] = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> list:
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        return await self._public("/api/v3/klines", params, weight=2, priority=priority)
+
+    async def klines_many(
+        self,
+        symbols: list[str],
+        interval: str,
+        limit: int = 200,
+        *,
+        start_times: Optional[dict[str, int]] = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> dict[str, list | Exception]:
+        """Fetch klines for all symbols concurrently.
+
+        `start_times` (symbol -> startTime ms) turns this into an incremental fetch.
+        Failures stay per symbol: the value is the exception instead of the rows.
+        """
+        starts = start_times or {}
+        results = await asyncio.gather(
+            *(self.klines(sym, interval, limit, start_time=starts.get(sym), priority=priority) for sym in symbols),
+            return_exceptions=True,
+        )
+        return dict(zip(symbols, results))
+
+    async def account(self, *, priority: int = PRIORITY_NORMAL) -> dict:
+        return await self._signed("GET", "/api/v3/account", {}, "/api/v3/account", weight=20, priority=priority)
+
+    async def new_order_market_buy_quote(self, symbol: str, quote_qty: float) -> dict:
+        params = {
+            "symbol": symbol,
+            "side": "BUY",
+            "type": "MARKET",
+            "quoteOrderQty": f"{quote_qty:.2f}",
+        }
+        return await self._signed("POST", "/api/v3/order", params, "POST /api/v3/order", orders=1)
+
+    async def new_order_market_sell_quantity(self, symbol: str, quantity: str) -> dict:
+        params = {
+            "symbol": symbol,
+            "side": "SELL",
+            "type": "MARKET",
+            "quantity": quantity,
+        }
+        return await self._signed(
+            "POST", "/api/v3/order", params, "POST /api/v3/order (SELL)", priority=PRIORITY_HIGH, orders=1
+        )
+
+    async def new_oco_sell(self, symbol: str, quantity: str, price: str, stop_price: str, stop_limit_price: str) -> dict:
+        params = {
+            "symbol": symbol,
+            "side": "SELL",
+            "quantity": quantity,
+            "price": price,
+            "stopPrice": stop_price,
+            "stopLimitPrice": stop_limit_price,
+            "stopLimitTimeInForce": "GTC",
+        }
+        return await self._signed(
+            "POST", "/api/v3/order/oco", params, "POST /api/v3/order/oco", priority=PRIORITY_HIGH, orders=2
+        )
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import json
 import os
+import signal
+import sys
 import time
 import uuid
 import logging
@@ -9,10 +13,26 @@ from decimal import Decimal, ROUND_DOWN
 
 from dotenv import load_dotenv
 
-from binance_api import BinanceApi
-from db import connect, init_db
+from binance_api import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, BinanceApi, RateLimitedError
+from binance_api_async import AsyncBinanceApi
+from db import connect, healthy_conn, init_db, open_pool
+from db_writer import WriteBehind, insert_row
+from exit_engine import ExitEngine, ExitOrder, OpenPosition, load_open_positions
+from exposure import ExposureLedger, load_binance_exposure
+from kline_store import MAX_PAGE as KLINE_PAGE, KlineStore, interval_ms
+from market_stream import KlineFeed
+from order_book import DepthFeed
+from portfolio import balances_from_account, value_portfolio
+from scanner import UniverseScanner
+from scheduler import Scheduler
+from shard import ShardLeases, reserve_buy
+from storage import maintain_from_env as maintain_storage
+from symbol_filters import FilterRegistry
+from user_stream import UserDataStream, apply_events, reconcile_oco_positions
+from ws_orders import WsOrderGateway
 from strategy import decide_signal
-from indicators import ema, rsi
+from indicator_cache import IndicatorCache
+from indicators import IndicatorSet, load_indicator_sets, save_indicator_sets
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("binance_daemon")
@@ -35,24 +55,6 @@ def _env_float(name: str, default: float) -> float:
         return default
 
 
-def _get_step_size(exchange_info: dict) -> tuple[Decimal, Decimal]:
-    # returns (stepSize, tickSize)
-    syms = exchange_info.get("symbols") or []
-    if not syms:
-        raise RuntimeError("exchangeInfo missing symbols")
-    filters = syms[0].get("filters") or []
-    step = None
-    tick = None
-    for f in filters:
-        if f.get("filterType") == "LOT_SIZE":
-            step = Decimal(str(f.get("stepSize")))
-        if f.get("filterType") == "PRICE_FILTER":
-            tick = Decimal(str(f.get("tickSize")))
-    if step is None or tick is None:
-        raise RuntimeError("could not find LOT_SIZE/PRICE_FILTER")
-    return step, tick
-
-
 def _quantize(value: Decimal, step: Decimal) -> Decimal:
     # round DOWN to step
     if step == 0:
@@ -62,6 +64,235 @@ def _quantize(value: Decimal, step: Decimal) -> Decimal:
     return q.quantize(step)
 
 
+def _last_close(api: BinanceApi, feed: KlineFeed | None, symbol: str, interval: str, priority: int) -> float:
+    # Prefer the streamed price; fall back to REST when the feed is off or stale.
+    if feed is not None and feed.is_fresh(symbol):
+        p = feed.last_price(symbol)
+        if p is not None:
+            return p
+    return float(api.klines(symbol, interval, limit=1, priority=priority)[0][4])
+
+
+def _symbol_klines(
+    api: BinanceApi,
+    sym: str,
+    interval: str,
+    *,
+    feed: KlineFeed | None,
+    store: KlineStore | None,
+    prefetched: dict,
+    limit: int = 200,
+) -> list:
+    """Latest `limit` klines (REST row shape) from the cheapest available source.
+
+    Stream (no network) > fan-out prefetch > REST. With a local store, only
+    new candles are fetched and the store serves the history.
+    """
+    # These klines feed decide_signal entries: NORMAL priority (signal inputs), so they wait
+    # briefly for budget instead of being dropped with the LOW indicator/balance refreshes.
+    if store is None:
+        if feed is not None and feed.is_fresh(sym):
+            return feed.klines(sym, limit=limit)
+        if sym in prefetched:
+            rows = prefetched[sym]
+            if isinstance(rows, Exception):
+                raise rows
+            return rows
+        return api.klines(sym, interval, limit=limit, priority=PRIORITY_NORMAL)
+
+    if feed is not None and feed.is_fresh(sym):
+        store.ingest(feed.klines(sym))
+    elif sym in prefetched:
+        rows = prefetched[sym]
+        if isinstance(rows, Exception):
+            raise rows
+        store.ingest(rows, contiguous_only=False)
+        if len(rows) >= KLINE_PAGE:
+            store.needs_backfill = True
+    else:
+        store.sync(api, priority=PRIORITY_NORMAL)
+    if store.needs_backfill:
+        store.sync(api, priority=PRIORITY_NORMAL)
+    return store.rows(limit)
+
+
+def _write_row(conn, writer: WriteBehind | None, table: str, columns: tuple[str, ...], row: tuple) -> None:
+    # Non-critical rows: queued for the write-behind thread when enabled, else inserted now.
+    if writer is not None:
+        writer.add(table, columns, row)
+    else:
+        insert_row(conn, table, columns, row)
+
+
+def _insert_indicator_point(
+    conn, writer: WriteBehind | None, sym: str, interval: str, kline: list, values: tuple, ma_score: float, rsi_score: float, *, closed: bool
+) -> None:
+    ef, es, rv = values
+    _write_row(
+        conn,
+        writer,
+        "binance_indicator_point",
+        ("symbol", "interval", "close", "ema_fast", "ema_slow", "rsi", "blog_ma_score", "blog_rsi_score", "candle_open_ms", "candle_closed", "raw_json"),
+        (
+            sym,
+            interval,
+            float(kline[4]),
+            float(ef) if ef is not None else None,
+            float(es) if es is not None else None,
+            float(rv) if rv is not None else None,
+            float(ma_score),
+            float(rsi_score),
+            int(kline[0]),
+            closed,
+            json.dumps({"last_kline": kline}),
+        ),
+    )
+
+
+def _sell_quantity(sym_filters: FilterRegistry, sym: str, base_qty: float) -> str:
+    if sym not in sym_filters:
+        sym_filters.add_symbols([sym])
+    step = sym_filters[sym].step
+    qty = Decimal(str(base_qty or 0))
+    q2 = (qty / step).to_integral_value(rounding=ROUND_DOWN) * step
+    s = format(q2, 'f')
+    if '.' in s:
+        s = s.rstrip('0').rstrip('.')
+    return s
+
+
+def _sell_positions(
+    api: BinanceApi | WsOrderGateway,
+    aapi: AsyncBinanceApi | None,
+    fanout_loop: asyncio.AbstractEventLoop | None,
+    conn,
+    sym_filters: FilterRegistry,
+    orders: list[ExitOrder],
+    exits: ExitEngine,
+    ledger: ExposureLedger,
+) -> None:
+    """Market-sell a batch of triggered positions; record them in one transaction.
+
+    Sells are pipelined on the WebSocket gateway when it is on, else sent
+    concurrently on the async client when fan-out is on. A failed sell goes
+    back to the engine, which retries it after a backoff. A position too small
+    to sell (below one LOT_SIZE step) is marked 'dust' and leaves the ledger.
+    """
+    batch = []
+    dust = []
+    for o in orders:
+        try:
+            qty = _sell_quantity(sym_filters, o.position.symbol, o.position.base_qty)
+        except Exception as e:
+            delay = exits.retry(o)
+            logger.warning("exit qty failed pos=%s (retry in %.0fs): %s", o.position.id, delay / 1000.0, e)
+            continue
+        if Decimal(qty) <= 0:
+            dust.append(o)
+            continue
+        batch.append((o, qty))
+    if dust:
+        with conn.cursor() as cur:
+            for o in dust:
+                cur.execute(
+                    """
+                    UPDATE binance_position
+                    SET status='dust', raw_json = COALESCE(raw_json,'{}'::jsonb) || %s::jsonb
+                    WHERE id=%s AND status='open'
+                    """,
+                    (json.dumps({'exit_reason': o.reason, 'last_close': o.last_price, 'dust_qty': o.position.base_qty}), int(o.position.id)),
+                )
+        conn.commit()
+        for o in dust:
+            ledger.close_position(int(o.position.id))
+        logger.info("exits dust (below LOT_SIZE step, left in the wallet): %s", [o.position.id for o in dust])
+    if not batch:
+        return
+
+    if isinstance(api, WsOrderGateway):
+        results = api.market_sell_many([(o.position.symbol, q) for o, q in batch])
+    elif aapi is not None and fanout_loop is not None:
+
+        async def _send_all():
+            return await asyncio.gather(
+                *(aapi.new_order_market_sell_quantity(o.position.symbol, q) for o, q in batch), return_exceptions=True
+            )
+
+        results = fanout_loop.run_until_complete(_send_all())
+    else:
+        results = []
+        for o, q in batch:
+            try:
+                results.append(api.new_order_market_sell_quantity(o.position.symbol, q))
+            except Exception as e:
+                results.append(e)
+
+    closed = []
+    with conn.cursor() as cur:
+        for (o, _), sell_resp in zip(batch, results):
+            pid, sym = o.position.id, o.position.symbol
+            if isinstance(sell_resp, Exception):
+                delay = exits.retry(o)
+                logger.warning(
+                    "exit sell failed pos=%s sym=%s attempt=%s (retry in %.0fs): %s",
+                    pid,
+                    sym,
+                    o.attempt + 1,
+                    delay / 1000.0,
+                    sell_resp,
+                )
+                continue
+            fills = sell_resp.get('fills') or []
+            quote_got = 0.0
+            base_sold = 0.0
+            for f in fills:
+                q = float(f.get('qty') or 0)
+                p = float(f.get('price') or 0)
+                base_sold += q
+                quote_got += q * p
+            exit_price = (quote_got / base_sold) if base_sold > 0 else None
+            cur.execute(
+                """
+                UPDATE binance_position
+                SET status='closed',
+                    exit_order_id=%s,
+                    exit_price=%s,
+                    exit_quote_qty=%s,
+                    pnl_quote=(%s - COALESCE(entry_quote_qty,0)),
+                    raw_json = COALESCE(raw_json,'{}'::jsonb) || %s::jsonb
+                WHERE id=%s
+                """,
+                (
+                    str(sell_resp.get('orderId')),
+                    exit_price,
+                    quote_got,
+                    quote_got,
+                    json.dumps({'exit_reason': o.reason, 'last_close': o.last_price}),
+                    int(pid),
+                ),
+            )
+            cur.execute(
+                """
+                INSERT INTO binance_order(symbol, side, status, order_id, quote_qty, base_qty, price, position_id, raw_response_json)
+                VALUES (%s,'SELL','submitted',%s,%s,%s,%s,%s,%s::jsonb)
+                """,
+                (
+                    sym,
+                    str(sell_resp.get('orderId')),
+                    quote_got,
+                    float(base_sold) if base_sold else None,
+                    exit_price,
+                    int(pid),
+                    json.dumps(sell_resp),
+                ),
+            )
+            closed.append(pid)
+    conn.commit()
+    for pid in closed:
+        ledger.close_position(int(pid))
+    logger.info("exits sold=%s failed=%s", len(closed), len(batch) - len(closed))
+
+
 def blog_scores(conn) -> tuple[float, float]:
     # derive "MA" vs "RSI" preference from collected content signals tags
     # tags were implemented in polymarket_bot; we reuse those tables.
@@ -124,419 +355,728 @@ def main() -> None:
     if (testnet_always_buy or testnet_no_oco) and "testnet" not in base_url:
         raise RuntimeError("TESTNET_* options are only allowed when BINANCE_BASE_URL is a testnet endpoint")
 
-    conn = connect()
-    init_db(conn)
+    # stop_daemon.sh sends SIGTERM: exit through atexit, so every shutdown hook registered
+    # below runs (write-behind flush, WS/user-stream close, shard lease release).
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
 
-    api = BinanceApi(api_key, api_secret, base_url=base_url)
+    # One long-lived connection from the pool: its prepared statements survive across ticks,
+    # and after a DB restart the loop swaps it for a fresh one instead of failing every tick.
+    pool = open_pool(max_size=2, timeout=_env_float("DB_CONNECT_TIMEOUT_SECONDS", 10.0))
+    conn = pool.getconn()
+    init_db(conn)
 
-    # Preload symbol filters
-    sym_filters: dict[str, tuple[Decimal, Decimal]] = {}
-    for sym in symbols:
-        info = api.exchange_info(sym)
-        step, tick = _get_step_size(info)
-        sym_filters[sym] = (step, tick)
+    # Daily spend / open positions in memory; reloaded from the DB on a slow timer.
+    ledger = ExposureLedger(load_binance_exposure, reconcile_seconds=_env_float("EXPOSURE_RECONCILE_SECONDS", 300.0))
+    ledger.reconcile(conn)
+
+    api = BinanceApi(
+        api_key,
+        api_secret,
+        base_url=base_url,
+        recv_window=int(os.getenv("RECV_WINDOW_MS") or "5000"),
+        clock_resync_seconds=_env_float("CLOCK_RESYNC_SECONDS", 300.0),
+        weight_limit=int(os.getenv("BINANCE_WEIGHT_LIMIT") or "6000"),
+        order_limit_10s=int(os.getenv("BINANCE_ORDER_LIMIT_10S") or "100"),
+    )
+    api.clock.sync()
+    logger.info("clock offset_ms=%.1f sync_error_ms=%.1f recv_window=%s", api.clock.offset_ms, api.clock.error_ms, api.recv_window)
+
+    # Symbol filters: one bulk exchangeInfo call (or the on-disk cache), refreshed in the background.
+    sym_filters = FilterRegistry(
+        api,
+        cache_path=(os.getenv("FILTER_CACHE_PATH") or None),
+        ttl_seconds=_env_float("FILTER_CACHE_TTL_SECONDS", 86400.0),
+    )
+    sym_filters.load(symbols)
+    sym_filters.start_background_refresh()
+
+    # Streaming klines (optional): closes are read from memory instead of REST every tick.
+    feed: KlineFeed | None = None
+    if _env_bool("USE_KLINE_STREAM", False):
+        feed_symbols = list(dict.fromkeys(symbols + ["BTCUSDT", "ETHUSDT"]))
+        feed = KlineFeed(api, feed_symbols, interval, stream_url=(os.getenv("BINANCE_STREAM_URL") or None))
+        feed.start()
+
+    # Local L2 books (optional): entries are sized against the book instead of the last close.
+    depth: DepthFeed | None = None
+    max_slippage_share = _env_float("MAX_SLIPPAGE_SHARE", 0.5)
+    if _env_bool("USE_DEPTH_BOOK", False):
+        depth = DepthFeed(
+            api,
+            symbols,
+            stream_url=(os.getenv("BINANCE_STREAM_URL") or None),
+            snapshot_limit=int(os.getenv("DEPTH_SNAPSHOT_LIMIT") or "500"),
+        )
+        depth.start()
+
+    def live_price(sym: str) -> float | None:
+        # Streamed price when the feed covers the symbol and is fresh (no network).
+        if feed is not None and sym in feed.symbols and feed.is_fresh(sym):
+            return feed.last_price(sym)
+        return None
+
+    # Local kline store (optional): history persists on disk, each tick fetches only new candles.
+    stores: dict[str, KlineStore] = {}
+    store_dir = (os.getenv("KLINE_STORE_DIR") or "").strip()
+    if store_dir:
+        capacity = max(200, int(os.getenv("KLINE_STORE_CAPACITY") or "1000"))
+        for sym in symbols:
+            stores[sym] = KlineStore(store_dir, sym, interval, capacity=capacity)
+            try:
+                stores[sym].sync(api)  # backfill whatever was missed while down
+            except Exception as e:
+                logger.warning("kline store backfill failed sym=%s: %s", sym, e)
+
+    # Streaming indicator state, optionally persisted for warm restarts.
+    ind_state_path = (os.getenv("INDICATOR_STATE_PATH") or "").strip()
+    if ind_state_path:
+        ind_sets = load_indicator_sets(ind_state_path, symbols, ema_fast, ema_slow, rsi_period)
+    else:
+        ind_sets = {sym: IndicatorSet(ema_fast, ema_slow, rsi_period) for sym in symbols}
+
+    # Indicator-row dedup: final row per closed candle, optional intra-candle samples.
+    ind_cache = IndicatorCache(sample_seconds=_env_float("INDICATOR_SAMPLE_SECONDS", 0.0))
+
+    # Write-behind (optional): indicator/signal/snapshot rows leave the trading thread
+    # and are COPY'd in batches on a separate connection; drained at exit.
+    writer: WriteBehind | None = None
+    if _env_bool("DB_WRITE_BEHIND", False):
+        writer = WriteBehind(
+            connect,
+            batch_size=int(os.getenv("DB_WRITE_BATCH_SIZE") or "500"),
+            flush_seconds=_env_float("DB_WRITE_FLUSH_SECONDS", 2.0),
+            max_rows=int(os.getenv("DB_WRITE_MAX_ROWS") or "20000"),
+        ).start()
+        atexit.register(writer.close)
+
+    # Async fan-out (optional): fetch all symbols' klines concurrently on one pooled client.
+    aapi: AsyncBinanceApi | None = None
+    fanout_loop: asyncio.AbstractEventLoop | None = None
+    if _env_bool("ASYNC_FANOUT", False):
+        fanout_loop = asyncio.new_event_loop()
+        aapi = AsyncBinanceApi.from_sync(api, max_connections=int(os.getenv("ASYNC_MAX_CONNECTIONS") or "20"))
+
+    # Order entry over the WebSocket API (optional): persistent signed session, REST fallback.
+    orders_api: BinanceApi | WsOrderGateway = api
+    if _env_bool("USE_WS_ORDERS", False):
+        orders_api = WsOrderGateway(
+            api,
+            ws_url=(os.getenv("BINANCE_WS_API_URL") or None),
+            timeout=_env_float("WS_ORDER_TIMEOUT_SECONDS", 5.0),
+        ).start()
+        atexit.register(orders_api.stop)
+
+    logger.info(
+        "binance daemon started symbols=%s interval=%s enable_trading=%s kline_stream=%s async_fanout=%s",
+        symbols,
+        interval,
+        enable,
+        feed is not None,
+        aapi is not None,
+    )
+
+    # Each kind of work runs on its own cadence. With ALIGN_TO_CANDLES, signals are
+    # evaluated once just after each candle close (server time) instead of every poll.
+    align = _env_bool("ALIGN_TO_CANDLES", False)
+    sched = Scheduler(api.clock.now_ms)
+    if align:
+        sched.add(
+            "signal",
+            interval_ms(interval) / 1000.0,
+            align=True,
+            delay_ms=int(os.getenv("SIGNAL_DELAY_MS") or "1500"),
+            max_late_ms=int(_env_float("SIGNAL_MAX_LATE_SECONDS", 60.0) * 1000),
+            run_now=False,
+        )
+    else:
+        sched.add("signal", poll)
+    sched.add("exits", _env_float("EXIT_POLL_SECONDS", float(poll)))
+    sched.add("balance", _env_float("BALANCE_SNAPSHOT_SECONDS", 60.0))
+    sched.add("blog", _env_float("BLOG_REFRESH_SECONDS", 60.0))
+    # Tick-table partitions ahead + rollup/retention (storage.py); the sharding leader only.
+    sched.add("storage", _env_float("STORAGE_MAINTENANCE_SECONDS", 3600.0))
+
+    # Universe scan (optional): once per candle, the top UNIVERSE_TOP_N USDT pairs by
+    # signal strength join the fixed SYMBOLS. Its klines are reused by the signal run.
+    scanner: UniverseScanner | None = None
+    pinned = list(symbols)
+    universe_top_n = int(os.getenv("UNIVERSE_TOP_N") or "10")
+    if _env_bool("UNIVERSE_SCAN", False):
+        scanner = UniverseScanner.from_env(api, interval, aapi=aapi, loop=fanout_loop)
+        sched.add(
+            "universe",
+            interval_ms(interval) / 1000.0,
+            align=True,
+            delay_ms=int(os.getenv("SIGNAL_DELAY_MS") or "1500"),
+        )
 
-    logger.info("binance daemon started symbols=%s interval=%s enable_trading=%s", symbols, interval, enable)
+    # User-data stream (optional): OCO fills close positions as they happen and
+    # balances come from pushed account updates instead of /api/v3/account.
+    ustream: UserDataStream | None = None
+    if _env_bool("USE_USER_STREAM", False):
+        ustream = UserDataStream(
+            api,
+            stream_url=(os.getenv("BINANCE_STREAM_URL") or None),
+            on_event=lambda: sched.trigger("user"),
+        )
+        ustream.start()
+        atexit.register(ustream.stop)
+        sched.add("user", _env_float("USER_STREAM_APPLY_SECONDS", 30.0))
+
+    # Sharding (optional): several daemons split the symbols through DB leases; the
+    # daily cap / open-position limit are checked globally when a BUY is reserved.
+    leases: ShardLeases | None = None
+    if _env_bool("SHARDING", False):
+        leases = ShardLeases(symbols, ttl_seconds=_env_float("SHARD_LEASE_SECONDS", 30.0))
+        sched.add("leases", leases.ttl_seconds / 3.0)
+
+        def _release_leases() -> None:
+            try:
+                leases.release_all(conn)
+            except Exception:
+                pass
+
+        atexit.register(_release_leases)
+
+    # No-OCO exits: open positions in memory, triggered by streamed prices and local deadlines.
+    # With sharding, only positions on leased symbols (loaded as leases are gained).
+    exits = ExitEngine(on_trigger=lambda: sched.trigger("exits"))
+    if enable and testnet_no_oco:
+        if leases is None:
+            for pos in load_open_positions(conn):
+                exits.add(pos)
+        if feed is not None:
+            feed.add_listener(exits.on_price)
 
     last_trade_ts = 0.0
-    last_balance_ts = 0.0
+    ma_score, rsi_score = 0.0, 0.0
 
     loop_i = 0
+    work_ms: list[float] = []  # time spent per loop (excluding the scheduler sleep)
+    t_work: float | None = None
     while True:
+        if t_work is not None:
+            work_ms.append((time.perf_counter() - t_work) * 1000.0)
+        due = sched.wait()
+        t_work = time.perf_counter()
         loop_i += 1
-        t0 = time.time()
         try:
+            if conn is None or conn.broken or conn.closed:
+                stale, conn = conn, None  # stays None if the checkout fails; retried next tick
+                conn = healthy_conn(pool, stale)
+                logger.info("db reconnected")
             if loop_i % 5 == 0:
-                logger.info("tick loop=%s enable=%s testnet_no_oco=%s", loop_i, enable, testnet_no_oco)
+                logger.info(
+                    "tick loop=%s work_ms_avg=%.1f work_ms_max=%.1f enable=%s testnet_no_oco=%s clock_offset_ms=%.1f sync_error_ms=%.1f used_weight=%s dropped=%s runs_missed=%s",
+                    loop_i,
+                    sum(work_ms) / len(work_ms) if work_ms else 0.0,
+                    max(work_ms, default=0.0),
+                    enable,
+                    testnet_no_oco,
+                    api.clock.offset_ms,
+                    api.clock.error_ms or 0.0,
+                    api.governor.used_weight,
+                    api.governor.dropped,
+                    sched.stats(),
+                )
+                work_ms.clear()
+                if isinstance(orders_api, WsOrderGateway):
+                    logger.info(
+                        "ws orders latency=%s fallbacks=%s reconnects=%s",
+                        orders_api.latency_stats(),
+                        orders_api.fallbacks,
+                        orders_api.reconnects,
+                    )
+            for run in due.values():
+                if run.missed:
+                    logger.warning("loop overran: %s missed %s slot(s), late %sms", run.name, run.missed, run.late_ms)
 
-            ma_score, rsi_score = blog_scores(conn)
+            # Keep the signing clock fresh here, off the order path.
+            try:
+                api.clock.maybe_resync()
+            except Exception as e:
+                logger.warning("clock resync failed: %s", e)
 
-            # Balance snapshot (rough USDT estimate) every ~60s
-            if time.time() - last_balance_ts > 60:
+            if "leases" in due and leases is not None:
                 try:
-                    acct = api.account()
-                    bal = {b.get('asset'): {'free': b.get('free'), 'locked': b.get('locked')} for b in (acct.get('balances') or [])}
-                    usdt = float(bal.get('USDT', {}).get('free') or 0) + float(bal.get('USDT', {}).get('locked') or 0)
-                    # Use latest klines to estimate BTC/ETH value in USDT
-                    btc_close = float(api.klines('BTCUSDT', interval, limit=1)[0][4])
-                    eth_close = float(api.klines('ETHUSDT', interval, limit=1)[0][4])
-                    btc_amt = float(bal.get('BTC', {}).get('free') or 0) + float(bal.get('BTC', {}).get('locked') or 0)
-                    eth_amt = float(bal.get('ETH', {}).get('free') or 0) + float(bal.get('ETH', {}).get('locked') or 0)
-                    total = usdt + btc_amt * btc_close + eth_amt * eth_close
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            "INSERT INTO binance_balance_snapshot(total_usdt_est, raw_json) VALUES (%s,%s::jsonb)",
-                            (__import__('math').floor(total * 100) / 100.0, json.dumps({'usdt': usdt, 'btc': btc_amt, 'eth': eth_amt, 'btc_close': btc_close, 'eth_close': eth_close})),
-                        )
-                        conn.commit()
-                    last_balance_ts = time.time()
-                except Exception:
+                    gained, lost = leases.renew(conn)
+                    if lost:
+                        exits.remove_symbols(lost)
+                    if gained and enable and testnet_no_oco:
+                        for pos in load_open_positions(conn, sorted(gained)):
+                            exits.add(pos)
+                except Exception as e:
+                    logger.warning("lease renewal failed: %s", e)
+                    conn.rollback()
+
+            if "blog" in due:
+                ma_score, rsi_score = blog_scores(conn)
+
+            if "storage" in due and (leases is None or leases.leader):
+                maintain_storage(conn)
+
+            if "user" in due and ustream is not None:
+                events = ustream.drain()
+                if events:
+                    try:
+                        n = apply_events(conn, events, on_closed=ledger.close_position)
+                        logger.info("user stream events=%s positions_closed=%s", len(events), n)
+                    except Exception as e:
+                        logger.warning("user stream apply failed: %s", e)
+                        conn.rollback()
+                # Fills/list updates sent while the stream was down are lost: re-read open OCOs over REST.
+                if ustream.take_reconcile():
+                    try:
+                        reconcile_oco_positions(conn, api, on_closed=ledger.close_position)
+                    except Exception as e:
+                        logger.warning("oco reconcile failed: %s", e)
+                        conn.rollback()
+
+            # Balance snapshot (USDT estimate of every asset) every BALANCE_SNAPSHOT_SECONDS:
+            # prices from the stream cache, else one bulk ticker call.
+            if "balance" in due and (leases is None or leases.leader):
+                try:
+                    balances = ustream.balances() if ustream is not None else None
+                    if balances is None:
+                        balances = balances_from_account(api.account(priority=PRIORITY_LOW))
+                    val = value_portfolio(
+                        balances,
+                        lambda: api.ticker_prices(priority=PRIORITY_LOW),
+                        live_price,
+                    )
+                    if val.unpriced:
+                        logger.info("balance snapshot: no USDT route for %s", val.unpriced)
+                    _write_row(
+                        conn,
+                        writer,
+                        "binance_balance_snapshot",
+                        ("total_usdt_est", "assets_json", "raw_json"),
+                        (
+                            __import__('math').floor(val.total_usdt * 100) / 100.0,
+                            json.dumps(val.assets),
+                            json.dumps({'unpriced': val.unpriced}),
+                        ),
+                    )
+                except Exception as e:
                     # ignore balance errors (still can compute indicators)
-                    last_balance_ts = time.time()
+                    logger.warning("balance snapshot failed: %s", e)
 
-            # naive daily cap check (DB)
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT COALESCE(SUM(quote_qty),0)::float8
-                    FROM binance_order
-                    WHERE created_at >= date_trunc('day', now())
-                      AND created_at <  date_trunc('day', now()) + interval '1 day'
-                      AND status='submitted'
-                      AND side='BUY'
-                    """
-                )
-                spent_today = Decimal(str(cur.fetchone()[0] or 0.0)).quantize(Decimal("0.01"))
-
-            # Exit positions (testnet no-OCO mode)
-            # - If TP/SL hit, exit immediately
-            # - Else exit at planned_exit_at
-            if enable and testnet_no_oco:
+            # Exit positions (testnet no-OCO mode), event driven:
+            # - TP/SL are crossed by streamed prices (the engine wakes this task at once)
+            # - timeouts fire from the local clock
+            if "exits" in due and enable and testnet_no_oco:
                 try:
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            """
-                            SELECT id, symbol, entry_base_qty, target_exit_price, stop_exit_price, planned_exit_at
-                            FROM binance_position
-                            WHERE status='open'
-                            ORDER BY created_at ASC
-                            LIMIT 20
-                            """
-                        )
-                        open_pos = cur.fetchall() or []
-
-                    for pid, sym, entry_base_qty, tp, sl, planned_exit_at in open_pos:
-                        # current price (use last close)
-                        try:
-                            last_close = float(api.klines(sym, interval, limit=1)[0][4])
-                        except Exception:
-                            last_close = None
-
-                        should_exit = False
-                        reason = None
-                        if last_close is not None and tp is not None and last_close >= float(tp):
-                            should_exit = True
-                            reason = 'tp_hit'
-                        if last_close is not None and sl is not None and last_close <= float(sl):
-                            should_exit = True
-                            reason = 'sl_hit'
-                        if planned_exit_at is not None:
-                            # planned exit time reached
-                            with conn.cursor() as cur:
-                                cur.execute("SELECT now() >= %s", (planned_exit_at,))
-                                if bool(cur.fetchone()[0]):
-                                    should_exit = True
-                                    reason = reason or 'timeout'
-
-                        if not should_exit:
-                            continue
-
-                        step, tick = sym_filters.get(sym)
-                        qty = Decimal(str(entry_base_qty or 0))
-                        if qty <= 0:
-                            continue
-                        q2 = (qty / step).to_integral_value(rounding=ROUND_DOWN) * step
-                        s = format(q2, 'f')
-                        if '.' in s:
-                            s = s.rstrip('0').rstrip('.')
-
-                        sell_resp = api.new_order_market_sell_quantity(sym, s)
-
-                        fills = sell_resp.get('fills') or []
-                        quote_got = 0.0
-                        base_sold = 0.0
-                        for f in fills:
-                            q = float(f.get('qty') or 0)
-                            p = float(f.get('price') or 0)
-                            base_sold += q
-                            quote_got += q * p
-                        exit_price = (quote_got / base_sold) if base_sold > 0 else None
-
-                        with conn.cursor() as cur:
-                            cur.execute(
-                                """
-                                UPDATE binance_position
-                                SET status='closed',
-                                    exit_order_id=%s,
-                                    exit_price=%s,
-                                    exit_quote_qty=%s,
-                                    pnl_quote=(%s - COALESCE(entry_quote_qty,0)),
-                                    raw_json = COALESCE(raw_json,'{}'::jsonb) || %s::jsonb
-                                WHERE id=%s
-                                """,
-                                (
-                                    str(sell_resp.get('orderId')),
-                                    exit_price,
-                                    quote_got,
-                                    quote_got,
-                                    __import__('json').dumps({'exit_reason': reason, 'last_close': last_close}),
-                                    int(pid),
-                                ),
-                            )
-                            cur.execute(
-                                """
-                                INSERT INTO binance_order(symbol, side, status, order_id, quote_qty, base_qty, price, position_id, raw_response_json)
-                                VALUES (%s,'SELL','submitted',%s,%s,%s,%s,%s,%s::jsonb)
-                                """,
-                                (
-                                    sym,
-                                    str(sell_resp.get('orderId')),
-                                    quote_got,
-                                    float(base_sold) if base_sold else None,
-                                    exit_price,
-                                    int(pid),
-                                    __import__('json').dumps(sell_resp),
-                                ),
-                            )
-                            conn.commit()
+                    # Symbols the stream doesn't cover: one price read per symbol, not per position.
+                    for sym in exits.symbols():
+                        if feed is None or not feed.is_fresh(sym):
+                            try:
+                                exits.on_price(sym, _last_close(api, None, sym, interval, PRIORITY_HIGH))
+                            except Exception as e:
+                                logger.warning("exit price failed sym=%s: %s", sym, e)
+                    orders = exits.drain()
+                    if orders:
+                        _sell_positions(orders_api, aapi, fanout_loop, conn, sym_filters, orders, exits, ledger)
                 except Exception as e:
                     logger.warning("exit loop error: %s", e)
 
-            for sym in symbols:
-                kl = api.klines(sym, interval, limit=200)
-                closes = [float(k[4]) for k in kl]
-
-                # compute indicators for logging
-                from indicators import ema as _ema, rsi as _rsi
-
-                ef = _ema(closes, ema_fast)
-                es = _ema(closes, ema_slow)
-                rv = _rsi(closes, rsi_period)
-
-                # Always store indicator snapshot so we can inspect "trend" even when no trade happens.
-                with conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        INSERT INTO binance_indicator_point(symbol, interval, close, ema_fast, ema_slow, rsi, blog_ma_score, blog_rsi_score, raw_json)
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s::jsonb)
-                        """,
-                        (
-                            sym,
-                            interval,
-                            float(closes[-1]),
-                            float(ef) if ef is not None else None,
-                            float(es) if es is not None else None,
-                            float(rv) if rv is not None else None,
-                            float(ma_score),
-                            float(rsi_score),
-                            json.dumps({"last_kline": kl[-1]}),
-                        ),
+            scanned: dict[str, list | Exception] = {}
+            if "universe" in due and scanner is not None:
+                try:
+                    ranked = scanner.scan(
+                        ema_fast=ema_fast,
+                        ema_slow=ema_slow,
+                        rsi_period=rsi_period,
+                        blog_ma_score=ma_score,
+                        blog_rsi_score=rsi_score,
                     )
-                    conn.commit()
-
-                sig = decide_signal(
-                    closes,
-                    ema_fast=ema_fast,
-                    ema_slow=ema_slow,
-                    rsi_period=rsi_period,
-                    blog_ma_score=ma_score,
-                    blog_rsi_score=rsi_score,
-                    tp_pct=tp_pct,
-                    sl_pct=sl_pct,
-                    min_score=min_score,
-                    always_buy=(testnet_always_buy and enable),
-                )
-                if not sig:
-                    continue
+                    active = list(dict.fromkeys(pinned + [c.symbol for c in ranked[:universe_top_n]]))
+                    sym_filters.add_symbols(active)
+                    active = [s for s in active if s in sym_filters]
+                    if active != symbols:
+                        logger.info("universe: %s", [(c.symbol, round(c.score, 3)) for c in ranked[:universe_top_n]])
+                    symbols[:] = active
+                    scanned = scanner.last_klines
+                except Exception as e:
+                    logger.warning("universe scan failed: %s", e)
+
+            if "signal" not in due:
+                continue
+            if due["signal"].stale:
+                # Too long after the candle close: the price has moved on, wait for the next close.
+                logger.warning("skip stale signal run: %sms after the slot", due["signal"].late_ms)
+                continue
+
+            # Daily cap / open positions come from the in-memory ledger; the DB is only re-read on its timer.
+            try:
+                ledger.maybe_reconcile(conn)
+            except Exception as e:
+                logger.warning("exposure reconcile failed: %s", e)
+                conn.rollback()
+
+            # Concurrent fan-out: one flight of klines requests for every symbol the stream doesn't cover.
+            # Rows the universe scan fetched this slot are reused (no store: the store wants increments).
+            prefetched: dict[str, list | Exception] = {
+                s: rows for s, rows in scanned.items() if s in symbols and s not in stores and isinstance(rows, list)
+            }
+            if aapi is not None:
+                need = [
+                    s
+                    for s in symbols
+                    if s not in prefetched
+                    and not (feed is not None and feed.is_fresh(s))
+                    and (leases is None or leases.owns(s))
+                ]
+                if need:
+                    if stores:
+                        # incremental: only candles after each store's last close
+                        starts = {s: stores[s].next_start_time() for s in need}
+                        fetch = aapi.klines_many(need, interval, KLINE_PAGE, start_times=starts, priority=PRIORITY_NORMAL)
+                    else:
+                        fetch = aapi.klines_many(need, interval, limit=200, priority=PRIORITY_NORMAL)
+                    prefetched = fanout_loop.run_until_complete(fetch)
 
-                # cooldown
-                if time.time() - last_trade_ts < 60:
+            for sym in symbols:
+                if leases is not None and not leases.owns(sym):
                     continue
-
-                last_price = Decimal(str(closes[-1]))
-                step, tick = sym_filters[sym]
-
-                # Determine quote amount respecting exchange minimum notional.
-                # Add buffer to make OCO legs pass NOTIONAL too.
-                quote_to_use = max_per
-                if quote_to_use < (min_notional_floor + min_notional_buffer):
-                    quote_to_use = (min_notional_floor + min_notional_buffer)
-
-                # When running testnet_no_oco, we prefer limiting concurrent exposure over daily spent.
-                if not testnet_no_oco:
-                    if spent_today + quote_to_use > daily_cap:
+                try:
+                    kl = _symbol_klines(api, sym, interval, feed=feed, store=stores.get(sym), prefetched=prefetched)
+                    closes = [float(k[4]) for k in kl]
+
+                    # Indicators once per symbol per tick (O(1) per closed candle), shared by
+                    # the snapshot rows and decide_signal. Unchanged open candle -> cached values.
+                    ind = ind_sets.get(sym)
+                    if ind is None:
+                        ind = ind_sets[sym] = IndicatorSet(ema_fast, ema_slow, rsi_period)
+                    live = kl[-1]
+                    obs = ind_cache.observe(sym, interval, int(live[0]), float(live[4]))
+                    if obs.changed:
+                        advanced_from = ind.last_open_time
+                        ef, es, rv = ind.sync(kl)
+                        ind_cache.remember(sym, interval, (ef, es, rv))
+                        if ind_state_path and ind.last_open_time != advanced_from:
+                            save_indicator_sets(ind_state_path, ind_sets)
+                    else:
+                        ef, es, rv = obs.values
+
+                    # Indicator rows: one final row per closed candle (+ optional sparse samples),
+                    # instead of one row per poll.
+                    if obs.closed_open_time is not None and len(kl) >= 2:
+                        final = (ind.ema_fast.value, ind.ema_slow.value, ind.rsi.value)
+                        _insert_indicator_point(conn, writer, sym, interval, kl[-2], final, ma_score, rsi_score, closed=True)
+                    if obs.sample_due:
+                        _insert_indicator_point(conn, writer, sym, interval, live, (ef, es, rv), ma_score, rsi_score, closed=False)
+
+                    sig = decide_signal(
+                        closes,
+                        ema_fast=ema_fast,
+                        ema_slow=ema_slow,
+                        rsi_period=rsi_period,
+                        blog_ma_score=ma_score,
+                        blog_rsi_score=rsi_score,
+                        tp_pct=tp_pct,
+                        sl_pct=sl_pct,
+                        min_score=min_score,
+                        always_buy=(testnet_always_buy and enable),
+                        values=(ef, es, rv),
+                    )
+                    if not sig:
                         continue
-                else:
-                    if max_open_positions > 0:
-                        with conn.cursor() as cur:
-                            cur.execute("SELECT COUNT(*)::int FROM binance_position WHERE status='open'")
-                            open_n = int(cur.fetchone()[0] or 0)
-                        if open_n >= max_open_positions:
-                            continue
 
-                # Submit BUY
-                run_id = str(uuid.uuid4())
+                    # cooldown
+                    if time.time() - last_trade_ts < 60:
+                        continue
 
-                evidence = {
-                    "signal": sig.__dict__,
-                    "blog_ma": ma_score,
-                    "blog_rsi": rsi_score,
-                    "last_close": float(last_price),
-                    "quote_to_use": float(quote_to_use),
-                }
+                    last_price = Decimal(str(closes[-1]))
+                    filt = sym_filters[sym]
+                    step, tick = filt.step, filt.tick
+
+                    # Determine quote amount respecting exchange minimum notional
+                    # (MIN_NOTIONAL_FLOOR stays as an extra lower bound).
+                    # Add buffer to make OCO legs pass NOTIONAL too.
+                    min_notional = max(filt.min_notional, min_notional_floor)
+                    quote_to_use = max_per
+                    if quote_to_use < (min_notional + min_notional_buffer):
+                        quote_to_use = (min_notional + min_notional_buffer)
+
+                    # When running testnet_no_oco, we prefer limiting concurrent exposure over daily spent.
+                    if not testnet_no_oco:
+                        if not ledger.can_spend(float(quote_to_use), float(daily_cap)):
+                            continue
+                    else:
+                        if max_open_positions > 0 and ledger.open_count() >= max_open_positions:
+                            continue
 
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "INSERT INTO binance_signal(symbol, kind, score, evidence_json) VALUES (%s,%s,%s,%s::jsonb)",
+                    # Slippage gate: slippage may eat at most MAX_SLIPPAGE_SHARE of the TP edge.
+                    # Shrink the entry to what the book can absorb within that, or skip it.
+                    book_est = None
+                    if depth is not None:
+                        max_slip = tp_pct * max_slippage_share
+                        book_est = depth.estimate_buy(sym, float(quote_to_use), max_slip)
+                        if book_est is None:
+                            logger.info("no synced book for %s: entry not slippage-checked", sym)
+                        elif (
+                            book_est.slippage_pct is None
+                            or book_est.slippage_pct > max_slip
+                            or book_est.quote < float(quote_to_use)  # book thinner than the order
+                        ):
+                            shrunk = Decimal(str(book_est.max_quote)).quantize(Decimal("0.01"), rounding=ROUND_DOWN)
+                            if shrunk < (min_notional + min_notional_buffer):
+                                logger.info(
+                                    "skip %s: est slippage %s > %.4f%% (spread %.4f%%)",
+                                    sym,
+                                    "n/a" if book_est.slippage_pct is None else f"{book_est.slippage_pct * 100:.4f}%",
+                                    max_slip * 100,
+                                    book_est.spread_pct * 100,
+                                )
+                                continue
+                            logger.info("shrink %s entry %s -> %s for slippage", sym, quote_to_use, shrunk)
+                            quote_to_use = shrunk
+
+                    # Submit BUY
+                    run_id = str(uuid.uuid4())
+
+                    evidence = {
+                        "signal": sig.__dict__,
+                        "blog_ma": ma_score,
+                        "blog_rsi": rsi_score,
+                        "last_close": float(last_price),
+                        "quote_to_use": float(quote_to_use),
+                    }
+                    if book_est is not None:
+                        evidence["book"] = {
+                            "mid": book_est.mid,
+                            "spread_pct": book_est.spread_pct,
+                            "est_vwap": book_est.vwap,
+                            "est_slippage_pct": book_est.slippage_pct,
+                        }
+
+                    _write_row(
+                        conn,
+                        writer,
+                        "binance_signal",
+                        ("symbol", "kind", "score", "evidence_json"),
                         (sym, sig.kind, float(sig.score), json.dumps(evidence)),
                     )
-                    conn.commit()
 
-                if not enable:
-                    continue
+                    if not enable:
+                        continue
 
-                client_tag = f"auto-{run_id[:8]}"
-                req = {"symbol": sym, "quote": float(max_per), "tag": client_tag, **evidence}
-
-                with conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        INSERT INTO binance_order(symbol, side, status, quote_qty, raw_request_json)
-                        VALUES (%s,'BUY','created',%s,%s::jsonb)
-                        RETURNING id
-                        """,
-                        (sym, float(quote_to_use), json.dumps(req)),
-                    )
-                    oid_row = cur.fetchone()
-                    order_row_id = oid_row[0]
-                    conn.commit()
+                    client_tag = f"auto-{run_id[:8]}"
+                    req = {"symbol": sym, "quote": float(max_per), "tag": client_tag, **evidence}
 
-                try:
-                    resp = api.new_order_market_buy_quote(sym, float(quote_to_use))
-                    # derive filled base qty & avg price
-                    fills = resp.get("fills") or []
-                    base_qty = Decimal("0")
-                    quote_spent = Decimal("0")
-                    for f in fills:
-                        base_qty += Decimal(str(f.get("qty")))
-                        quote_spent += Decimal(str(f.get("qty"))) * Decimal(str(f.get("price")))
-                    if base_qty <= 0:
-                        base_qty = Decimal(str(resp.get("executedQty") or "0"))
-                    avg_price = (quote_spent / base_qty) if (base_qty and quote_spent) else last_price
-
-                    # OCO sell
-                    tp_price = _quantize(avg_price * (Decimal("1") + Decimal(str(sig.target_pct))), tick)
-                    sl_price = _quantize(avg_price * (Decimal("1") - Decimal(str(sig.stop_pct))), tick)
-                    sl_limit = _quantize(sl_price * Decimal("0.999"), tick)
-
-                    qty = _quantize(base_qty, step)
-                    if qty <= 0:
-                        raise RuntimeError("computed qty <= 0")
-
-                    # Binance requires strings with correct precision
-                    def fmt_dec(d: Decimal) -> str:
-                        s = format(d, 'f')
-                        # strip trailing zeros
-                        if '.' in s:
-                            s = s.rstrip('0').rstrip('.')
-                        return s
-
-                    if testnet_no_oco:
-                        # Create a position record and plan an exit after HOLD_SECONDS.
-                        planned_exit_sql = "now() + (%s || ' seconds')::interval"
+                    if leases is not None:
+                        # Global limits across shards: checked and reserved atomically in the DB.
+                        if not leases.owns(sym):
+                            continue
+                        order_row_id = reserve_buy(
+                            conn,
+                            sym,
+                            float(quote_to_use),
+                            json.dumps(req),
+                            daily_cap=None if testnet_no_oco else float(daily_cap),
+                            max_open_positions=max_open_positions if testnet_no_oco else None,
+                        )
+                        if order_row_id is None:
+                            logger.info("skip %s: global exposure limit reached", sym)
+                            continue
+                    else:
                         with conn.cursor() as cur:
                             cur.execute(
-                                f"""
-                                INSERT INTO binance_position(symbol, entry_order_id, entry_price, entry_base_qty, entry_quote_qty, target_exit_price, stop_exit_price, planned_exit_at, raw_json)
-                                VALUES (%s,%s,%s,%s,%s,%s,%s,{planned_exit_sql},%s::jsonb)
+                                """
+                                INSERT INTO binance_order(symbol, side, status, quote_qty, raw_request_json)
+                                VALUES (%s,'BUY','created',%s,%s::jsonb)
                                 RETURNING id
                                 """,
-                                (
-                                    sym,
-                                    str(resp.get('orderId')),
-                                    float(avg_price),
-                                    float(qty),
-                                    float(quote_to_use),
-                                    float(tp_price),
-                                    float(sl_price),
-                                    str(hold_seconds),
-                                    json.dumps({"buy": resp, "mode": "testnet_no_oco"}),
-                                ),
+                                (sym, float(quote_to_use), json.dumps(req)),
                             )
-                            pos_id = int(cur.fetchone()[0])
+                            oid_row = cur.fetchone()
+                            order_row_id = oid_row[0]
+                            conn.commit()
 
-                            cur.execute(
-                                """
-                                UPDATE binance_order
-                                SET status='submitted',
-                                    order_id=%s,
-                                    base_qty=%s,
-                                    price=%s,
-                                    take_profit_price=%s,
-                                    stop_loss_price=%s,
-                                    stop_limit_price=%s,
-                                    position_id=%s,
-                                    raw_response_json=%s::jsonb
-                                WHERE id=%s
-                                """,
-                                (
-                                    str(resp.get("orderId")),
-                                    float(qty),
-                                    float(avg_price),
-                                    float(tp_price),
-                                    float(sl_price),
-                                    float(sl_limit),
-                                    pos_id,
-                                    json.dumps({"buy": resp}),
-                                    order_row_id,
-                                ),
+                    try:
+                        t_submit = time.perf_counter()
+                        resp = orders_api.new_order_market_buy_quote(sym, float(quote_to_use))
+                        logger.info("buy %s submitted in %.1fms", sym, (time.perf_counter() - t_submit) * 1000.0)
+                        # derive filled base qty & avg price
+                        fills = resp.get("fills") or []
+                        base_qty = Decimal("0")
+                        quote_spent = Decimal("0")
+                        for f in fills:
+                            base_qty += Decimal(str(f.get("qty")))
+                            quote_spent += Decimal(str(f.get("qty"))) * Decimal(str(f.get("price")))
+                        if base_qty <= 0:
+                            base_qty = Decimal(str(resp.get("executedQty") or "0"))
+                        avg_price = (quote_spent / base_qty) if (base_qty and quote_spent) else last_price
+
+                        # OCO sell
+                        tp_price = _quantize(avg_price * (Decimal("1") + Decimal(str(sig.target_pct))), tick)
+                        sl_price = _quantize(avg_price * (Decimal("1") - Decimal(str(sig.stop_pct))), tick)
+                        sl_limit = _quantize(sl_price * Decimal("0.999"), tick)
+
+                        qty = _quantize(base_qty, step)
+                        if qty <= 0:
+                            raise RuntimeError("computed qty <= 0")
+
+                        # Binance requires strings with correct precision
+                        def fmt_dec(d: Decimal) -> str:
+                            s = format(d, 'f')
+                            # strip trailing zeros
+                            if '.' in s:
+                                s = s.rstrip('0').rstrip('.')
+                            return s
+
+                        if testnet_no_oco:
+                            # Create a position record and plan an exit after HOLD_SECONDS.
+                            planned_exit_sql = "now() + (%s || ' seconds')::interval"
+                            with conn.cursor() as cur:
+                                cur.execute(
+                                    f"""
+                                    INSERT INTO binance_position(symbol, entry_order_id, entry_price, entry_base_qty, entry_quote_qty, target_exit_price, stop_exit_price, planned_exit_at, raw_json)
+                                    VALUES (%s,%s,%s,%s,%s,%s,%s,{planned_exit_sql},%s::jsonb)
+                                    RETURNING id
+                                    """,
+                                    (
+                                        sym,
+                                        str(resp.get('orderId')),
+                                        float(avg_price),
+                                        float(qty),
+                                        float(quote_to_use),
+                                        float(tp_price),
+                                        float(sl_price),
+                                        str(hold_seconds),
+                                        json.dumps({"buy": resp, "mode": "testnet_no_oco"}),
+                                    ),
+                                )
+                                pos_id = int(cur.fetchone()[0])
+
+                                cur.execute(
+                                    """
+                                    UPDATE binance_order
+                                    SET status='submitted',
+                                        order_id=%s,
+                                        base_qty=%s,
+                                        price=%s,
+                                        take_profit_price=%s,
+                                        stop_loss_price=%s,
+                                        stop_limit_price=%s,
+                                        position_id=%s,
+                                        raw_response_json=%s::jsonb
+                                    WHERE id=%s
+                                    """,
+                                    (
+                                        str(resp.get("orderId")),
+                                        float(qty),
+                                        float(avg_price),
+                                        float(tp_price),
+                                        float(sl_price),
+                                        float(sl_limit),
+                                        pos_id,
+                                        json.dumps({"buy": resp}),
+                                        order_row_id,
+                                    ),
+                                )
+                                conn.commit()
+                            ledger.open_position(pos_id, sym, float(quote_to_use))
+                            exits.add(
+                                OpenPosition(
+                                    id=pos_id,
+                                    symbol=sym,
+                                    base_qty=float(qty),
+                                    tp=float(tp_price),
+                                    sl=float(sl_price),
+                                    planned_exit_ms=int(time.time() * 1000) + hold_seconds * 1000,
+                                )
                             )
-                            conn.commit()
 
-                    else:
-                        oco = api.new_oco_sell(
-                            sym,
-                            quantity=fmt_dec(qty),
-                            price=fmt_dec(tp_price),
-                            stop_price=fmt_dec(sl_price),
-                            stop_limit_price=fmt_dec(sl_limit),
-                        )
+                        else:
+                            oco = orders_api.new_oco_sell(
+                                sym,
+                                quantity=fmt_dec(qty),
+                                price=fmt_dec(tp_price),
+                                stop_price=fmt_dec(sl_price),
+                                stop_limit_price=fmt_dec(sl_limit),
+                            )
+                            oco_list_id = (
+                                str(oco.get("orderListId")) if isinstance(oco, dict) and oco.get("orderListId") is not None else None
+                            )
+                            pos_id = None
 
+                            with conn.cursor() as cur:
+                                cur.execute(
+                                    """
+                                    UPDATE binance_order
+                                    SET status='submitted',
+                                        order_id=%s,
+                                        base_qty=%s,
+                                        price=%s,
+                                        take_profit_price=%s,
+                                        stop_loss_price=%s,
+                                        stop_limit_price=%s,
+                                        oco_order_list_id=%s,
+                                        raw_response_json=%s::jsonb
+                                    WHERE id=%s
+                                    """,
+                                    (
+                                        str(resp.get("orderId")),
+                                        float(qty),
+                                        float(avg_price),
+                                        float(tp_price),
+                                        float(sl_price),
+                                        float(sl_limit),
+                                        oco_list_id,
+                                        json.dumps({"buy": resp, "oco": oco}),
+                                        order_row_id,
+                                    ),
+                                )
+                                # With the user stream on, the OCO's fill closes this position (realized PnL).
+                                if ustream is not None and oco_list_id is not None:
+                                    cur.execute(
+                                        """
+                                        INSERT INTO binance_position(symbol, entry_order_id, entry_price, entry_base_qty, entry_quote_qty, target_exit_price, stop_exit_price, oco_order_list_id, raw_json)
+                                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s::jsonb)
+                                        RETURNING id
+                                        """,
+                                        (
+                                            sym,
+                                            str(resp.get('orderId')),
+                                            float(avg_price),
+                                            float(qty),
+                                            float(quote_to_use),
+                                            float(tp_price),
+                                            float(sl_price),
+                                            oco_list_id,
+                                            json.dumps({"buy": resp, "oco": oco}),
+                                        ),
+                                    )
+                                    pos_id = int(cur.fetchone()[0])
+                                    cur.execute("UPDATE binance_order SET position_id=%s WHERE id=%s", (pos_id, order_row_id))
+                                conn.commit()
+                            if pos_id is not None:
+                                ledger.open_position(pos_id, sym, float(quote_to_use))
+
+                        ledger.record_order(sym, float(quote_to_use))
+                        last_trade_ts = time.time()
+
+                    except Exception as e:
                         with conn.cursor() as cur:
                             cur.execute(
-                                """
-                                UPDATE binance_order
-                                SET status='submitted',
-                                    order_id=%s,
-                                    base_qty=%s,
-                                    price=%s,
-                                    take_profit_price=%s,
-                                    stop_loss_price=%s,
-                                    stop_limit_price=%s,
-                                    oco_order_list_id=%s,
-                                    raw_response_json=%s::jsonb
-                                WHERE id=%s
-                                """,
-                                (
-                                    str(resp.get("orderId")),
-                                    float(qty),
-                                    float(avg_price),
-                                    float(tp_price),
-                                    float(sl_price),
-                                    float(sl_limit),
-                                    str(oco.get("orderListId")) if isinstance(oco, dict) and oco.get("orderListId") is not None else None,
-                                    json.dumps({"buy": resp, "oco": oco}),
-                                    order_row_id,
-                                ),
+                                "UPDATE binance_order SET status='error', error=%s WHERE id=%s",
+                                (str(e), order_row_id),
                             )
                             conn.commit()
-
-                    last_trade_ts = time.time()
-
+                except RateLimitedError as e:
+                    logger.info("skip %s this tick: %s", sym, e)
                 except Exception as e:
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            "UPDATE binance_order SET status='error', error=%s WHERE id=%s",
-                            (str(e), order_row_id),
-                        )
-                        conn.commit()
+                    # Isolate per-symbol failures: the remaining symbols still run this tick.
+                    logger.warning("symbol %s error: %s", sym, e)
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
 
         except Exception as e:
             logger.warning("loop error: %s", e)
 
-        dt = time.time() - t0
-        time.sleep(max(1, poll - dt))
-
 
 if __name__ == "__main__":
     main()
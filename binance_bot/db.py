@@ -3,6 +3,8 @@ from __future__ import annotations
 import os
 import psycopg
 
+from migrate import migrate
+
 
 def connect():
     url = os.getenv("DATABASE_URL")
@@ -11,162 +13,27 @@ def connect():
     return psycopg.connect(url)
 
 
-def init_db(conn):
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS binance_bot_run (
-              id BIGSERIAL PRIMARY KEY,
-              run_id TEXT UNIQUE,
-              started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              status TEXT NOT NULL DEFAULT 'running',
-              error TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS binance_signal (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              symbol TEXT NOT NULL,
-              kind TEXT NOT NULL, -- ema_cross | rsi_dip
-              score DOUBLE PRECISION NOT NULL,
-              evidence_json JSONB
-            );
-
-            CREATE TABLE IF NOT EXISTS binance_indicator_point (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              symbol TEXT NOT NULL,
-              interval TEXT NOT NULL,
-              close DOUBLE PRECISION NOT NULL,
-              ema_fast DOUBLE PRECISION,
-              ema_slow DOUBLE PRECISION,
-              rsi DOUBLE PRECISION,
-              blog_ma_score DOUBLE PRECISION,
-              blog_rsi_score DOUBLE PRECISION,
-              raw_json JSONB
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_binance_ind_symbol_time ON binance_indicator_point(symbol, created_at);
-
-            CREATE TABLE IF NOT EXISTS binance_balance_snapshot (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              total_usdt_est DOUBLE PRECISION,
-              raw_json JSONB
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_binance_bal_time ON binance_balance_snapshot(created_at);
+def open_pool(*, min_size: int = 1, max_size: int = 4, timeout: float = 30.0):
+    """Connection pool (psycopg_pool) that replaces connections broken by a DB restart."""
+    from psycopg_pool import ConnectionPool
 
-            CREATE TABLE IF NOT EXISTS binance_order (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              symbol TEXT NOT NULL,
-              side TEXT NOT NULL,
-              order_id TEXT,
-              status TEXT NOT NULL,
-              quote_qty DOUBLE PRECISION,
-              base_qty DOUBLE PRECISION,
-              price DOUBLE PRECISION,
-              take_profit_price DOUBLE PRECISION,
-              stop_loss_price DOUBLE PRECISION,
-              stop_limit_price DOUBLE PRECISION,
-              oco_order_list_id TEXT,
-              position_id BIGINT,
-              raw_request_json JSONB,
-              raw_response_json JSONB,
-              error TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS binance_position (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              symbol TEXT NOT NULL,
-              status TEXT NOT NULL DEFAULT 'open',
-              entry_order_id TEXT,
-              exit_order_id TEXT,
-              entry_price DOUBLE PRECISION,
-              entry_base_qty DOUBLE PRECISION,
-              entry_quote_qty DOUBLE PRECISION,
-              target_exit_price DOUBLE PRECISION,
-              stop_exit_price DOUBLE PRECISION,
-              planned_exit_at TIMESTAMPTZ,
-              exit_price DOUBLE PRECISION,
-              exit_quote_qty DOUBLE PRECISION,
-              pnl_quote DOUBLE PRECISION,
-              raw_json JSONB
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_binance_pos_created ON binance_position(created_at);
-            CREATE INDEX IF NOT EXISTS idx_binance_pos_status ON binance_position(status);
-            """
-        )
-
-    # Safe schema evolution + indexes
-    with conn.cursor() as cur:
-        cur.execute("ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS take_profit_price DOUBLE PRECISION")
-        cur.execute("ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS stop_loss_price DOUBLE PRECISION")
-        cur.execute("ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS stop_limit_price DOUBLE PRECISION")
-        cur.execute("ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS oco_order_list_id TEXT")
-        cur.execute("ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS position_id BIGINT")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_binance_order_created ON binance_order(created_at)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_binance_order_symbol ON binance_order(symbol)")
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is required")
+    pool = ConnectionPool(url, min_size=min_size, max_size=max_size, timeout=timeout, name="binance", open=False)
+    pool.open(wait=True, timeout=timeout)
+    return pool
 
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS binance_position (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              symbol TEXT NOT NULL,
-              status TEXT NOT NULL DEFAULT 'open',
-              entry_order_id TEXT,
-              exit_order_id TEXT,
-              entry_price DOUBLE PRECISION,
-              entry_base_qty DOUBLE PRECISION,
-              entry_quote_qty DOUBLE PRECISION,
-              target_exit_price DOUBLE PRECISION,
-              stop_exit_price DOUBLE PRECISION,
-              planned_exit_at TIMESTAMPTZ,
-              exit_price DOUBLE PRECISION,
-              exit_quote_qty DOUBLE PRECISION,
-              pnl_quote DOUBLE PRECISION,
-              raw_json JSONB
-            )
-            """
-        )
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_binance_pos_created ON binance_position(created_at)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_binance_pos_status ON binance_position(status)")
 
-        # indicator table evolution
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS binance_indicator_point (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              symbol TEXT NOT NULL,
-              interval TEXT NOT NULL,
-              close DOUBLE PRECISION NOT NULL,
-              ema_fast DOUBLE PRECISION,
-              ema_slow DOUBLE PRECISION,
-              rsi DOUBLE PRECISION,
-              blog_ma_score DOUBLE PRECISION,
-              blog_rsi_score DOUBLE PRECISION,
-              raw_json JSONB
-            )
-            """
-        )
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_binance_ind_symbol_time ON binance_indicator_point(symbol, created_at)")
+def healthy_conn(pool, conn):
+    """`conn` if still usable; else hand it back (the pool discards it) and check out a fresh one."""
+    if conn is not None and not conn.broken and not conn.closed:
+        return conn
+    if conn is not None:
+        pool.putconn(conn)
+    return pool.getconn()
 
-        # balance snapshots
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS binance_balance_snapshot (
-              id BIGSERIAL PRIMARY KEY,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-              total_usdt_est DOUBLE PRECISION,
-              raw_json JSONB
-            )
-            """
-        )
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_binance_bal_time ON binance_balance_snapshot(created_at)")
 
-    conn.commit()
+def init_db(conn):
+    """Bring the schema up to date (migrations/NNNN_*.sql); a single SELECT when it already is."""
+    migrate(conn)
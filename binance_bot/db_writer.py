@@ -0,0 +1,221 @@
+"""Write-behind batching for non-critical rows (indicator points, signals, snapshots).
+
+Rows are queued from the trading thread without touching the DB. A background
+thread with its own connection groups them per table and flushes them with
+COPY once `batch_size` rows are pending or the oldest pending row is
+`flush_seconds` old.
+
+Memory is bounded. When the queue is full, new rows are dropped and counted,
+and the trading thread never blocks on them. If a flush fails, its rows are
+retried on the next flush, and if more than `max_rows` are pending the oldest
+are dropped. If COPY rejects a table's batch for its data (bad value,
+constraint), that table is retried row by row and only the rejected rows
+are dropped (logged, counted in `rejected`). `close()` drains the queue
+with a final flush; the daemon calls it at exit.
+
+Orders and positions are NOT written through here: they stay synchronous.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import psycopg
+
+logger = logging.getLogger("binance_db_writer")
+
+# Errors caused by the rows themselves: retrying the same batch can never succeed.
+_REJECTED = (psycopg.errors.DataError, psycopg.errors.IntegrityError)
+
+_CLOSE = object()
+_FLUSH = object()
+
+
+def insert_row(conn, table: str, columns: tuple[str, ...], row: tuple) -> None:
+    """Synchronous single-row insert (the path without write-behind)."""
+    sql = f"INSERT INTO {table}({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    with conn.cursor() as cur:
+        cur.execute(sql, row)
+        conn.commit()
+
+
+class WriteBehind:
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        *,
+        batch_size: int = 500,
+        flush_seconds: float = 2.0,
+        max_rows: int = 20000,
+    ):
+        self._connect = connect
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = float(flush_seconds)
+        self.max_rows = max(self.batch_size, int(max_rows))
+        self._q: queue.Queue = queue.Queue(maxsize=self.max_rows)
+        self._pending: dict[tuple[str, tuple[str, ...]], list[tuple]] = {}
+        self._n_pending = 0
+        self._oldest: Optional[float] = None
+        self._conn = None
+        self._flushed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0  # rows the DB refused (bad value, constraint), dropped after a row-by-row retry
+        self.failed_flushes = 0
+
+    def start(self) -> "WriteBehind":
+        self._thread.start()
+        return self
+
+    def add(self, table: str, columns: tuple[str, ...], row: tuple) -> bool:
+        """Queue one row (created_at is stamped now). False if it was dropped."""
+        item = (table, ("created_at",) + tuple(columns), (datetime.now(timezone.utc),) + tuple(row))
+        try:
+            self._q.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("write-behind queue full: dropped=%s", self.dropped)
+            return False
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Ask the writer to flush everything queued so far; wait for it."""
+        if not self._thread.is_alive():
+            return False
+        self._flushed.clear()
+        self._q.put(_FLUSH)
+        return self._flushed.wait(timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Drain the queue, flush, and stop (durable shutdown)."""
+        if not self._thread.is_alive():
+            return
+        self._q.put(_CLOSE)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("write-behind close timed out: pending=%s", self._n_pending + self._q.qsize())
+
+    # ---- writer thread ----
+
+    def _take(self, item) -> None:
+        table, cols, row = item
+        self._pending.setdefault((table, cols), []).append(row)
+        self._n_pending += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            timeout = self.flush_seconds
+            if self._oldest is not None:
+                timeout = max(0.0, self._oldest + self.flush_seconds - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _CLOSE or item is _FLUSH:
+                while True:  # everything queued before the marker
+                    try:
+                        nxt = self._q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is not _CLOSE and nxt is not _FLUSH:
+                        self._take(nxt)
+                self._flush()
+                self._flushed.set()
+                if item is _CLOSE:
+                    if self._conn is not None:
+                        try:
+                            self._conn.close()
+                        except Exception:
+                            pass
+                    return
+                continue
+            if item is not None:
+                self._take(item)
+            if self._n_pending >= self.batch_size or (
+                self._oldest is not None and time.monotonic() - self._oldest >= self.flush_seconds
+            ):
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._n_pending:
+            return
+        try:
+            if self._conn is None or self._conn.closed:
+                self._conn = self._connect()
+            for key in list(self._pending):
+                self._flush_table(key)
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.warning("write-behind flush failed (pending=%s): %s", self._n_pending, e)
+            try:
+                self._conn.rollback()
+            except Exception:
+                self._conn = None
+            self._trim()
+            self._oldest = time.monotonic()  # retry after another flush interval
+            return
+        self._oldest = None
+
+    def _flush_table(self, key: tuple[str, tuple[str, ...]]) -> None:
+        """COPY one table's rows (own transaction). If COPY rejects the data, fall back to row by row."""
+        table, cols = key
+        rows = self._pending[key]
+        try:
+            with self._conn.cursor() as cur:
+                with cur.copy(f"COPY {table} ({', '.join(cols)}) FROM STDIN") as cp:
+                    for row in rows:
+                        cp.write_row(row)
+            self._conn.commit()
+            self.written += len(rows)
+        except _REJECTED as e:
+            self._conn.rollback()
+            logger.warning("write-behind COPY into %s rejected (%s): retrying %s rows one by one", table, e, len(rows))
+            self._insert_rows(table, cols, rows)
+        del self._pending[key]
+        self._n_pending -= len(rows)
+
+    def _insert_rows(self, table: str, cols: tuple[str, ...], rows: list[tuple]) -> None:
+        """Insert rows one transaction each; rows the DB rejects are dropped and logged.
+
+        Any other error (connection lost) propagates. The rows done so far are
+        removed from the pending list first, so a retry doesn't duplicate them.
+        """
+        sql = f"INSERT INTO {table}({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})"
+        done = 0
+        try:
+            for row in rows:
+                try:
+                    with self._conn.cursor() as cur:
+                        cur.execute(sql, row)
+                    self._conn.commit()
+                    self.written += 1
+                except _REJECTED as e:
+                    self._conn.rollback()
+                    self.rejected += 1
+                    logger.warning("write-behind dropped a row rejected by %s: %s row=%r", table, e, row)
+                done += 1
+        except Exception:
+            del rows[:done]
+            self._n_pending -= done
+            raise
+
+    def _trim(self) -> None:
+        """Drop the oldest pending rows beyond max_rows (DB down for a long time)."""
+        over = self._n_pending - self.max_rows
+        for rows in self._pending.values():
+            if over <= 0:
+                break
+            cut = min(over, len(rows))
+            del rows[:cut]
+            over -= cut
+            self._n_pending -= cut
+            self.dropped += cut
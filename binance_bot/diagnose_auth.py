@@ -20,6 +20,8 @@ def main() -> None:
 
     print("base_url:", base_url)
     print("server_time:", api.server_time())
+    api.clock.sync()
+    print("clock offset_ms: %.1f sync_error_ms: %.1f recvWindow: %s" % (api.clock.offset_ms, api.clock.error_ms, api.recv_window))
     print("klines BTCUSDT len:", len(api.klines("BTCUSDT", os.getenv("INTERVAL") or "15m", limit=3)))
 
     # Signed endpoint
@@ -0,0 +1,197 @@
+"""Event-driven exits for no-OCO positions (TESTNET_NO_OCO).
+
+Open positions are kept in memory:
+- per symbol, TP levels sorted descending and SL levels sorted ascending, so
+  one price update pops exactly the positions it crosses;
+- a min-heap on planned exit time, fired from the local clock.
+
+Price updates come from the kline stream (any thread). Triggered positions
+wait in a queue until the daemon drains them and sells them as one batch.
+There are no per-position HTTP calls or SQL queries.
+
+Removed positions are deleted lazily: stale index entries are skipped when
+they are popped.
+
+A sell that fails goes back through retry(). The order is parked, outside
+the price indexes, and drained again after an exponential backoff. A
+persistent error (balance, LOT_SIZE) is retried at a bounded rate instead
+of in a tight loop.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class OpenPosition:
+    id: int
+    symbol: str
+    base_qty: float
+    tp: Optional[float]
+    sl: Optional[float]
+    planned_exit_ms: Optional[int]
+
+
+@dataclass(frozen=True)
+class ExitOrder:
+    position: OpenPosition
+    reason: str  # tp_hit | sl_hit | timeout
+    last_price: Optional[float]
+    attempt: int = 0  # failed sells so far
+
+
+class ExitEngine:
+    def __init__(
+        self,
+        *,
+        now_ms: Optional[Callable[[], int]] = None,
+        on_trigger: Optional[Callable[[], None]] = None,
+        retry_base_ms: int = 5_000,
+        retry_max_ms: int = 300_000,
+    ):
+        self._now = now_ms or (lambda: int(time.time() * 1000))
+        self._on_trigger = on_trigger
+        self.retry_base_ms = int(retry_base_ms)
+        self.retry_max_ms = int(retry_max_ms)
+        self._lock = threading.Lock()
+        self._positions: dict[int, OpenPosition] = {}
+        self._tp: dict[str, list[tuple[float, int]]] = {}  # descending by level (crossed levels at the end)
+        self._sl: dict[str, list[tuple[float, int]]] = {}  # ascending by level
+        self._deadlines: list[tuple[int, int]] = []
+        self._triggered: dict[int, ExitOrder] = {}
+        self._last_price: dict[str, float] = {}
+        self._parked: dict[int, ExitOrder] = {}  # failed sells waiting for their retry time
+        self._retries: list[tuple[int, int]] = []  # (retry_at_ms, id)
+
+    def __len__(self) -> int:
+        return len(self._positions) + len(self._parked)
+
+    def symbols(self) -> set[str]:
+        with self._lock:
+            return {p.symbol for p in self._positions.values()} | {o.position.symbol for o in self._parked.values()}
+
+    def add(self, pos: OpenPosition) -> None:
+        with self._lock:
+            self._positions[pos.id] = pos
+            if pos.tp is not None:
+                bisect.insort(self._tp.setdefault(pos.symbol, []), (-pos.tp, pos.id))
+            if pos.sl is not None:
+                bisect.insort(self._sl.setdefault(pos.symbol, []), (pos.sl, pos.id))
+            if pos.planned_exit_ms is not None:
+                heapq.heappush(self._deadlines, (int(pos.planned_exit_ms), pos.id))
+            price = self._last_price.get(pos.symbol)
+        if price is not None:
+            self.on_price(pos.symbol, price)
+
+    def retry(self, order: ExitOrder) -> int:
+        """Park a failed sell; drain() returns it again after the backoff. Returns the delay in ms."""
+        attempt = order.attempt + 1
+        delay = min(self.retry_max_ms, self.retry_base_ms * 2 ** (attempt - 1))
+        with self._lock:
+            pid = order.position.id
+            self._parked[pid] = ExitOrder(order.position, order.reason, order.last_price, attempt)
+            heapq.heappush(self._retries, (self._now() + delay, pid))
+        return delay
+
+    def remove(self, pos_id: int) -> None:
+        with self._lock:
+            self._positions.pop(pos_id, None)
+            self._triggered.pop(pos_id, None)
+            self._parked.pop(pos_id, None)
+
+    def remove_symbols(self, symbols) -> list[int]:
+        """Forget every position on `symbols` (e.g. after another process took them over)."""
+        drop = set(symbols)
+        with self._lock:
+            ids = [pid for pid, p in self._positions.items() if p.symbol in drop]
+            for pid in ids:
+                self._positions.pop(pid, None)
+            for pending in (self._triggered, self._parked):
+                for pid in [pid for pid, o in pending.items() if o.position.symbol in drop]:
+                    pending.pop(pid, None)
+                    ids.append(pid)
+        return ids
+
+    def _fire(self, pid: int, reason: str, price: Optional[float]) -> bool:
+        pos = self._positions.pop(pid, None)
+        if pos is None:
+            return False
+        self._triggered[pid] = ExitOrder(pos, reason, price)
+        return True
+
+    def on_price(self, symbol: str, price: float) -> None:
+        """Price update (stream thread or poll): trigger every position it crosses."""
+        fired = False
+        with self._lock:
+            self._last_price[symbol] = price
+            # SL first: when both are crossed by one update, treat it as a stop.
+            sl = self._sl.get(symbol)
+            while sl and sl[-1][0] >= price:
+                fired |= self._fire(sl.pop()[1], "sl_hit", price)
+            tp = self._tp.get(symbol)
+            while tp and -tp[-1][0] <= price:
+                fired |= self._fire(tp.pop()[1], "tp_hit", price)
+        if fired and self._on_trigger is not None:
+            self._on_trigger()
+
+    def next_deadline_ms(self) -> Optional[int]:
+        with self._lock:
+            while self._deadlines and self._deadlines[0][1] not in self._positions:
+                heapq.heappop(self._deadlines)
+            while self._retries and self._retries[0][1] not in self._parked:
+                heapq.heappop(self._retries)
+            due = [q[0][0] for q in (self._deadlines, self._retries) if q]
+            return min(due) if due else None
+
+    def drain(self, now_ms: Optional[int] = None) -> list[ExitOrder]:
+        """Positions to sell now: price-triggered ones plus expired deadlines."""
+        now = self._now() if now_ms is None else int(now_ms)
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, pid = heapq.heappop(self._deadlines)
+                pos = self._positions.get(pid)
+                if pos is not None:
+                    self._fire(pid, "timeout", self._last_price.get(pos.symbol))
+            while self._retries and self._retries[0][0] <= now:
+                _, pid = heapq.heappop(self._retries)
+                order = self._parked.pop(pid, None)
+                if order is not None:
+                    self._triggered[pid] = order
+            out = list(self._triggered.values())
+            self._triggered.clear()
+        return out
+
+
+def load_open_positions(conn, symbols: Optional[list[str]] = None) -> list[OpenPosition]:
+    """Open no-OCO positions, optionally only on `symbols`."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, symbol, entry_base_qty, target_exit_price, stop_exit_price,
+                   (extract(epoch FROM planned_exit_at) * 1000)::bigint
+            FROM binance_position
+            WHERE status='open' AND oco_order_list_id IS NULL
+              AND (%s::text[] IS NULL OR symbol = ANY(%s::text[]))
+            ORDER BY created_at ASC
+            """,
+            (symbols, symbols),
+        )
+        rows = cur.fetchall() or []
+    conn.commit()
+    return [
+        OpenPosition(
+            id=int(pid),
+            symbol=sym,
+            base_qty=float(qty or 0.0),
+            tp=float(tp) if tp is not None else None,
+            sl=float(sl) if sl is not None else None,
+            planned_exit_ms=int(exit_ms) if exit_ms is not None else None,
+        )
+        for pid, sym, qty, tp, sl, exit_ms in rows
+    ]
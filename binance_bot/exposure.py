@@ -0,0 +1,35 @@
+"""Exposure ledger loader for this bot (the ledger itself: botcommon.exposure).
+
+load_binance_exposure reads today's submitted BUYs and open positions into the
+ExposureSnapshot that ExposureLedger reconciles against.
+"""
+
+from __future__ import annotations
+
+import _botcommon  # puts the repository root on sys.path
+from botcommon.exposure import ExposureLedger, ExposureSnapshot
+
+
+def load_binance_exposure(conn) -> ExposureSnapshot:
+    """Today's submitted BUYs and open positions, as the daemon's old per-tick queries saw them."""
+    snap = ExposureSnapshot()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT symbol, COALESCE(SUM(quote_qty),0)::float8
+            FROM binance_order
+            WHERE created_at >= date_trunc('day', now())
+              AND created_at <  date_trunc('day', now()) + interval '1 day'
+              AND status='submitted'
+              AND side='BUY'
+            GROUP BY symbol
+            """
+        )
+        for sym, spent in cur.fetchall() or []:
+            snap.spent_by_market[sym] = float(spent or 0.0)
+        cur.execute("SELECT id, symbol, COALESCE(entry_quote_qty,0)::float8 FROM binance_position WHERE status='open'")
+        for pid, sym, quote in cur.fetchall() or []:
+            snap.open_positions[int(pid)] = (sym, float(quote))
+    conn.commit()
+    snap.spent_today = sum(snap.spent_by_market.values())
+    return snap
@@ -0,0 +1,71 @@
+"""Candle-close-aware indicator cache (dedup for binance_indicator_point).
+
+Keyed on (symbol, interval, candle open time, closed flag):
+- While the open candle's close is unchanged, cached indicator values are
+  reused and nothing is written.
+- When the open time moves on, the previous candle has closed: exactly one
+  final row is due for it.
+- Optional sparse intra-candle samples (every `sample_seconds`, only if the
+  price moved since the last written sample).
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class _Entry:
+    open_time: Optional[int] = None
+    close: Optional[float] = None
+    values: Optional[tuple] = None
+    sampled_at: float = 0.0
+    sampled_close: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class Observation:
+    changed: bool  # open candle differs from the last tick (recompute needed)
+    values: Optional[tuple]  # cached values when unchanged
+    closed_open_time: Optional[int]  # open time of a candle that just closed (write its final row)
+    sample_due: bool  # write an intra-candle sample row now
+
+
+class IndicatorCache:
+    def __init__(self, sample_seconds: float = 0.0):
+        self.sample_seconds = float(sample_seconds)
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self.skipped = 0
+
+    def observe(self, symbol: str, interval: str, open_time: int, close: float, now: Optional[float] = None) -> Observation:
+        now = time.time() if now is None else now
+        e = self._entries.setdefault((symbol, interval), _Entry())
+        closed_open_time = None
+        if e.open_time is not None and open_time > e.open_time:
+            closed_open_time = e.open_time
+            e.sampled_at = 0.0
+            e.sampled_close = None
+        changed = e.values is None or open_time != e.open_time or close != e.close
+        if not changed:
+            self.skipped += 1
+        e.open_time = int(open_time)
+        e.close = close
+        sample_due = (
+            self.sample_seconds > 0
+            and now - e.sampled_at >= self.sample_seconds
+            and close != e.sampled_close
+        )
+        if sample_due:
+            e.sampled_at = now
+            e.sampled_close = close
+        return Observation(
+            changed=changed,
+            values=None if changed else e.values,
+            closed_open_time=closed_open_time,
+            sample_due=sample_due,
+        )
+
+    def remember(self, symbol: str, interval: str, values: tuple) -> None:
+        self._entries.setdefault((symbol, interval), _Entry()).values = values
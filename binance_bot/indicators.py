@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import json
+import os
 from dataclasses import dataclass
 
 
@@ -38,3 +40,303 @@ def rsi(values: list[float], period: int = 14) -> float | None:
         return 100.0
     rs = avg_gain / avg_loss
     return 100.0 - (100.0 / (1.0 + rs))
+
+
+# ---- Streaming (incremental) indicators ----
+#
+# Feed closed candles with update(); each update is O(1). peek(x) returns the
+# value as if x were appended (the provisional value for the open candle)
+# without changing state. Fed the same sequence, values are identical to the
+# batch functions above (same seed and the same float operations).
+
+
+class EmaState:
+    def __init__(self, period: int):
+        self.period = int(period)
+        self.k = 2 / (self.period + 1)
+        self.n = 0
+        self.seed_sum = 0.0
+        self.value: float | None = None
+
+    def _next(self, v: float) -> float | None:
+        if self.value is not None:
+            return v * self.k + self.value * (1 - self.k)
+        if self.n + 1 == self.period:
+            return (self.seed_sum + v) / self.period
+        return None
+
+    def update(self, v: float) -> float | None:
+        nxt = self._next(v)
+        if self.value is None:
+            self.seed_sum += v
+        self.value = nxt
+        self.n += 1
+        return self.value
+
+    def peek(self, v: float) -> float | None:
+        if self.period <= 0:
+            return None
+        return self._next(v)
+
+    def to_dict(self) -> dict:
+        return {"period": self.period, "n": self.n, "seed_sum": self.seed_sum, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "EmaState":
+        s = cls(int(d["period"]))
+        s.n = int(d["n"])
+        s.seed_sum = float(d["seed_sum"])
+        s.value = d.get("value")
+        return s
+
+
+class RsiState:
+    """Wilder RSI (same seeding as `rsi`: simple mean of the first `period` changes)."""
+
+    def __init__(self, period: int = 14):
+        self.period = int(period)
+        self.prev: float | None = None
+        self.n_changes = 0
+        self.gains = 0.0
+        self.losses = 0.0
+        self.avg_gain: float | None = None
+        self.avg_loss: float | None = None
+
+    @staticmethod
+    def _value(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0:
+            return 100.0
+        rs = avg_gain / avg_loss
+        return 100.0 - (100.0 / (1.0 + rs))
+
+    def _step(self, v: float):
+        """Return (n_changes, gains, losses, avg_gain, avg_loss) after appending v."""
+        n, gains, losses, ag, al = self.n_changes, self.gains, self.losses, self.avg_gain, self.avg_loss
+        if self.prev is None:
+            return n, gains, losses, ag, al
+        ch = v - self.prev
+        if ag is None:
+            if ch >= 0:
+                gains += ch
+            else:
+                losses -= ch
+            n += 1
+            if n == self.period:
+                ag = gains / self.period
+                al = losses / self.period
+            return n, gains, losses, ag, al
+        gain = ch if ch > 0 else 0.0
+        loss = -ch if ch < 0 else 0.0
+        ag = (ag * (self.period - 1) + gain) / self.period
+        al = (al * (self.period - 1) + loss) / self.period
+        return n + 1, gains, losses, ag, al
+
+    @property
+    def value(self) -> float | None:
+        if self.avg_gain is None or self.avg_loss is None:
+            return None
+        return self._value(self.avg_gain, self.avg_loss)
+
+    def update(self, v: float) -> float | None:
+        if self.period <= 0:
+            return None
+        self.n_changes, self.gains, self.losses, self.avg_gain, self.avg_loss = self._step(v)
+        self.prev = v
+        return self.value
+
+    def peek(self, v: float) -> float | None:
+        if self.period <= 0:
+            return None
+        _, _, _, ag, al = self._step(v)
+        if ag is None or al is None:
+            return None
+        return self._value(ag, al)
+
+    def to_dict(self) -> dict:
+        return {
+            "period": self.period,
+            "prev": self.prev,
+            "n_changes": self.n_changes,
+            "gains": self.gains,
+            "losses": self.losses,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RsiState":
+        s = cls(int(d["period"]))
+        s.prev = d.get("prev")
+        s.n_changes = int(d["n_changes"])
+        s.gains = float(d["gains"])
+        s.losses = float(d["losses"])
+        s.avg_gain = d.get("avg_gain")
+        s.avg_loss = d.get("avg_loss")
+        return s
+
+
+class MacdState:
+    """MACD line (EMA fast - EMA slow) with an EMA signal line over it."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EmaState(fast)
+        self.slow = EmaState(slow)
+        self.signal = EmaState(signal)
+
+    @property
+    def value(self) -> tuple[float, float | None] | None:
+        if self.fast.value is None or self.slow.value is None:
+            return None
+        return self.fast.value - self.slow.value, self.signal.value
+
+    def update(self, v: float) -> tuple[float, float | None] | None:
+        f = self.fast.update(v)
+        s = self.slow.update(v)
+        if f is None or s is None:
+            return None
+        self.signal.update(f - s)
+        return self.value
+
+    def peek(self, v: float) -> tuple[float, float | None] | None:
+        f = self.fast.peek(v)
+        s = self.slow.peek(v)
+        if f is None or s is None:
+            return None
+        return f - s, self.signal.peek(f - s)
+
+    def to_dict(self) -> dict:
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "MacdState":
+        s = cls()
+        s.fast = EmaState.from_dict(d["fast"])
+        s.slow = EmaState.from_dict(d["slow"])
+        s.signal = EmaState.from_dict(d["signal"])
+        return s
+
+
+class AtrState:
+    """Wilder ATR over true range (needs high/low/close)."""
+
+    def __init__(self, period: int = 14):
+        self.period = int(period)
+        self.prev_close: float | None = None
+        self.n = 0
+        self.tr_sum = 0.0
+        self.value: float | None = None
+
+    def _tr(self, high: float, low: float) -> float:
+        if self.prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def _next(self, tr: float) -> float | None:
+        if self.value is not None:
+            return (self.value * (self.period - 1) + tr) / self.period
+        if self.n + 1 == self.period:
+            return (self.tr_sum + tr) / self.period
+        return None
+
+    def update(self, high: float, low: float, close: float) -> float | None:
+        tr = self._tr(high, low)
+        nxt = self._next(tr)
+        if self.value is None:
+            self.tr_sum += tr
+        self.value = nxt
+        self.n += 1
+        self.prev_close = close
+        return self.value
+
+    def peek(self, high: float, low: float) -> float | None:
+        return self._next(self._tr(high, low))
+
+    def to_dict(self) -> dict:
+        return {"period": self.period, "prev_close": self.prev_close, "n": self.n, "tr_sum": self.tr_sum, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "AtrState":
+        s = cls(int(d["period"]))
+        s.prev_close = d.get("prev_close")
+        s.n = int(d["n"])
+        s.tr_sum = float(d["tr_sum"])
+        s.value = d.get("value")
+        return s
+
+
+class IndicatorSet:
+    """EMA fast/slow + RSI state for one symbol, fed from REST-shaped kline rows.
+
+    The last row is treated as the open candle (peeked, never fed). If the rows
+    no longer overlap what was fed (restart, gap), state is rebuilt from them.
+    """
+
+    def __init__(self, ema_fast: int, ema_slow: int, rsi_period: int):
+        self.params = (int(ema_fast), int(ema_slow), int(rsi_period))
+        self.reset()
+
+    def reset(self) -> None:
+        self.ema_fast = EmaState(self.params[0])
+        self.ema_slow = EmaState(self.params[1])
+        self.rsi = RsiState(self.params[2])
+        self.last_open_time: int | None = None
+
+    def update(self, close: float, open_time: int) -> None:
+        self.ema_fast.update(close)
+        self.ema_slow.update(close)
+        self.rsi.update(close)
+        self.last_open_time = int(open_time)
+
+    def sync(self, rows: list) -> tuple[float | None, float | None, float | None]:
+        """Feed new closed rows; return (ema_fast, ema_slow, rsi) including the open candle."""
+        if not rows:
+            return None, None, None
+        closed, live = rows[:-1], rows[-1]
+        if closed and (self.last_open_time is None or self.last_open_time < int(closed[0][0])):
+            self.reset()
+        for k in closed:
+            if self.last_open_time is None or int(k[0]) > self.last_open_time:
+                self.update(float(k[4]), int(k[0]))
+        c = float(live[4])
+        return self.ema_fast.peek(c), self.ema_slow.peek(c), self.rsi.peek(c)
+
+    def to_dict(self) -> dict:
+        return {
+            "params": list(self.params),
+            "last_open_time": self.last_open_time,
+            "ema_fast": self.ema_fast.to_dict(),
+            "ema_slow": self.ema_slow.to_dict(),
+            "rsi": self.rsi.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict, ema_fast: int, ema_slow: int, rsi_period: int) -> "IndicatorSet":
+        s = cls(ema_fast, ema_slow, rsi_period)
+        if tuple(d.get("params") or ()) != s.params:
+            return s  # periods changed: start cold
+        s.ema_fast = EmaState.from_dict(d["ema_fast"])
+        s.ema_slow = EmaState.from_dict(d["ema_slow"])
+        s.rsi = RsiState.from_dict(d["rsi"])
+        s.last_open_time = d.get("last_open_time")
+        return s
+
+
+def save_indicator_sets(path: str, sets: dict[str, IndicatorSet]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({sym: st.to_dict() for sym, st in sets.items()}, f)
+    os.replace(tmp, path)
+
+
+def load_indicator_sets(path: str, symbols: list[str], ema_fast: int, ema_slow: int, rsi_period: int) -> dict[str, IndicatorSet]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    return {
+        sym: IndicatorSet.from_dict(data[sym], ema_fast, ema_slow, rsi_period)
+        if sym in data
+        else IndicatorSet(ema_fast, ema_slow, rsi_period)
+        for sym in symbols
+    }
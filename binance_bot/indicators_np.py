@@ -0,0 +1,156 @@
+"""Vectorized indicator series (NumPy) for research and backtests.
+
+Every function returns the full series, aligned with the input (NaN until the
+indicator is defined). Inputs may be 1-D (one symbol) or 2-D with shape
+(symbols, candles); the computation runs along the last axis.
+
+Seeding matches the scalar/streaming versions in indicators.py: EMA and Wilder
+averages start from the simple mean of their first `period` inputs.
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+# Largest exponent kept inside a block: r**-B must stay far from float overflow.
+_MAX_LOG_SCALE = 600.0
+_MAX_BLOCK = 256
+
+
+def _linear_recurrence(p: np.ndarray, r: float, init: np.ndarray) -> np.ndarray:
+    """y[t] = r * y[t-1] + p[t] along the last axis, with y[-1] = init.
+
+    Blocked closed form: inside a block the recursion is a scaled cumulative
+    sum; the block-end carries form the same recurrence (with r**B), solved
+    recursively, so there is no per-candle or per-block Python loop.
+    """
+    n = p.shape[-1]
+    init = np.asarray(init, dtype=np.float64)
+    if n == 0:
+        return p.copy()
+    if r <= 0.0:
+        return p.copy()
+    block = int(min(_MAX_BLOCK, _MAX_LOG_SCALE // -math.log(r))) if r < 1.0 else _MAX_BLOCK
+    if block <= 1:
+        # r is below exp(-600): the carried state is numerically invisible
+        out = p.copy()
+        out[..., 0] += r * init
+        return out
+    block = min(block, n)
+    nb = -(-n // block)
+    pad = nb * block - n
+    lead = p.shape[:-1]
+    pb = np.concatenate([p, np.zeros(lead + (pad,))], axis=-1) if pad else p
+    pb = pb.reshape(lead + (nb, block))
+
+    j = np.arange(block, dtype=np.float64)
+    part = np.cumsum(pb * r**-j, axis=-1) * r**j  # zero-initial-state response per block
+    if nb > 1:
+        ends = _linear_recurrence(part[..., -1], r**block, init)
+        carry_in = np.concatenate([init[..., None], ends[..., :-1]], axis=-1)
+    else:
+        carry_in = init[..., None]
+    out = part + r ** (j + 1.0) * carry_in[..., None]
+    out = out.reshape(lead + (nb * block,))
+    return out[..., :n] if pad else out
+
+
+def _recursive_smooth(x: np.ndarray, alpha: float, init: np.ndarray) -> np.ndarray:
+    """y[t] = (1 - alpha) * y[t-1] + alpha * x[t], with y[-1] = init, along the last axis."""
+    if alpha >= 1.0:
+        return x.copy()
+    return _linear_recurrence(alpha * x, 1.0 - alpha, init)
+
+
+def _seeded_smooth(x: np.ndarray, alpha: float, period: int) -> np.ndarray:
+    """Seed with the mean of the first `period` values, then smooth recursively."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if period <= 0 or n < period:
+        return out
+    seed = x[..., :period].sum(axis=-1) / period
+    out[..., period - 1] = seed
+    if n > period:
+        out[..., period:] = _recursive_smooth(x[..., period:], alpha, seed)
+    return out
+
+
+def sma(x, period: int) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if period <= 0 or n < period:
+        return out
+    # offset by the first value to keep the running sum small (less cancellation)
+    base = x[..., :1]
+    c = np.cumsum(x - base, axis=-1)
+    c = np.concatenate([np.zeros(x.shape[:-1] + (1,)), c], axis=-1)
+    out[..., period - 1 :] = (c[..., period:] - c[..., :-period]) / period + base
+    return out
+
+
+def ema(x, period: int) -> np.ndarray:
+    return _seeded_smooth(x, 2.0 / (period + 1), period)
+
+
+def wilder(x, period: int) -> np.ndarray:
+    """Wilder smoothing (alpha = 1/period), SMA-seeded."""
+    return _seeded_smooth(x, 1.0 / period, period) if period > 0 else np.full(np.shape(x), np.nan)
+
+
+def rsi(x, period: int = 14) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if period <= 0 or x.shape[-1] < period + 1:
+        return out
+    ch = np.diff(x, axis=-1)
+    avg_gain = wilder(np.where(ch > 0, ch, 0.0), period)
+    avg_loss = wilder(np.where(ch < 0, -ch, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    v = np.where(avg_loss == 0, 100.0, v)
+    v = np.where(np.isnan(avg_gain), np.nan, v)
+    out[..., 1:] = v
+    return out
+
+
+def macd(x, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(macd line, signal line, histogram)."""
+    x = np.asarray(x, dtype=np.float64)
+    line = ema(x, fast) - ema(x, slow)
+    sig = np.full(x.shape, np.nan)
+    start = max(fast, slow) - 1
+    if x.shape[-1] > start:
+        sig[..., start:] = ema(line[..., start:], signal)
+    return line, sig, line - sig
+
+
+def bollinger(x, period: int = 20, k: float = 2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(middle, upper, lower) with population standard deviation."""
+    x = np.asarray(x, dtype=np.float64)
+    mid = sma(x, period)
+    std = np.full(x.shape, np.nan)
+    if 0 < period <= x.shape[-1]:
+        win = np.lib.stride_tricks.sliding_window_view(x, period, axis=-1)
+        std[..., period - 1 :] = win.std(axis=-1)
+    return mid, mid + k * std, mid - k * std
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = high - low
+    if tr.shape[-1] > 1:
+        prev = close[..., :-1]
+        tr[..., 1:] = np.maximum.reduce(
+            [tr[..., 1:], np.abs(high[..., 1:] - prev), np.abs(low[..., 1:] - prev)]
+        )
+    return tr
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    return wilder(true_range(high, low, close), period)
@@ -0,0 +1,216 @@
+"""Incremental local kline store (per symbol/interval ring buffer on disk).
+
+- Closed candles live in a fixed-capacity ring buffer backed by a NumPy
+  `.npy` memmap, so a restart reopens history instead of refetching it.
+- Each sync only asks REST for candles newer than the last stored open time
+  (`startTime=`); a gap after downtime is backfilled page by page.
+- The currently open candle is kept in memory only (it changes every tick).
+
+Rows handed back to callers use the REST /api/v3/klines list shape, so
+`decide_signal` and the indicator logging read the store unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("binance_kline_store")
+
+KLINE_DTYPE = np.dtype(
+    [
+        ("open_time", "<i8"),
+        ("close_time", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+        ("quote_volume", "<f8"),
+    ]
+)
+
+_UNIT_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+# REST /api/v3/klines returns at most this many rows per call
+MAX_PAGE = 1000
+
+
+def interval_ms(interval: str) -> int:
+    """'15m' -> 900000. Monthly ('1M') candles are irregular and not supported."""
+    unit = interval[-1:]
+    if unit not in _UNIT_MS or not interval[:-1].isdigit():
+        raise ValueError(f"unsupported interval: {interval}")
+    return int(interval[:-1]) * _UNIT_MS[unit]
+
+
+def _rest_row(rec) -> list:
+    return [
+        int(rec["open_time"]),
+        repr(float(rec["open"])),
+        repr(float(rec["high"])),
+        repr(float(rec["low"])),
+        repr(float(rec["close"])),
+        repr(float(rec["volume"])),
+        int(rec["close_time"]),
+        repr(float(rec["quote_volume"])),
+    ]
+
+
+class KlineStore:
+    """Closed candles for one (symbol, interval), oldest first."""
+
+    def __init__(self, directory: str | Path, symbol: str, interval: str, *, capacity: int = 1000):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.step_ms = interval_ms(interval)
+        self.capacity = int(capacity)
+        self.path = Path(directory) / f"{self.symbol}_{interval}.npy"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.live: Optional[list] = None  # open candle, REST row shape
+        self.needs_backfill = False
+        self._buf = self._open()
+        ot = self._buf["open_time"]
+        self._count = int(np.count_nonzero(ot))
+        if self._count < self.capacity:
+            self._head = self._count
+        else:
+            self._head = (int(np.argmax(ot)) + 1) % self.capacity
+
+    def _open(self) -> np.memmap:
+        if self.path.exists():
+            buf = np.load(self.path, mmap_mode="r+")
+            if buf.dtype == KLINE_DTYPE and buf.shape == (self.capacity,):
+                return buf
+            # capacity/layout changed: carry the newest candles over
+            old = np.array(buf)
+            del buf
+            old = old[old["open_time"] > 0]
+            old = np.sort(old, order="open_time")[-self.capacity :]
+        else:
+            old = np.zeros(0, dtype=KLINE_DTYPE)
+        tmp = self.path.with_suffix(".tmp.npy")
+        buf = np.lib.format.open_memmap(tmp, mode="w+", dtype=KLINE_DTYPE, shape=(self.capacity,))
+        buf[: len(old)] = old
+        buf.flush()
+        del buf
+        os.replace(tmp, self.path)
+        return np.load(self.path, mmap_mode="r+")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def last_open_time(self) -> Optional[int]:
+        if self._count == 0:
+            return None
+        return int(self._buf["open_time"][(self._head - 1) % self.capacity])
+
+    def array(self, n: Optional[int] = None) -> np.ndarray:
+        """Chronological copy of the newest `n` closed candles."""
+        if self._count < self.capacity:
+            out = np.array(self._buf[: self._count])
+        else:
+            out = np.concatenate([self._buf[self._head :], self._buf[: self._head]])
+        return out if n is None else out[-n:]
+
+    def closes(self, n: Optional[int] = None, *, include_live: bool = True) -> list[float]:
+        return [float(k[4]) for k in self.rows(n, include_live=include_live)]
+
+    def rows(self, n: Optional[int] = None, *, include_live: bool = True) -> list:
+        """REST-shaped rows: closed candles, then the open candle (if known)."""
+        take = None if n is None else (n - 1 if include_live and self.live is not None else n)
+        rows = [_rest_row(r) for r in self.array(take)] if take != 0 else []
+        if include_live and self.live is not None:
+            rows.append(self.live)
+        return rows
+
+    def _append(self, row: list) -> None:
+        rec = self._buf[self._head]
+        rec["open_time"] = int(row[0])
+        rec["open"] = float(row[1])
+        rec["high"] = float(row[2])
+        rec["low"] = float(row[3])
+        rec["close"] = float(row[4])
+        rec["volume"] = float(row[5])
+        rec["close_time"] = int(row[6])
+        rec["quote_volume"] = float(row[7]) if len(row) > 7 else 0.0
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def ingest(self, rows: list, now_ms: Optional[int] = None, *, contiguous_only: bool = True) -> int:
+        """Append closed candles newer than the last stored one; keep the open one as `live`.
+
+        If a new candle does not follow the last stored one, appending stops and
+        `needs_backfill` is set (call `sync` with REST to fill it). REST data is
+        authoritative, so `sync` passes contiguous_only=False: a hole there is an
+        exchange outage with no candles, not a gap to fill.
+        """
+        now = int(now_ms if now_ms is not None else time.time() * 1000)
+        last = self.last_open_time()
+        added = 0
+        for row in sorted(rows, key=lambda r: int(r[0])):
+            ot = int(row[0])
+            if int(row[6]) >= now:
+                self.live = row
+                continue
+            if last is not None and ot <= last:
+                continue
+            if contiguous_only and last is not None and ot > last + self.step_ms:
+                self.needs_backfill = True
+                break
+            self._append(row)
+            last = ot
+            added += 1
+        if self.live is not None and last is not None and int(self.live[0]) <= last:
+            self.live = None
+        if added:
+            self._buf.flush()
+        return added
+
+    def next_start_time(self, now_ms: Optional[int] = None) -> int:
+        """startTime for the next incremental fetch (bounded by capacity after long downtime)."""
+        now = int(now_ms if now_ms is not None else time.time() * 1000)
+        oldest_useful = now - self.capacity * self.step_ms
+        last = self.last_open_time()
+        if last is None:
+            return oldest_useful
+        return max(last + self.step_ms, oldest_useful)
+
+    def sync(self, api, *, now_ms: Optional[int] = None, priority: Optional[int] = None) -> int:
+        """Fetch only candles newer than the last stored close; page through gaps."""
+        now = int(now_ms if now_ms is not None else time.time() * 1000)
+        kwargs = {} if priority is None else {"priority": priority}
+        start = self.next_start_time(now)
+        last = self.last_open_time()
+        if last is not None and start > last + self.step_ms:
+            # downtime longer than the ring: drop the stale history to keep it contiguous
+            logger.info("kline gap larger than capacity sym=%s: resetting store", self.symbol)
+            self.reset()
+        added = 0
+        self.needs_backfill = False
+        while True:
+            page = api.klines(self.symbol, self.interval, limit=MAX_PAGE, start_time=start, **kwargs)
+            if not page:
+                break
+            added += self.ingest(page, now, contiguous_only=False)
+            if len(page) < MAX_PAGE:
+                break
+            start = int(page[-1][0]) + self.step_ms
+        if added > 1:
+            logger.info("kline backfill sym=%s interval=%s added=%s", self.symbol, self.interval, added)
+        return added
+
+    def reset(self) -> None:
+        self._buf[:] = np.zeros(self.capacity, dtype=KLINE_DTYPE)
+        self._buf.flush()
+        self._head = 0
+        self._count = 0
+        self.live = None
+
+    def flush(self) -> None:
+        self._buf.flush()
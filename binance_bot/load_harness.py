@@ -0,0 +1,172 @@
+"""Load harness: run daemon.py against the local mock exchange and report throughput.
+
+Usage:
+  python load_harness.py                # 50 symbols for 120 s
+  python load_harness.py 200 300        # symbols, seconds
+
+The mock runs in this process. The daemon runs as a subprocess, with
+BINANCE_BASE_URL pointing at the mock, SYMBOLS set to MK000USDT.., and by
+default INTERVAL=1m, POLL_SECONDS=1 and trading on with TESTNET_ALWAYS_BUY.
+Any of these can be overridden in the shell environment, as can any other
+daemon option (DB_WRITE_BEHIND, ASYNC_FANOUT, ALIGN_TO_CANDLES, ...). That is
+how variants are compared. Filter caches and state files are disabled unless
+set in the shell environment.
+
+Mock behaviour: MOCK_LATENCY_MS, MOCK_JITTER_MS, MOCK_ERROR_RATE,
+MOCK_RATE_LIMIT_RATE, MOCK_PATH (sine|trend|flat), MOCK_SEED.
+
+DATABASE_URL must point at a scratch database: the daemon writes real rows.
+The report covers:
+- loop work time (from the daemon's tick log);
+- orders per second (counted by the mock);
+- requests per endpoint;
+- DB rows written per second, per table.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from mock_exchange import MockConfig, MockExchange
+
+TABLES = ("binance_indicator_point", "binance_signal", "binance_order", "binance_position", "binance_balance_snapshot")
+_TICK = re.compile(r"tick loop=(\d+) work_ms_avg=([\d.]+) work_ms_max=([\d.]+)")
+
+
+def _mock_config() -> MockConfig:
+    return MockConfig(
+        latency_ms=float(os.getenv("MOCK_LATENCY_MS") or "0"),
+        jitter_ms=float(os.getenv("MOCK_JITTER_MS") or "0"),
+        error_rate=float(os.getenv("MOCK_ERROR_RATE") or "0"),
+        rate_limit_rate=float(os.getenv("MOCK_RATE_LIMIT_RATE") or "0"),
+        path=(os.getenv("MOCK_PATH") or "sine").strip(),
+        seed=int(os.getenv("MOCK_SEED") or "0"),
+    )
+
+
+def _daemon_env(base_url: str, n_symbols: int, shell_env: dict) -> dict:
+    """Harness defaults < shell environment; .env (read by the daemon) only fills the rest."""
+    env = dict(shell_env)
+    env["DATABASE_URL"] = os.getenv("DATABASE_URL") or ""
+    env["BINANCE_BASE_URL"] = base_url
+    env["USE_KLINE_STREAM"] = "false"  # the mock has no WebSocket streams
+    env["USE_USER_STREAM"] = "false"
+    env["USE_WS_ORDERS"] = "false"
+    env["USE_DEPTH_BOOK"] = "false"
+    env.setdefault("BINANCE_API_KEY", "mock")
+    env.setdefault("BINANCE_API_SECRET", "mock")
+    env.setdefault("SYMBOLS", ",".join(f"MK{i:03d}USDT" for i in range(n_symbols)))
+    env.setdefault("INTERVAL", "1m")
+    env.setdefault("POLL_SECONDS", "1")
+    env.setdefault("ENABLE_BINANCE_TRADING", "true")
+    env.setdefault("TESTNET_ALWAYS_BUY", "true")
+    env.setdefault("TESTNET_NO_OCO", "true")
+    env.setdefault("MAX_OPEN_POSITIONS", "100")
+    env.setdefault("HOLD_SECONDS", "10")
+    env.setdefault("MAX_QUOTE_PER_TRADE", "6")
+    # Keep mock symbols out of the live caches/state files.
+    for key in ("FILTER_CACHE_PATH", "INDICATOR_STATE_PATH", "KLINE_STORE_DIR"):
+        env.setdefault(key, "")
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+def _db_rows(since: datetime) -> dict[str, int]:
+    from db import connect
+
+    out = {}
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            for t in TABLES:
+                cur.execute(f"SELECT count(*) FROM {t} WHERE created_at >= %s", (since,))
+                out[t] = int(cur.fetchone()[0])
+        conn.commit()
+    finally:
+        conn.close()
+    return out
+
+
+def _percentile(xs: list[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * (len(xs) - 1) + 0.5))]
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    shell_env = dict(os.environ)
+    load_dotenv(dotenv_path=".env", override=False)
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 120.0
+    if not os.getenv("DATABASE_URL"):
+        raise RuntimeError("DATABASE_URL required (use a scratch database)")
+
+    mock = MockExchange(_mock_config()).start()
+    started = datetime.now(timezone.utc)
+    proc = subprocess.Popen(
+        [sys.executable, "daemon.py"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=_daemon_env(mock.base_url, n_symbols, shell_env),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    ticks: list[tuple[float, float]] = []
+    errors: list[str] = []
+
+    def _read() -> None:
+        for line in proc.stdout:
+            m = _TICK.search(line)
+            if m:
+                ticks.append((float(m.group(2)), float(m.group(3))))
+            elif "WARNING" in line or "Traceback" in line:
+                errors.append(line.rstrip())
+
+    reader = threading.Thread(target=_read, daemon=True)
+    reader.start()
+    t0 = time.time()
+    try:
+        while time.time() - t0 < seconds and proc.poll() is None:
+            time.sleep(0.5)
+    finally:
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGTERM)  # lets a write-behind queue drain
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        reader.join(timeout=5)
+    elapsed = time.time() - t0
+    stats = mock.stats()
+    mock.stop()
+    rows = _db_rows(started)
+
+    avgs = [a for a, _ in ticks]
+    print(f"symbols={n_symbols} seconds={elapsed:.0f} exit_code={proc.returncode}")
+    print(
+        f"loop work_ms: windows={len(ticks)} avg={sum(avgs) / len(avgs) if avgs else 0.0:.1f} "
+        f"p95_window_avg={_percentile(avgs, 0.95):.1f} max={max((m for _, m in ticks), default=0.0):.1f}"
+    )
+    print(f"orders={stats['orders']} orders_per_s={stats['orders'] / elapsed:.2f}")
+    print("requests:", ", ".join(f"{k}={v}" for k, v in sorted(stats["requests"].items())))
+    if stats["errors"]:
+        print("mock errors:", stats["errors"])
+    print(f"db rows={sum(rows.values())} rows_per_s={sum(rows.values()) / elapsed:.1f}")
+    for t, n in rows.items():
+        print(f"  {t}: {n}")
+    if errors:
+        print(f"daemon warnings={len(errors)} (last: {errors[-1]})")
+
+
+if __name__ == "__main__":
+    main()
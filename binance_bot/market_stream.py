@@ -0,0 +1,208 @@
+"""Binance market-data stream (kline WebSocket feed).
+
+Keeps the live candle and the most recent closed candles per symbol in memory,
+so the daemon can read closes without a REST round trip every tick.
+
+- Subscribes to `<symbol>@kline_<interval>` on the combined stream endpoint.
+- Seeds history via REST once, and again after every reconnect (fills the gap).
+- Rows are stored in the same list shape as REST /api/v3/klines, so callers
+  can switch between the two without changes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import websocket
+
+logger = logging.getLogger("binance_stream")
+
+STREAM_URL = "wss://stream.binance.com:9443"
+TESTNET_STREAM_URL = "wss://stream.testnet.binance.vision"
+
+
+def default_stream_url(base_url: str) -> str:
+    return TESTNET_STREAM_URL if "testnet" in base_url else STREAM_URL
+
+
+def _row_from_event(k: dict) -> list:
+    # Same field order as REST /api/v3/klines
+    return [
+        int(k["t"]),
+        k["o"],
+        k["h"],
+        k["l"],
+        k["c"],
+        k["v"],
+        int(k["T"]),
+        k["q"],
+        int(k["n"]),
+        k["V"],
+        k["Q"],
+        "0",
+    ]
+
+
+class KlineFeed:
+    """Streaming kline cache for a fixed symbol set and a single interval."""
+
+    def __init__(
+        self,
+        api,
+        symbols: list[str],
+        interval: str,
+        *,
+        stream_url: Optional[str] = None,
+        history: int = 200,
+        stale_seconds: float = 30.0,
+    ):
+        self.api = api
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.stream_url = (stream_url or default_stream_url(api.base_url)).rstrip("/")
+        self.history = history
+        self.stale_seconds = stale_seconds
+
+        self._lock = threading.Lock()
+        self._closed: dict[str, deque] = {s: deque(maxlen=history) for s in self.symbols}
+        self._live: dict[str, Optional[list]] = {s: None for s in self.symbols}
+        self._last_msg: dict[str, float] = {s: 0.0 for s in self.symbols}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self._listeners: list[Callable[[str, float], None]] = []
+        self.reconnects = 0
+
+    def add_listener(self, fn: Callable[[str, float], None]) -> None:
+        """Call fn(symbol, price) on every kline update (from the stream thread)."""
+        self._listeners.append(fn)
+
+    # ---- lifecycle ----
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="kline-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _url(self) -> str:
+        streams = "/".join(f"{s.lower()}@kline_{self.interval}" for s in self.symbols)
+        return f"{self.stream_url}/stream?streams={streams}"
+
+    def _seed(self) -> None:
+        """(Re)load closed candles via REST; the last REST row is the open candle."""
+        for sym in self.symbols:
+            try:
+                kl = self.api.klines(sym, self.interval, limit=self.history)
+            except Exception as e:
+                logger.warning("kline seed failed sym=%s: %s", sym, e)
+                continue
+            if not kl:
+                continue
+            with self._lock:
+                self._closed[sym].clear()
+                self._closed[sym].extend(kl[:-1])
+                self._live[sym] = kl[-1]
+                self._last_msg[sym] = time.time()
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                self._seed()
+                self._ws = websocket.create_connection(self._url(), timeout=30)
+                logger.info("kline stream connected symbols=%s interval=%s", self.symbols, self.interval)
+                attempt = 0
+                while not self._stop.is_set():
+                    raw = self._ws.recv()
+                    if not raw:
+                        raise RuntimeError("stream closed")
+                    self._on_message(raw)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.reconnects += 1
+                delay = min(60.0, 1.0 * (2 ** attempt)) + random.uniform(0, 1.0)
+                attempt += 1
+                logger.warning("kline stream error (reconnect in %.1fs): %s", delay, e)
+                self._stop.wait(delay)
+            finally:
+                ws, self._ws = self._ws, None
+                if ws is not None:
+                    try:
+                        ws.close()
+                    except Exception:
+                        pass
+
+    def _on_message(self, raw: str) -> None:
+        msg = json.loads(raw)
+        data = msg.get("data") or msg
+        if data.get("e") != "kline":
+            return
+        k = data["k"]
+        sym = str(k["s"]).upper()
+        if sym not in self._closed:
+            return
+        row = _row_from_event(k)
+        with self._lock:
+            self._last_msg[sym] = time.time()
+            if k.get("x"):
+                closed = self._closed[sym]
+                if closed and closed[-1][0] == row[0]:
+                    closed[-1] = row
+                elif not closed or closed[-1][0] < row[0]:
+                    closed.append(row)
+                self._live[sym] = None
+            else:
+                self._live[sym] = row
+        for fn in self._listeners:
+            try:
+                fn(sym, float(row[4]))
+            except Exception as e:
+                logger.warning("kline listener error sym=%s: %s", sym, e)
+
+    # ---- readers (no network) ----
+
+    def is_fresh(self, symbol: str) -> bool:
+        ts = self._last_msg.get(symbol.upper())
+        return bool(ts) and (time.time() - ts) <= self.stale_seconds
+
+    def klines(self, symbol: str, limit: Optional[int] = None) -> list:
+        """Closed candles followed by the live candle (REST row shape)."""
+        sym = symbol.upper()
+        with self._lock:
+            rows = list(self._closed.get(sym) or ())
+            live = self._live.get(sym)
+        if live is not None:
+            rows.append(live)
+        n = limit or self.history
+        return rows[-n:]
+
+    def closes(self, symbol: str, limit: Optional[int] = None) -> list[float]:
+        return [float(k[4]) for k in self.klines(symbol, limit)]
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        sym = symbol.upper()
+        with self._lock:
+            row = self._live.get(sym)
+            if row is None and self._closed.get(sym):
+                row = self._closed[sym][-1]
+        return float(row[4]) if row is not None else None
@@ -0,0 +1,52 @@
+"""Schema migrations of the Binance bot (runner: botcommon.migrate).
+
+Migrations are the files migrations/NNNN_<name>.sql, recorded in
+schema_version under the component "binance". When the database is up to date
+startup costs one SELECT.
+
+CLI: python migrate.py     # apply pending migrations and print the version
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import _botcommon  # puts the repository root on sys.path
+from botcommon import migrate as runner
+from botcommon.migrate import Migration
+
+COMPONENT = "binance"
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    return runner.discover(directory)
+
+
+def current_version(conn) -> int:
+    return runner.current_version(conn, COMPONENT)
+
+
+def migrate(conn, *, directory: Path = MIGRATIONS_DIR) -> list[int]:
+    """Apply this bot's pending migrations. Returns the versions applied."""
+    return runner.migrate(conn, directory=directory, component=COMPONENT)
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from db import connect
+
+    load_dotenv(dotenv_path=".env", override=False)
+    logging.basicConfig(level=logging.INFO)
+    conn = connect()
+    try:
+        applied = migrate(conn)
+        print(f"component={COMPONENT} version={current_version(conn)} applied={applied}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
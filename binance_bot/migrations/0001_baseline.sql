@@ -0,0 +1,141 @@
+-- Baseline: the schema init_db used to (re)apply at every start.
+-- Idempotent, so it also brings a database created before migrations up to date.
+
+CREATE TABLE IF NOT EXISTS binance_bot_run (
+  id BIGSERIAL PRIMARY KEY,
+  run_id TEXT UNIQUE,
+  started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  status TEXT NOT NULL DEFAULT 'running',
+  error TEXT
+);
+
+CREATE TABLE IF NOT EXISTS binance_signal (
+  id BIGSERIAL PRIMARY KEY,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  symbol TEXT NOT NULL,
+  kind TEXT NOT NULL, -- ema_cross | rsi_dip
+  score DOUBLE PRECISION NOT NULL,
+  evidence_json JSONB
+);
+
+-- --------------------
+-- Indicators
+-- --------------------
+
+CREATE TABLE IF NOT EXISTS binance_indicator_point (
+  id BIGSERIAL PRIMARY KEY,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  symbol TEXT NOT NULL,
+  interval TEXT NOT NULL,
+  close DOUBLE PRECISION NOT NULL,
+  ema_fast DOUBLE PRECISION,
+  ema_slow DOUBLE PRECISION,
+  rsi DOUBLE PRECISION,
+  blog_ma_score DOUBLE PRECISION,
+  blog_rsi_score DOUBLE PRECISION,
+  raw_json JSONB
+);
+
+ALTER TABLE binance_indicator_point ADD COLUMN IF NOT EXISTS candle_open_ms BIGINT;
+ALTER TABLE binance_indicator_point ADD COLUMN IF NOT EXISTS candle_closed BOOLEAN;
+
+CREATE INDEX IF NOT EXISTS idx_binance_ind_symbol_time ON binance_indicator_point(symbol, created_at);
+
+-- --------------------
+-- Balance snapshots
+-- --------------------
+
+CREATE TABLE IF NOT EXISTS binance_balance_snapshot (
+  id BIGSERIAL PRIMARY KEY,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  total_usdt_est DOUBLE PRECISION,
+  raw_json JSONB
+);
+
+-- per-asset breakdown: asset -> qty / price_usdt / value_usdt / route
+ALTER TABLE binance_balance_snapshot ADD COLUMN IF NOT EXISTS assets_json JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_binance_bal_time ON binance_balance_snapshot(created_at);
+
+-- --------------------
+-- Orders and positions
+-- --------------------
+
+CREATE TABLE IF NOT EXISTS binance_order (
+  id BIGSERIAL PRIMARY KEY,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  symbol TEXT NOT NULL,
+  side TEXT NOT NULL,
+  order_id TEXT,
+  status TEXT NOT NULL,
+  quote_qty DOUBLE PRECISION,
+  base_qty DOUBLE PRECISION,
+  price DOUBLE PRECISION,
+  take_profit_price DOUBLE PRECISION,
+  stop_loss_price DOUBLE PRECISION,
+  stop_limit_price DOUBLE PRECISION,
+  oco_order_list_id TEXT,
+  position_id BIGINT,
+  raw_request_json JSONB,
+  raw_response_json JSONB,
+  error TEXT
+);
+
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS take_profit_price DOUBLE PRECISION;
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS stop_loss_price DOUBLE PRECISION;
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS stop_limit_price DOUBLE PRECISION;
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS oco_order_list_id TEXT;
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS position_id BIGINT;
+-- execution state from the user-data stream (user_stream.apply_events)
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS exec_status TEXT;
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS executed_qty DOUBLE PRECISION;
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS cum_quote_qty DOUBLE PRECISION;
+ALTER TABLE binance_order ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_binance_order_created ON binance_order(created_at);
+CREATE INDEX IF NOT EXISTS idx_binance_order_symbol ON binance_order(symbol);
+CREATE INDEX IF NOT EXISTS idx_binance_order_order_id ON binance_order(order_id);
+
+CREATE TABLE IF NOT EXISTS binance_position (
+  id BIGSERIAL PRIMARY KEY,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  symbol TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'open',
+  entry_order_id TEXT,
+  exit_order_id TEXT,
+  entry_price DOUBLE PRECISION,
+  entry_base_qty DOUBLE PRECISION,
+  entry_quote_qty DOUBLE PRECISION,
+  target_exit_price DOUBLE PRECISION,
+  stop_exit_price DOUBLE PRECISION,
+  planned_exit_at TIMESTAMPTZ,
+  exit_price DOUBLE PRECISION,
+  exit_quote_qty DOUBLE PRECISION,
+  pnl_quote DOUBLE PRECISION,
+  raw_json JSONB
+);
+
+-- OCO-managed positions: closed from user-data stream fills
+ALTER TABLE binance_position ADD COLUMN IF NOT EXISTS oco_order_list_id TEXT;
+ALTER TABLE binance_position ADD COLUMN IF NOT EXISTS oco_status TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_binance_pos_created ON binance_position(created_at);
+CREATE INDEX IF NOT EXISTS idx_binance_pos_status ON binance_position(status);
+CREATE INDEX IF NOT EXISTS idx_binance_pos_oco ON binance_position(oco_order_list_id);
+
+-- --------------------
+-- Sharding (SHARDING=true): live daemon processes and their symbol leases
+-- --------------------
+
+CREATE TABLE IF NOT EXISTS daemon_shard_member (
+  owner TEXT PRIMARY KEY,
+  heartbeat_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daemon_symbol_lease (
+  symbol TEXT PRIMARY KEY,
+  owner TEXT NOT NULL,
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_daemon_lease_owner ON daemon_symbol_lease(owner);
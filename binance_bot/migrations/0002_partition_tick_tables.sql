@@ -0,0 +1,75 @@
+-- Declarative time partitions for the append-only tick tables (see storage.py).
+--
+-- Each table is converted in place: the existing table becomes the first
+-- partition (MINVALUE .. tomorrow 00:00 UTC) and no rows are copied. New rows land in
+-- day/week partitions that storage.maintain() creates ahead of time; a DEFAULT
+-- partition catches anything outside them. The parent keeps the id sequence
+-- and the original index names; the primary key becomes (id, <time column>).
+
+CREATE OR REPLACE FUNCTION pg_temp.partition_by_time(tbl TEXT, col TEXT) RETURNS VOID AS $$
+DECLARE
+  boundary TIMESTAMPTZ := date_trunc('day', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '1 day';
+  idx RECORD;
+  defs TEXT[] := '{}';
+  def TEXT;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = tbl::regclass) = 'p' THEN
+    RETURN;
+  END IF;
+  FOR idx IN
+    SELECT i.indexrelid::regclass::text AS name, pg_get_indexdef(i.indexrelid) AS def
+    FROM pg_index i WHERE i.indrelid = tbl::regclass AND NOT i.indisprimary
+  LOOP
+    defs := defs || idx.def;
+    EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.name, idx.name || '_legacy');
+  END LOOP;
+
+  EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, tbl || '_legacy');
+  EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I', tbl || '_legacy', tbl || '_pkey', tbl || '_legacy_pkey');
+  EXECUTE format(
+    'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%I)',
+    tbl, tbl || '_legacy', col
+  );
+  EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, %I)', tbl, col);
+  EXECUTE format('ALTER SEQUENCE %I OWNED BY %I.id', tbl || '_id_seq', tbl);
+  FOREACH def IN ARRAY defs LOOP
+    EXECUTE def;  -- same name, now on the parent (the legacy copy is attached below)
+  END LOOP;
+  EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)', tbl, tbl || '_legacy', boundary);
+  EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT pg_temp.partition_by_time('binance_indicator_point', 'created_at');
+SELECT pg_temp.partition_by_time('binance_balance_snapshot', 'created_at');
+
+-- Hourly rollups of expired raw rows (written by storage.maintain before a partition is dropped).
+-- first_at/last_at bound the raw rows behind each row, so a second rollup into
+-- the same hour merges with it instead of overwriting it (see storage.py).
+
+CREATE TABLE IF NOT EXISTS binance_indicator_hourly (
+  symbol TEXT NOT NULL,
+  interval TEXT NOT NULL,
+  bucket TIMESTAMPTZ NOT NULL,
+  open_close DOUBLE PRECISION,
+  high_close DOUBLE PRECISION,
+  low_close DOUBLE PRECISION,
+  last_close DOUBLE PRECISION,
+  last_ema_fast DOUBLE PRECISION,
+  last_ema_slow DOUBLE PRECISION,
+  avg_rsi DOUBLE PRECISION,
+  n INTEGER NOT NULL,
+  first_at TIMESTAMPTZ,
+  last_at TIMESTAMPTZ,
+  PRIMARY KEY (symbol, interval, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS binance_balance_hourly (
+  bucket TIMESTAMPTZ PRIMARY KEY,
+  last_total_usdt_est DOUBLE PRECISION,
+  min_total_usdt_est DOUBLE PRECISION,
+  max_total_usdt_est DOUBLE PRECISION,
+  n INTEGER NOT NULL,
+  first_at TIMESTAMPTZ,
+  last_at TIMESTAMPTZ
+);
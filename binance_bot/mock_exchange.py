@@ -0,0 +1,478 @@
+"""Local stand-in for the Binance spot REST endpoints BinanceApi uses.
+
+For load tests and benchmarks without the testnet. It serves:
+- time, klines, exchangeInfo, depth, ticker/price, ticker/24hr;
+- account, order, order/oco, userDataStream.
+Any symbol ending in USDT exists. Prices follow a deterministic path per
+symbol: a trend plus a few sines with seeded phases, so EMA crosses and RSI
+dips come around regularly. MARKET orders fill at the path price, and
+balances are tracked. Signatures are not checked.
+
+Configurable:
+- latency (with jitter);
+- random 5xx errors and 429s (Retry-After);
+- path shape: sine | trend | flat.
+Responses carry X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-10S, so the client's
+weight governor sees a budget.
+
+Base URL: http://127.0.0.1:PORT/testnet. The path contains "testnet" so the
+TESTNET_* load options are allowed, and the prefix is stripped.
+
+CLI: python mock_exchange.py [PORT]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from kline_store import interval_ms
+
+QUOTE = "USDT"
+PREFIX = "/testnet"
+WEIGHTS = {
+    "/api/v3/time": 1,
+    "/api/v3/klines": 2,
+    "/api/v3/exchangeInfo": 20,
+    "/api/v3/depth": 25,
+    "/api/v3/ticker/price": 4,
+    "/api/v3/ticker/24hr": 80,
+    "/api/v3/account": 20,
+    "/api/v3/order": 1,
+    "/api/v3/order/oco": 1,
+    "/api/v3/userDataStream": 2,
+}
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # share of requests answered 503
+    rate_limit_rate: float = 0.0  # share of requests answered 429 + Retry-After
+    path: str = "sine"  # sine | trend | flat
+    volatility: float = 0.02  # amplitude of the main log-price oscillation
+    period_seconds: float = 3600.0  # main oscillation period
+    universe: int = 200  # symbols listed by ticker/24hr and ticker/price
+    start_usdt: float = 1_000_000.0
+    seed: int = 0
+
+
+class PricePaths:
+    """Deterministic log-price path per symbol, O(1) to evaluate at any time."""
+
+    def __init__(self, cfg: MockConfig):
+        self.cfg = cfg
+        self._params: dict[str, tuple] = {}
+
+    def _p(self, symbol: str) -> tuple:
+        p = self._params.get(symbol)
+        if p is None:
+            h = int(hashlib.sha256(f"{self.cfg.seed}:{symbol}".encode()).hexdigest()[:12], 16)
+            rng = np.random.default_rng(h)
+            base = float(10 ** rng.uniform(-1, 4.5))
+            phases = rng.uniform(0, 2 * math.pi, 4)
+            p = self._params[symbol] = (base, phases)
+        return p
+
+    def log_price(self, symbol: str, t_ms) -> np.ndarray:
+        base, ph = self._p(symbol)
+        t = np.asarray(t_ms, dtype=np.float64) / 1000.0
+        w = 2 * math.pi / self.cfg.period_seconds
+        a = self.cfg.volatility
+        if self.cfg.path == "flat":
+            x = np.zeros_like(t)
+        else:
+            x = a * np.sin(w * t + ph[0])
+            x = x + 0.3 * a * np.sin(3.7 * w * t + ph[1]) + 0.1 * a * np.sin(17.3 * w * t + ph[2])
+            x = x + 0.03 * a * np.sin(97.1 * w * t + ph[3])
+            if self.cfg.path == "trend":
+                x = x + a * (t % (10 * self.cfg.period_seconds)) / self.cfg.period_seconds
+        return math.log(base) + x
+
+    def price(self, symbol: str, t_ms: int) -> float:
+        return float(np.exp(self.log_price(symbol, t_ms)))
+
+    def tick(self, symbol: str) -> float:
+        base, _ = self._p(symbol)
+        return 10.0 ** (math.floor(math.log10(base)) - 4)
+
+    def step(self, symbol: str) -> float:
+        base, _ = self._p(symbol)
+        return 10.0 ** -max(0, math.floor(math.log10(base)) + 1)
+
+    def klines(self, symbol: str, interval: str, limit: int, start_ms: Optional[int], now_ms: int) -> list:
+        iv = interval_ms(interval)
+        if start_ms is not None:
+            first = (int(start_ms) + iv - 1) // iv * iv
+        else:
+            first = (now_ms // iv - limit + 1) * iv
+        opens = np.arange(first, min(now_ms, first + limit * iv - 1) + 1, iv, dtype=np.int64)
+        opens = opens[opens <= now_ms]
+        if not len(opens):
+            return []
+        samples = 16
+        frac = np.linspace(0.0, 1.0, samples)
+        t = opens[:, None] + frac[None, :] * (iv - 1)
+        t = np.minimum(t, now_ms)  # the live candle stops at now
+        px = np.exp(self.log_price(symbol, t))
+        tk = self.tick(symbol)
+        fmt = _fmt_for(tk)
+        rows = []
+        for i, o in enumerate(opens.tolist()):
+            row = px[i]
+            vol = 1000.0 / max(row[-1], 1e-9)
+            rows.append([
+                o,
+                fmt % row[0],
+                fmt % row.max(),
+                fmt % row.min(),
+                fmt % row[-1],
+                "%.8f" % vol,
+                o + iv - 1,
+                "%.8f" % (vol * row[-1]),
+                100,
+                "%.8f" % (vol / 2),
+                "%.8f" % (vol * row[-1] / 2),
+                "0",
+            ])
+        return rows
+
+
+def _fmt_for(step: float) -> str:
+    return "%%.%df" % max(0, min(12, -int(math.floor(math.log10(step)))))
+
+
+class MockExchange:
+    def __init__(self, cfg: Optional[MockConfig] = None, *, host: str = "127.0.0.1", port: int = 0):
+        self.cfg = cfg or MockConfig()
+        self.paths = PricePaths(self.cfg)
+        self._rng = random.Random(self.cfg.seed)
+        self._lock = threading.Lock()
+        self.balances: dict[str, float] = defaultdict(float, {QUOTE: self.cfg.start_usdt})
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.order_times: list[float] = []
+        self._ids = 0
+        self._weight_minute = -1
+        self._weight = 0
+        self._orders_window = -1
+        self._orders = 0
+        self.universe = [f"MK{i:03d}{QUOTE}" for i in range(self.cfg.universe)]
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{PREFIX}"
+
+    def start(self) -> "MockExchange":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-exchange", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "orders": len(self.order_times),
+                "order_times": list(self.order_times),
+            }
+
+    # ---- request plumbing ----
+
+    def _handler_class(self):
+        ex = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method: str):
+                u = urlparse(self.path)
+                path = u.path[len(PREFIX):] if u.path.startswith(PREFIX) else u.path
+                params = {k: v[-1] for k, v in parse_qs(u.query).items()}
+                n = int(self.headers.get("Content-Length") or 0)
+                if n:
+                    params.update({k: v[-1] for k, v in parse_qs(self.rfile.read(n).decode()).items()})
+                status, body, headers = ex.handle(method, path, params)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, str(v))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_PUT(self):
+                self._serve("PUT")
+
+            def do_DELETE(self):
+                self._serve("DELETE")
+
+        return Handler
+
+    def _usage(self, path: str, is_order: bool) -> dict:
+        now = time.time()
+        with self._lock:
+            if int(now // 60) != self._weight_minute:
+                self._weight_minute, self._weight = int(now // 60), 0
+            if int(now // 10) != self._orders_window:
+                self._orders_window, self._orders = int(now // 10), 0
+            self._weight += WEIGHTS.get(path, 1)
+            if is_order:
+                self._orders += 1
+            return {"X-MBX-USED-WEIGHT-1M": self._weight, "X-MBX-ORDER-COUNT-10S": self._orders}
+
+    def handle(self, method: str, path: str, params: dict) -> tuple[int, object, dict]:
+        cfg = self.cfg
+        if cfg.latency_ms or cfg.jitter_ms:
+            time.sleep(max(0.0, cfg.latency_ms + self._rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000.0)
+        with self._lock:
+            self.requests[path] += 1
+            roll = self._rng.random()
+        headers = self._usage(path, method == "POST" and path.startswith("/api/v3/order"))
+        if roll < cfg.rate_limit_rate:
+            with self._lock:
+                self.errors["429"] += 1
+            return 429, {"code": -1003, "msg": "Too many requests (mock)."}, {**headers, "Retry-After": 1}
+        if roll < cfg.rate_limit_rate + cfg.error_rate:
+            with self._lock:
+                self.errors["503"] += 1
+            return 503, {"code": -1001, "msg": "Internal error (mock)."}, headers
+        fn = ROUTES.get((method, path))
+        if fn is None:
+            return 404, {"code": -1, "msg": f"unknown endpoint {method} {path}"}, headers
+        try:
+            return 200, fn(self, params), headers
+        except _ApiError as e:
+            with self._lock:
+                self.errors[str(e.code)] += 1
+            return 400, {"code": e.code, "msg": e.msg}, headers
+
+    # ---- endpoints ----
+
+    def _now(self) -> int:
+        return int(time.time() * 1000)
+
+    def _symbol(self, params: dict) -> str:
+        sym = str(params.get("symbol") or "").upper()
+        if not sym.endswith(QUOTE) or len(sym) <= len(QUOTE):
+            raise _ApiError(-1121, "Invalid symbol.")
+        return sym
+
+    def ep_time(self, params):
+        return {"serverTime": self._now()}
+
+    def ep_klines(self, params):
+        sym = self._symbol(params)
+        limit = max(1, min(1000, int(params.get("limit") or 500)))
+        start = params.get("startTime")
+        return self.paths.klines(sym, params.get("interval") or "1m", limit, int(start) if start else None, self._now())
+
+    def ep_exchange_info(self, params):
+        if params.get("symbols"):
+            syms = json.loads(params["symbols"])
+        else:
+            syms = [self._symbol(params)]
+        out = []
+        for s in syms:
+            s = str(s).upper()
+            tick, step = self.paths.tick(s), self.paths.step(s)
+            out.append({
+                "symbol": s,
+                "status": "TRADING",
+                "baseAsset": s[: -len(QUOTE)],
+                "quoteAsset": QUOTE,
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "minPrice": "%.8f" % tick, "maxPrice": "1000000", "tickSize": "%.8f" % tick},
+                    {"filterType": "LOT_SIZE", "minQty": "%.8f" % step, "maxQty": "9000000", "stepSize": "%.8f" % step},
+                    {"filterType": "NOTIONAL", "minNotional": "5.00000000", "maxNotional": "9000000.00000000"},
+                ],
+            })
+        return {"timezone": "UTC", "serverTime": self._now(), "symbols": out}
+
+    def ep_depth(self, params):
+        sym = self._symbol(params)
+        limit = max(1, min(5000, int(params.get("limit") or 100)))
+        px = self.paths.price(sym, self._now())
+        tick = self.paths.tick(sym)
+        fmt = _fmt_for(tick)
+        with self._lock:
+            self._ids += 1
+            uid = self._ids
+        bids = [[fmt % (px - (i + 1) * tick * 5), "%.8f" % (50.0 / px * (i + 1))] for i in range(limit)]
+        asks = [[fmt % (px + (i + 1) * tick * 5), "%.8f" % (50.0 / px * (i + 1))] for i in range(limit)]
+        return {"lastUpdateId": uid, "bids": bids, "asks": asks}
+
+    def ep_ticker_price(self, params):
+        now = self._now()
+        return [{"symbol": s, "price": "%.8f" % self.paths.price(s, now)} for s in self.universe]
+
+    def ep_ticker_24hr(self, params):
+        now = self._now()
+        out = []
+        for i, s in enumerate(self.universe):
+            px = self.paths.price(s, now)
+            tick = self.paths.tick(s)
+            out.append({
+                "symbol": s,
+                "lastPrice": "%.8f" % px,
+                "bidPrice": "%.8f" % (px - tick),
+                "askPrice": "%.8f" % (px + tick),
+                "quoteVolume": "%.2f" % (1e7 * (1 + i % 50)),
+            })
+        return out
+
+    def ep_account(self, params):
+        with self._lock:
+            return {
+                "canTrade": True,
+                "balances": [{"asset": a, "free": "%.8f" % q, "locked": "0.00000000"} for a, q in self.balances.items()],
+            }
+
+    def _fill(self, sym: str, side: str, base_qty: float, px: float) -> dict:
+        base = sym[: -len(QUOTE)]
+        quote = base_qty * px
+        fee = quote * 0.001
+        with self._lock:
+            if side == "BUY":
+                if self.balances[QUOTE] < quote:
+                    raise _ApiError(-2010, "Account has insufficient balance for requested action.")
+                self.balances[QUOTE] -= quote
+                self.balances[base] += base_qty
+            else:
+                if self.balances[base] + 1e-12 < base_qty:
+                    raise _ApiError(-2010, "Account has insufficient balance for requested action.")
+                self.balances[base] -= base_qty
+                self.balances[QUOTE] += quote - fee
+            self._ids += 1
+            oid = self._ids
+            self.order_times.append(time.time())
+        return {
+            "symbol": sym,
+            "orderId": oid,
+            "orderListId": -1,
+            "clientOrderId": f"mock{oid}",
+            "transactTime": self._now(),
+            "price": "0.00000000",
+            "origQty": "%.8f" % base_qty,
+            "executedQty": "%.8f" % base_qty,
+            "cummulativeQuoteQty": "%.8f" % quote,
+            "status": "FILLED",
+            "timeInForce": "GTC",
+            "type": "MARKET",
+            "side": side,
+            "fills": [{"price": "%.8f" % px, "qty": "%.8f" % base_qty, "commission": "%.8f" % fee, "commissionAsset": QUOTE}],
+        }
+
+    def ep_order(self, params):
+        sym = self._symbol(params)
+        side = str(params.get("side") or "").upper()
+        if str(params.get("type") or "").upper() != "MARKET":
+            raise _ApiError(-1116, "Invalid orderType (mock supports MARKET only).")
+        px = self.paths.price(sym, self._now())
+        step = self.paths.step(sym)
+        if side == "BUY" and params.get("quoteOrderQty"):
+            qty = math.floor(float(params["quoteOrderQty"]) / px / step) * step
+        else:
+            qty = float(params.get("quantity") or 0)
+        if qty <= 0:
+            raise _ApiError(-1013, "Filter failure: LOT_SIZE")
+        return self._fill(sym, side, qty, px)
+
+    def ep_order_oco(self, params):
+        sym = self._symbol(params)
+        qty = float(params.get("quantity") or 0)
+        base = sym[: -len(QUOTE)]
+        with self._lock:
+            if self.balances[base] + 1e-12 < qty:
+                raise _ApiError(-2010, "Account has insufficient balance for requested action.")
+            self.balances[base] -= qty  # locked by the OCO; never filled in the mock
+            self._ids += 3
+            list_id, o1, o2 = self._ids - 2, self._ids - 1, self._ids
+            self.order_times.append(time.time())
+        orders = [{"symbol": sym, "orderId": o, "clientOrderId": f"mock{o}"} for o in (o1, o2)]
+        return {
+            "orderListId": list_id,
+            "contingencyType": "OCO",
+            "listStatusType": "EXEC_STARTED",
+            "listOrderStatus": "EXECUTING",
+            "listClientOrderId": f"mocklist{list_id}",
+            "transactionTime": self._now(),
+            "symbol": sym,
+            "orders": orders,
+            "orderReports": [],
+        }
+
+    def ep_listen_key(self, params):
+        return {"listenKey": "mock-listen-key"}
+
+    def ep_empty(self, params):
+        return {}
+
+
+class _ApiError(Exception):
+    def __init__(self, code: int, msg: str):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+
+
+ROUTES = {
+    ("GET", "/api/v3/time"): MockExchange.ep_time,
+    ("GET", "/api/v3/klines"): MockExchange.ep_klines,
+    ("GET", "/api/v3/exchangeInfo"): MockExchange.ep_exchange_info,
+    ("GET", "/api/v3/depth"): MockExchange.ep_depth,
+    ("GET", "/api/v3/ticker/price"): MockExchange.ep_ticker_price,
+    ("GET", "/api/v3/ticker/24hr"): MockExchange.ep_ticker_24hr,
+    ("GET", "/api/v3/account"): MockExchange.ep_account,
+    ("POST", "/api/v3/order"): MockExchange.ep_order,
+    ("POST", "/api/v3/order/oco"): MockExchange.ep_order_oco,
+    ("POST", "/api/v3/userDataStream"): MockExchange.ep_listen_key,
+    ("PUT", "/api/v3/userDataStream"): MockExchange.ep_empty,
+    ("DELETE", "/api/v3/userDataStream"): MockExchange.ep_empty,
+}
+
+
+def main() -> None:
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    ex = MockExchange(MockConfig(), port=port).start()
+    print(f"mock exchange at {ex.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        ex.stop()
+
+
+if __name__ == "__main__":
+    main()
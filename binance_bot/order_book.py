@@ -0,0 +1,282 @@
+"""Local L2 order books from a depth snapshot plus the @depth@100ms diff stream.
+
+Each side is two parallel arrays (level keys and quantities) kept sorted with
+bisect, with the best level at the end. Updates to the touch are appends and
+pops at the end of the arrays, and a VWAP walk reads from the end.
+
+The sync follows Binance's procedure:
+- connect to the stream;
+- take a REST snapshot;
+- drop events with u <= lastUpdateId;
+- the first applied event must straddle lastUpdateId + 1;
+- every later event must start at the previous u + 1.
+After a gap, that symbol gets a new snapshot.
+
+`estimate_buy(symbol, quote)` returns the expected VWAP of a market buy
+spending `quote`, its slippage against the mid price, and the largest quote
+that stays within a given slippage.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import websocket
+
+from market_stream import default_stream_url
+
+logger = logging.getLogger("binance_order_book")
+
+
+class _Side:
+    """Sorted price levels; keys are price (bids) or -price (asks) so the best level is last."""
+
+    def __init__(self, sign: float):
+        self.sign = sign
+        self.keys: list[float] = []
+        self.qtys: list[float] = []
+
+    def clear(self) -> None:
+        self.keys.clear()
+        self.qtys.clear()
+
+    def set(self, price: float, qty: float) -> None:
+        k = self.sign * price
+        i = bisect.bisect_left(self.keys, k)
+        present = i < len(self.keys) and self.keys[i] == k
+        if qty <= 0:
+            if present:
+                del self.keys[i]
+                del self.qtys[i]
+        elif present:
+            self.qtys[i] = qty
+        else:
+            self.keys.insert(i, k)
+            self.qtys.insert(i, qty)
+
+    def best(self) -> Optional[float]:
+        return self.sign * self.keys[-1] if self.keys else None
+
+    def levels(self):
+        """(price, qty) from the best level outwards."""
+        for i in range(len(self.keys) - 1, -1, -1):
+            yield self.sign * self.keys[i], self.qtys[i]
+
+
+@dataclass(frozen=True)
+class BuyEstimate:
+    quote: float  # quote the estimate covers (less than asked when the book is too thin)
+    vwap: Optional[float]
+    mid: float
+    spread_pct: float
+    slippage_pct: Optional[float]  # vwap / mid - 1 (half spread + depth walked)
+    max_quote: float  # largest spend whose slippage stays within the requested limit
+
+
+class OrderBook:
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = _Side(1.0)
+        self.asks = _Side(-1.0)
+        self.last_update_id: Optional[int] = None
+        self.synced = False
+
+    def apply_snapshot(self, snap: dict) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for p, q in snap.get("bids") or []:
+            self.bids.set(float(p), float(q))
+        for p, q in snap.get("asks") or []:
+            self.asks.set(float(p), float(q))
+        self.last_update_id = int(snap["lastUpdateId"])
+        self.synced = False
+
+    def apply_diff(self, ev: dict) -> bool:
+        """Apply one depthUpdate. Returns False on a sequence gap (needs a new snapshot)."""
+        if self.last_update_id is None:
+            return False
+        first, last = int(ev["U"]), int(ev["u"])
+        if last <= self.last_update_id:
+            return True  # older than the snapshot
+        if not self.synced:
+            if first > self.last_update_id + 1:
+                return False
+        elif first != self.last_update_id + 1:
+            return False
+        for p, q in ev.get("b") or []:
+            self.bids.set(float(p), float(q))
+        for p, q in ev.get("a") or []:
+            self.asks.set(float(p), float(q))
+        self.last_update_id = last
+        self.synced = True
+        return True
+
+    def spread(self) -> Optional[tuple[float, float]]:
+        """(mid, spread as a fraction of mid) or None when a side is empty."""
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None or ask <= bid:
+            return None
+        mid = (bid + ask) / 2.0
+        return mid, (ask - bid) / mid
+
+    def estimate_buy(self, quote: float, max_slippage_pct: float = 0.0) -> Optional[BuyEstimate]:
+        s = self.spread()
+        if s is None:
+            return None
+        mid, spread_pct = s
+        limit_px = mid * (1.0 + max_slippage_pct)
+        spent = base = 0.0  # walk for `quote`
+        max_quote = None  # walk of levels while the vwap stays <= limit
+        lvl_quote = lvl_base = 0.0
+        for price, qty in self.asks.levels():
+            take = min(qty * price, quote - spent)
+            if take > 0:
+                spent += take
+                base += take / price
+            if max_quote is None:
+                size = qty * price
+                if price <= limit_px:
+                    room = size
+                else:
+                    # Quote x of this level keeps vwap <= limit: (q + x) / (b + x / price) <= limit_px.
+                    room = max(0.0, limit_px * lvl_base - lvl_quote) / (1.0 - limit_px / price)
+                if room >= size:
+                    # The whole level fits; a deeper level may still fit too.
+                    lvl_quote += size
+                    lvl_base += qty
+                else:
+                    max_quote = lvl_quote + room
+            if max_quote is not None and spent >= quote:
+                break
+        if max_quote is None:
+            max_quote = lvl_quote
+        vwap = spent / base if base > 0 else None
+        return BuyEstimate(
+            quote=spent,
+            vwap=vwap,
+            mid=mid,
+            spread_pct=spread_pct,
+            slippage_pct=(vwap / mid - 1.0) if vwap else None,
+            max_quote=max_quote,
+        )
+
+
+class DepthFeed:
+    """Background diff-depth stream keeping one OrderBook per symbol."""
+
+    def __init__(
+        self,
+        api,
+        symbols: list[str],
+        *,
+        stream_url: Optional[str] = None,
+        snapshot_limit: int = 500,
+        stale_seconds: float = 10.0,
+    ):
+        self.api = api
+        self.symbols = [s.upper() for s in symbols]
+        self.stream_url = (stream_url or default_stream_url(api.base_url)).rstrip("/")
+        self.snapshot_limit = int(snapshot_limit)
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._books = {s: OrderBook(s) for s in self.symbols}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self._last_msg = 0.0
+        self.reconnects = 0
+        self.resyncs = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="depth-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _url(self) -> str:
+        streams = "/".join(f"{s.lower()}@depth@100ms" for s in self.symbols)
+        return f"{self.stream_url}/stream?streams={streams}"
+
+    def _snapshot(self, sym: str) -> None:
+        snap = self.api.depth(sym, limit=self.snapshot_limit)
+        with self._lock:
+            self._books[sym].apply_snapshot(snap)
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                # Stream first, then snapshots: diffs queue up on the socket meanwhile.
+                self._ws = websocket.create_connection(self._url(), timeout=30)
+                for sym in self.symbols:
+                    self._snapshot(sym)
+                logger.info("depth stream connected symbols=%s", self.symbols)
+                attempt = 0
+                while not self._stop.is_set():
+                    raw = self._ws.recv()
+                    if not raw:
+                        raise RuntimeError("stream closed")
+                    self._on_message(raw)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.reconnects += 1
+                delay = min(60.0, 1.0 * (2 ** attempt)) + random.uniform(0, 1.0)
+                attempt += 1
+                logger.warning("depth stream error (reconnect in %.1fs): %s", delay, e)
+                with self._lock:
+                    for book in self._books.values():
+                        book.synced = False
+                        book.last_update_id = None
+                self._stop.wait(delay)
+            finally:
+                ws, self._ws = self._ws, None
+                if ws is not None:
+                    try:
+                        ws.close()
+                    except Exception:
+                        pass
+
+    def _on_message(self, raw: str) -> None:
+        self._last_msg = time.time()
+        ev = (json.loads(raw) or {}).get("data") or {}
+        sym = str(ev.get("s") or "").upper()
+        book = self._books.get(sym)
+        if book is None:
+            return
+        with self._lock:
+            ok = book.apply_diff(ev)
+        if not ok:
+            self.resyncs += 1
+            logger.info("depth gap sym=%s: resnapshot", sym)
+            self._snapshot(sym)
+
+    def estimate_buy(self, symbol: str, quote: float, max_slippage_pct: float = 0.0) -> Optional[BuyEstimate]:
+        """Estimate from a synced, fresh book; None when the book can't be trusted."""
+        book = self._books.get(symbol.upper())
+        if book is None:
+            return None
+        with self._lock:
+            # Freshness is per connection: a quiet book on a live stream is still current.
+            if not book.synced or time.time() - self._last_msg > self.stale_seconds:
+                return None
+            return book.estimate_buy(quote, max_slippage_pct)
@@ -0,0 +1,104 @@
+"""Portfolio valuation in USDT for every non-zero balance.
+
+Prices come from the live kline stream when it covers the needed symbols, and
+otherwise from one bulk /api/v3/ticker/price call (weight 4, every symbol).
+Each asset is routed to USDT in this order:
+- a stablecoin pegged 1:1;
+- ASSETUSDT directly;
+- USDTASSET inverted;
+- through a bridge asset (ASSET->BTC->USDT, ...).
+Assets without any route are listed as unpriced instead of counting as zero
+silently.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+QUOTE = "USDT"
+STABLES = frozenset({"USDT"})
+BRIDGES = ("BTC", "ETH", "BNB", "FDUSD", "USDC")
+
+
+@dataclass
+class Valuation:
+    total_usdt: float = 0.0
+    assets: dict[str, dict] = field(default_factory=dict)  # asset -> qty/price_usdt/value_usdt/route
+    unpriced: list[str] = field(default_factory=list)
+
+
+def balances_from_account(acct: dict) -> dict[str, float]:
+    """/api/v3/account -> {asset: free + locked} for non-zero balances."""
+    out = {}
+    for b in acct.get("balances") or []:
+        qty = float(b.get("free") or 0) + float(b.get("locked") or 0)
+        if qty > 0:
+            out[str(b.get("asset"))] = qty
+    return out
+
+
+def _direct(asset: str, target: str, prices: dict[str, float]) -> Optional[tuple[float, str]]:
+    p = prices.get(asset + target)
+    if p:
+        return p, asset + target
+    p = prices.get(target + asset)
+    if p:
+        return 1.0 / p, f"1/{target + asset}"
+    return None
+
+
+def price_in_usdt(asset: str, prices: dict[str, float]) -> Optional[tuple[float, str]]:
+    """(price, route) of one unit of `asset` in USDT, or None."""
+    if asset in STABLES:
+        return 1.0, "peg"
+    hit = _direct(asset, QUOTE, prices)
+    if hit is not None:
+        return hit
+    for bridge in BRIDGES:
+        if bridge == asset:
+            continue
+        leg = _direct(asset, bridge, prices)
+        if leg is None:
+            continue
+        out = _direct(bridge, QUOTE, prices)
+        if out is not None:
+            return leg[0] * out[0], f"{leg[1]}*{out[1]}"
+    return None
+
+
+def value_balances(balances: dict[str, float], prices: dict[str, float]) -> Valuation:
+    v = Valuation()
+    for asset, qty in sorted(balances.items()):
+        hit = price_in_usdt(asset, prices)
+        if hit is None:
+            v.unpriced.append(asset)
+            v.assets[asset] = {"qty": qty, "price_usdt": None, "value_usdt": None, "route": None}
+            continue
+        px, route = hit
+        v.assets[asset] = {"qty": qty, "price_usdt": px, "value_usdt": qty * px, "route": route}
+        v.total_usdt += qty * px
+    return v
+
+
+def value_portfolio(
+    balances: dict[str, float],
+    fetch_prices: Callable[[], dict[str, float]],
+    live_price: Optional[Callable[[str], Optional[float]]] = None,
+) -> Valuation:
+    """Value `balances`, using `live_price(symbol)` (stream cache) first.
+
+    `fetch_prices` (the bulk ticker) is called at most once, and only when
+    some asset cannot be priced from the live cache.
+    """
+    prices: dict[str, float] = {}
+    if live_price is not None:
+        for asset in balances:
+            for target in (QUOTE,) + BRIDGES:
+                for sym in (asset + target, target + asset):
+                    p = live_price(sym)
+                    if p:
+                        prices[sym] = p
+    if any(price_in_usdt(a, prices) is None for a in balances):
+        prices = {**fetch_prices(), **prices}
+    return value_balances(balances, prices)
@@ -0,0 +1,223 @@
+"""Universe scanner: rank every USDT pair by signal strength.
+
+One /api/v3/ticker/24hr call (weight 80, every symbol) gives quote volume and
+the bid/ask for all pairs. Pairs below UNIVERSE_MIN_QUOTE_VOLUME or above
+UNIVERSE_MAX_SPREAD_PCT are dropped. The most liquid UNIVERSE_CANDIDATES
+remain, and their klines are fetched concurrently (one request per pair).
+All candidates are then scored at once on a (symbols, candles) matrix with
+the backtest's vectorized EMA/RSI terms.
+
+Ranking is by the decide_signal score of the latest candle, ties broken by
+EMA spread. The daemon trades the top UNIVERSE_TOP_N plus the fixed SYMBOLS.
+
+CLI: python scanner.py [INTERVAL] [TOP_N]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from backtest import indicator_arrays, signal_scores
+from binance_api import PRIORITY_LOW
+
+QUOTE = "USDT"
+# Stablecoin pairs and leveraged tokens never make useful EMA/RSI candidates.
+# The leveraged tokens are listed by name: a suffix match would also drop
+# ordinary coins such as JUP or SUP.
+STABLE_BASES = frozenset({"USDC", "FDUSD", "TUSD", "BUSD", "USDP", "DAI", "EUR", "AEUR"})
+_LEVERAGED_UNDERLYINGS = (
+    "BTC", "ETH", "BNB", "XRP", "LINK", "DOT", "ADA", "TRX", "EOS", "LTC",
+    "XTZ", "BCH", "FIL", "SXP", "YFI", "UNI", "XLM", "SUSHI", "AAVE", "1INCH",
+)
+LEVERAGED_BASES = frozenset(
+    [f"{u}{d}" for u in _LEVERAGED_UNDERLYINGS for d in ("UP", "DOWN")]
+    + ["BULL", "BEAR"]
+    + [f"{u}{d}" for u in ("ETH", "BNB", "EOS", "XRP") for d in ("BULL", "BEAR")]
+)
+EXCLUDED_BASES = STABLE_BASES | LEVERAGED_BASES
+
+
+@dataclass(frozen=True)
+class Candidate:
+    symbol: str
+    quote_volume: float
+    spread_pct: float
+    score: float = 0.0
+    ema_spread: float = 0.0  # (ema_fast - ema_slow) / ema_slow, the tiebreak
+    rsi: Optional[float] = None
+
+
+def shortlist(
+    tickers: list[dict],
+    *,
+    min_quote_volume: float,
+    max_spread_pct: float,
+    max_candidates: int,
+    quote: str = QUOTE,
+) -> list[Candidate]:
+    """Liquid, tight pairs quoted in `quote`, by 24h quote volume (descending)."""
+    out = []
+    for t in tickers:
+        sym = str(t.get("symbol") or "")
+        if not sym.endswith(quote):
+            continue
+        base = sym[: -len(quote)]
+        if not base or base in EXCLUDED_BASES:
+            continue
+        qv = float(t.get("quoteVolume") or 0)
+        bid, ask = float(t.get("bidPrice") or 0), float(t.get("askPrice") or 0)
+        if qv < min_quote_volume or bid <= 0 or ask <= bid:
+            continue
+        spread = (ask - bid) / ((ask + bid) / 2.0)
+        if spread > max_spread_pct:
+            continue
+        out.append(Candidate(sym, qv, spread))
+    out.sort(key=lambda c: -c.quote_volume)
+    return out[:max_candidates]
+
+
+def rank(
+    candidates: list[Candidate],
+    klines: dict[str, list],
+    *,
+    ema_fast: int,
+    ema_slow: int,
+    rsi_period: int,
+    blog_ma_score: float,
+    blog_rsi_score: float,
+) -> list[Candidate]:
+    """Score candidates on their latest candle, strongest first.
+
+    Series are right-aligned on the last `n` candles (n = shortest history that
+    still covers the slow EMA); pairs with less history are dropped.
+    """
+    rows = {c.symbol: klines.get(c.symbol) for c in candidates}
+    usable = [c for c in candidates if isinstance(rows[c.symbol], list) and len(rows[c.symbol]) > max(ema_slow, rsi_period)]
+    if not usable:
+        return []
+    n = min(len(rows[c.symbol]) for c in usable)
+    closes = np.array([[float(k[4]) for k in rows[c.symbol][-n:]] for c in usable], dtype=np.float64)
+    ef, es, rv = indicator_arrays(closes, ema_fast, ema_slow, rsi_period)
+    _, score = signal_scores(ef[:, -1], es[:, -1], rv[:, -1], blog_ma_score, blog_rsi_score)
+    ema_spread = (ef[:, -1] - es[:, -1]) / es[:, -1]
+    order = np.lexsort((-ema_spread, -score))
+    return [
+        Candidate(
+            usable[i].symbol,
+            usable[i].quote_volume,
+            usable[i].spread_pct,
+            score=float(score[i]),
+            ema_spread=float(ema_spread[i]),
+            rsi=float(rv[i, -1]),
+        )
+        for i in order
+    ]
+
+
+class UniverseScanner:
+    def __init__(
+        self,
+        api,
+        interval: str,
+        *,
+        aapi=None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        min_quote_volume: float = 5_000_000.0,
+        max_spread_pct: float = 0.001,
+        max_candidates: int = 100,
+        kline_limit: int = 200,
+    ):
+        self.api = api
+        self.aapi = aapi
+        self.loop = loop
+        self.interval = interval
+        self.min_quote_volume = float(min_quote_volume)
+        self.max_spread_pct = float(max_spread_pct)
+        self.max_candidates = int(max_candidates)
+        self.kline_limit = int(kline_limit)
+        self.last_klines: dict[str, list | Exception] = {}
+
+    @classmethod
+    def from_env(cls, api, interval: str, *, aapi=None, loop=None) -> "UniverseScanner":
+        return cls(
+            api,
+            interval,
+            aapi=aapi,
+            loop=loop,
+            min_quote_volume=float(os.getenv("UNIVERSE_MIN_QUOTE_VOLUME") or "5000000"),
+            max_spread_pct=float(os.getenv("UNIVERSE_MAX_SPREAD_PCT") or "0.001"),
+            max_candidates=int(os.getenv("UNIVERSE_CANDIDATES") or "100"),
+        )
+
+    def _fetch_klines(self, symbols: list[str], priority: int) -> dict[str, list | Exception]:
+        if self.aapi is not None and self.loop is not None:
+            return self.loop.run_until_complete(
+                self.aapi.klines_many(symbols, self.interval, limit=self.kline_limit, priority=priority)
+            )
+        out: dict[str, list | Exception] = {}
+        for sym in symbols:
+            try:
+                out[sym] = self.api.klines(sym, self.interval, limit=self.kline_limit, priority=priority)
+            except Exception as e:
+                out[sym] = e
+        return out
+
+    def scan(
+        self,
+        *,
+        ema_fast: int,
+        ema_slow: int,
+        rsi_period: int,
+        blog_ma_score: float = 1.0,
+        blog_rsi_score: float = 1.0,
+        priority: int = PRIORITY_LOW,
+    ) -> list[Candidate]:
+        """Ranked candidates. The klines fetched are kept in `last_klines` for reuse this tick."""
+        tickers = self.api.ticker_24hr(priority=priority)
+        cands = shortlist(
+            tickers,
+            min_quote_volume=self.min_quote_volume,
+            max_spread_pct=self.max_spread_pct,
+            max_candidates=self.max_candidates,
+        )
+        self.last_klines = self._fetch_klines([c.symbol for c in cands], priority)
+        return rank(
+            cands,
+            self.last_klines,
+            ema_fast=ema_fast,
+            ema_slow=ema_slow,
+            rsi_period=rsi_period,
+            blog_ma_score=blog_ma_score,
+            blog_rsi_score=blog_rsi_score,
+        )
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from binance_api import BinanceApi
+
+    load_dotenv(dotenv_path=".env", override=False)
+    interval = sys.argv[1] if len(sys.argv) > 1 else (os.getenv("INTERVAL") or "15m").strip()
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    api = BinanceApi("", "", base_url=os.getenv("BINANCE_BASE_URL") or "https://api.binance.com")
+    ranked = UniverseScanner.from_env(api, interval).scan(
+        ema_fast=int(os.getenv("EMA_FAST") or "9"),
+        ema_slow=int(os.getenv("EMA_SLOW") or "21"),
+        rsi_period=int(os.getenv("RSI_PERIOD") or "14"),
+    )
+    for c in ranked[:top_n]:
+        print(
+            f"{c.symbol:<14} score={c.score:.3f} ema_spread={c.ema_spread * 100:+.3f}% "
+            f"rsi={c.rsi:.1f} spread={c.spread_pct * 100:.3f}% quote_vol={c.quote_volume:,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
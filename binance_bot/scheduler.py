@@ -0,0 +1,135 @@
+"""Cadence scheduler for the daemon loop.
+
+Each task has its own period. A candle-aligned task fires just after each
+interval boundary (plus a small delay so the closed candle is served by
+REST/stream). Time comes from a server-time estimate (ClockSync.now_ms), so
+alignment follows Binance's candle grid rather than the local clock.
+
+Missed slots are coalesced: after an overrun a task runs once, reports how
+many slots it missed, and its next slot is the first one after now. A run that
+starts more than `max_late_ms` after its slot is marked stale so the caller
+can skip it.
+
+`trigger(name)` (any thread) makes a task due at once and wakes `wait()`, e.g.
+when a streamed price crosses an exit level.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class Run:
+    name: str
+    due_ms: int
+    late_ms: int
+    missed: int  # slots skipped because the loop was busy past them
+    stale: bool
+
+
+@dataclass
+class _Task:
+    name: str
+    period_ms: int
+    align: bool
+    delay_ms: int
+    max_late_ms: Optional[int]
+    next_due_ms: int
+    runs: int = 0
+    missed: int = 0
+
+
+class Scheduler:
+    def __init__(
+        self,
+        now_ms: Optional[Callable[[], int]] = None,
+        *,
+        sleep: Optional[Callable[[float], None]] = None,
+        max_sleep_seconds: float = 5.0,
+    ):
+        self._now = now_ms or (lambda: int(time.time() * 1000))
+        self._wake = threading.Event()
+        self._sleep = sleep or self._wake.wait
+        self._lock = threading.Lock()
+        self._triggered: set[str] = set()
+        self.max_sleep_seconds = float(max_sleep_seconds)
+        self.tasks: dict[str, _Task] = {}
+
+    def _next_slot(self, t: _Task, after_ms: int) -> int:
+        """First slot strictly after `after_ms`."""
+        if t.align:
+            return ((after_ms - t.delay_ms) // t.period_ms + 1) * t.period_ms + t.delay_ms
+        return after_ms + t.period_ms
+
+    def add(
+        self,
+        name: str,
+        period_seconds: float,
+        *,
+        align: bool = False,
+        delay_ms: int = 0,
+        max_late_ms: Optional[int] = None,
+        run_now: bool = True,
+    ) -> None:
+        """Register a task. align=True puts slots on multiples of the period (+delay_ms)."""
+        period_ms = max(1, int(period_seconds * 1000))
+        t = _Task(name, period_ms, align, int(delay_ms), max_late_ms, 0)
+        now = self._now()
+        t.next_due_ms = now if run_now else self._next_slot(t, now)
+        self.tasks[name] = t
+
+    def trigger(self, name: str) -> None:
+        """Run `name` on the next wait() without moving its regular slot."""
+        with self._lock:
+            self._triggered.add(name)
+        self._wake.set()
+
+    def next_due_ms(self) -> int:
+        return min(t.next_due_ms for t in self.tasks.values())
+
+    def due(self, now_ms: Optional[int] = None) -> dict[str, Run]:
+        """Runs due at `now_ms` (and reschedule them)."""
+        now = self._now() if now_ms is None else int(now_ms)
+        out: dict[str, Run] = {}
+        with self._lock:
+            triggered, self._triggered = self._triggered, set()
+        for name in triggered:
+            if name in self.tasks:
+                out[name] = Run(name=name, due_ms=now, late_ms=0, missed=0, stale=False)
+        for t in self.tasks.values():
+            if t.next_due_ms > now:
+                continue
+            late = now - t.next_due_ms
+            missed = late // t.period_ms
+            out[t.name] = Run(
+                name=t.name,
+                due_ms=t.next_due_ms,
+                late_ms=late,
+                missed=missed,
+                stale=t.max_late_ms is not None and late > t.max_late_ms,
+            )
+            t.runs += 1
+            t.missed += missed
+            if t.align:
+                t.next_due_ms = self._next_slot(t, now)
+            else:
+                t.next_due_ms = t.next_due_ms + (missed + 1) * t.period_ms
+        return out
+
+    def wait(self) -> dict[str, Run]:
+        """Sleep until at least one task is due; return the due runs."""
+        while True:
+            self._wake.clear()  # before due(): a trigger from now on cuts the sleep short
+            now = self._now()
+            runs = self.due(now)
+            if runs:
+                return runs
+            self._sleep(min(self.max_sleep_seconds, (self.next_due_ms() - now) / 1000.0))
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        """name -> (runs, missed slots)."""
+        return {t.name: (t.runs, t.missed) for t in self.tasks.values()}
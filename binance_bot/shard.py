@@ -0,0 +1,210 @@
+"""Symbol sharding across daemon processes (SHARDING=true).
+
+Each process registers in daemon_shard_member with a heartbeat. It holds
+time-limited leases on its symbols in daemon_symbol_lease. Every renewal
+(about ttl/3):
+- the process heartbeats and counts live members;
+- its quota is ceil(symbols / members);
+- it extends the leases it holds;
+- it releases leases above its quota, or claims free or expired symbols up
+  to its quota.
+A claim only takes over a lease that has expired (ON CONFLICT ... WHERE),
+so two processes never hold the same symbol. When a process dies, its
+leases expire after one TTL and the survivors pick them up. A new process
+gets symbols as the others shrink to the lower quota.
+
+A process trades a symbol only while its own view of the lease is valid:
+the local deadline is the renewal time + TTL - a safety margin. A process
+stalled past its lease stops trading before anyone else can claim the
+symbol.
+
+The daily cap and the open-position limit are global. reserve_buy checks
+them and creates the BUY row in one transaction, under a Postgres advisory
+lock. In-flight ('created') BUYs count toward the limits, so concurrent
+shards cannot overshoot them together.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger("binance_shard")
+
+# pg_advisory_xact_lock key shared by every shard's exposure check.
+EXPOSURE_LOCK_KEY = 0x62696E65  # "bine"
+INFLIGHT_SECONDS = 300  # a 'created' BUY older than this is considered dead
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class ShardLeases:
+    def __init__(
+        self,
+        symbols: list[str],
+        *,
+        owner: Optional[str] = None,
+        ttl_seconds: float = 30.0,
+        margin_seconds: float = 5.0,
+    ):
+        self.symbols = symbols  # the daemon's list (may change with the universe scan)
+        self.owner = owner or default_owner()
+        self.ttl_seconds = float(ttl_seconds)
+        self.margin_seconds = min(float(margin_seconds), self.ttl_seconds / 2)
+        self.owned: set[str] = set()
+        self.valid_until = 0.0  # time.monotonic() deadline of the current leases
+        self.members = 1
+        self.leader = False
+
+    def owns(self, symbol: str) -> bool:
+        return symbol in self.owned and time.monotonic() < self.valid_until
+
+    def renew(self, conn) -> tuple[set[str], set[str]]:
+        """Heartbeat, extend, rebalance. Returns (gained, lost) symbols."""
+        ttl = f"{self.ttl_seconds} seconds"
+        symbols = sorted(set(self.symbols))
+        started = time.monotonic()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO daemon_shard_member(owner, heartbeat_at) VALUES (%s, now())
+                ON CONFLICT (owner) DO UPDATE SET heartbeat_at=now()
+                """,
+                (self.owner,),
+            )
+            cur.execute("DELETE FROM daemon_shard_member WHERE heartbeat_at < now() - %s::interval * 4", (ttl,))
+            cur.execute(
+                "SELECT owner FROM daemon_shard_member WHERE heartbeat_at >= now() - %s::interval ORDER BY owner",
+                (ttl,),
+            )
+            live = [r[0] for r in cur.fetchall() or []]
+            members = max(1, len(live))
+            quota = math.ceil(len(symbols) / members)
+
+            cur.execute(
+                """
+                UPDATE daemon_symbol_lease SET expires_at = now() + %s::interval
+                WHERE owner=%s AND symbol = ANY(%s)
+                RETURNING symbol
+                """,
+                (ttl, self.owner, symbols),
+            )
+            mine = {r[0] for r in cur.fetchall() or []}
+            # Leases on symbols dropped from our list go back to the pool.
+            cur.execute(
+                "DELETE FROM daemon_symbol_lease WHERE owner=%s AND NOT (symbol = ANY(%s))",
+                (self.owner, symbols),
+            )
+
+            if len(mine) > quota:
+                extra = sorted(mine)[quota:]
+                cur.execute("DELETE FROM daemon_symbol_lease WHERE owner=%s AND symbol = ANY(%s)", (self.owner, extra))
+                mine -= set(extra)
+            elif len(mine) < quota:
+                # Free or expired symbols, in an owner-specific order so shards don't race for the same ones.
+                cur.execute(
+                    """
+                    INSERT INTO daemon_symbol_lease(symbol, owner, expires_at)
+                    SELECT s, %s, now() + %s::interval
+                    FROM unnest(%s::text[]) AS s
+                    LEFT JOIN daemon_symbol_lease l ON l.symbol = s
+                    WHERE l.symbol IS NULL OR l.expires_at < now()
+                    ORDER BY md5(s || %s)
+                    LIMIT %s
+                    ON CONFLICT (symbol) DO UPDATE
+                      SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+                      WHERE daemon_symbol_lease.expires_at < now()
+                    RETURNING symbol
+                    """,
+                    (self.owner, ttl, symbols, self.owner, quota - len(mine)),
+                )
+                mine |= {r[0] for r in cur.fetchall() or []}
+        conn.commit()
+
+        gained, lost = mine - self.owned, self.owned - mine
+        self.owned = mine
+        self.valid_until = started + self.ttl_seconds - self.margin_seconds
+        self.members = members
+        self.leader = bool(live) and live[0] == self.owner
+        if gained or lost:
+            logger.info(
+                "shard %s: members=%s quota=%s owned=%s gained=%s lost=%s",
+                self.owner,
+                members,
+                quota,
+                len(mine),
+                sorted(gained),
+                sorted(lost),
+            )
+        return gained, lost
+
+    def release_all(self, conn) -> None:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM daemon_symbol_lease WHERE owner=%s", (self.owner,))
+            cur.execute("DELETE FROM daemon_shard_member WHERE owner=%s", (self.owner,))
+        conn.commit()
+        self.owned = set()
+
+
+def reserve_buy(
+    conn,
+    symbol: str,
+    quote: float,
+    request_json: str,
+    *,
+    daily_cap: Optional[float] = None,
+    max_open_positions: Optional[int] = None,
+) -> Optional[int]:
+    """Create the 'created' BUY row if the global limits allow it; None otherwise.
+
+    Runs under one advisory lock shared by all shards, so check-and-insert is
+    atomic across processes.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (EXPOSURE_LOCK_KEY,))
+        if daily_cap is not None:
+            cur.execute(
+                """
+                SELECT COALESCE(SUM(quote_qty),0)::float8
+                FROM binance_order
+                WHERE created_at >= date_trunc('day', now())
+                  AND side='BUY'
+                  AND (status='submitted' OR (status='created' AND created_at > now() - %s::interval))
+                """,
+                (f"{INFLIGHT_SECONDS} seconds",),
+            )
+            spent = float(cur.fetchone()[0] or 0.0)
+            if spent + float(quote) > float(daily_cap):
+                conn.rollback()
+                return None
+        if max_open_positions is not None and max_open_positions > 0:
+            cur.execute(
+                """
+                SELECT (SELECT count(*) FROM binance_position WHERE status='open')
+                     + (SELECT count(*) FROM binance_order
+                        WHERE side='BUY' AND status='created' AND created_at > now() - %s::interval)
+                """,
+                (f"{INFLIGHT_SECONDS} seconds",),
+            )
+            if int(cur.fetchone()[0] or 0) >= max_open_positions:
+                conn.rollback()
+                return None
+        cur.execute(
+            """
+            INSERT INTO binance_order(symbol, side, status, quote_qty, raw_request_json)
+            VALUES (%s,'BUY','created',%s,%s::jsonb)
+            RETURNING id
+            """,
+            (symbol, float(quote), request_json),
+        )
+        row_id = int(cur.fetchone()[0])
+    conn.commit()
+    return row_id
+
@@ -0,0 +1,100 @@
+"""Time-partitioned tick tables of this bot (maintenance: botcommon.storage).
+
+binance_indicator_point (daily) and binance_balance_snapshot (weekly) are
+range-partitioned on created_at (migration 0002), and roll up into the *_hourly
+tables. maintain_from_env() keeps STORAGE_PARTITIONS_AHEAD periods of
+partitions ahead and, with STORAGE_RETAIN_DAYS > 0, rolls up and drops
+older raw data.
+
+CLI: python storage.py     # run maintenance once and print what changed
+"""
+
+from __future__ import annotations
+
+import logging
+
+import _botcommon  # puts the repository root on sys.path
+from botcommon import storage as _storage
+from botcommon.storage import Partition, TickTable, partitions, parse_bound, period_start, plan_partitions
+
+STORAGE_LOCK_KEY = 0x62697374  # "bist"
+
+TABLES = (
+    TickTable(
+        "binance_indicator_point",
+        "created_at",
+        "day",
+        rollup_sql="""
+        INSERT INTO binance_indicator_hourly AS h(
+          symbol, interval, bucket, open_close, high_close, low_close, last_close,
+          last_ema_fast, last_ema_slow, avg_rsi, n, first_at, last_at)
+        SELECT symbol, interval, date_trunc('hour', created_at),
+               (array_agg(close ORDER BY created_at))[1], max(close), min(close),
+               (array_agg(close ORDER BY created_at DESC))[1],
+               (array_agg(ema_fast ORDER BY created_at DESC))[1],
+               (array_agg(ema_slow ORDER BY created_at DESC))[1],
+               avg(rsi), count(*), min(created_at), max(created_at)
+        FROM {source} WHERE {where}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (symbol, interval, bucket) DO UPDATE SET
+          open_close = CASE WHEN EXCLUDED.first_at < h.first_at THEN EXCLUDED.open_close ELSE h.open_close END,
+          high_close = GREATEST(h.high_close, EXCLUDED.high_close),
+          low_close = LEAST(h.low_close, EXCLUDED.low_close),
+          last_close = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_close ELSE EXCLUDED.last_close END,
+          last_ema_fast = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_ema_fast ELSE EXCLUDED.last_ema_fast END,
+          last_ema_slow = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_ema_slow ELSE EXCLUDED.last_ema_slow END,
+          avg_rsi = COALESCE((h.avg_rsi * h.n + EXCLUDED.avg_rsi * EXCLUDED.n) / (h.n + EXCLUDED.n), h.avg_rsi, EXCLUDED.avg_rsi),
+          n = h.n + EXCLUDED.n,
+          first_at = LEAST(h.first_at, EXCLUDED.first_at),
+          last_at = GREATEST(h.last_at, EXCLUDED.last_at)
+        """,
+    ),
+    TickTable(
+        "binance_balance_snapshot",
+        "created_at",
+        "week",
+        rollup_sql="""
+        INSERT INTO binance_balance_hourly AS h(
+          bucket, last_total_usdt_est, min_total_usdt_est, max_total_usdt_est, n, first_at, last_at)
+        SELECT date_trunc('hour', created_at),
+               (array_agg(total_usdt_est ORDER BY created_at DESC))[1],
+               min(total_usdt_est), max(total_usdt_est), count(*), min(created_at), max(created_at)
+        FROM {source} WHERE {where}
+        GROUP BY 1
+        ON CONFLICT (bucket) DO UPDATE SET
+          last_total_usdt_est = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_total_usdt_est ELSE EXCLUDED.last_total_usdt_est END,
+          min_total_usdt_est = LEAST(h.min_total_usdt_est, EXCLUDED.min_total_usdt_est),
+          max_total_usdt_est = GREATEST(h.max_total_usdt_est, EXCLUDED.max_total_usdt_est),
+          n = h.n + EXCLUDED.n,
+          first_at = LEAST(h.first_at, EXCLUDED.first_at),
+          last_at = GREATEST(h.last_at, EXCLUDED.last_at)
+        """,
+    ),
+)
+
+
+def maintain(conn, tables: tuple[TickTable, ...] = TABLES, **kwargs) -> dict[str, dict[str, list[str]]]:
+    return _storage.maintain(conn, tables, lock_key=STORAGE_LOCK_KEY, **kwargs)
+
+
+def maintain_from_env(conn) -> dict[str, dict[str, list[str]]]:
+    return _storage.maintain_from_env(conn, TABLES, lock_key=STORAGE_LOCK_KEY)
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from db import connect
+
+    load_dotenv(dotenv_path=".env", override=False)
+    logging.basicConfig(level=logging.INFO)
+    conn = connect()
+    try:
+        for table, changes in maintain_from_env(conn).items():
+            print(f"{table}: created={changes['created']} dropped={changes['dropped']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -26,15 +26,21 @@ def decide_signal(
     sl_pct: float,
     min_score: float = 0.7,
     always_buy: bool = False,
+    values: tuple[float | None, float | None, float | None] | None = None,
 ) -> Signal | None:
     """Return a trading signal or None.
 
     - always_buy=True is intended ONLY for testnet load testing.
+    - values: precomputed (ema_fast, ema_slow, rsi), e.g. from indicators.IndicatorSet,
+      to skip recomputing them from `closes`.
     """
 
-    ef = ema(closes, ema_fast)
-    es = ema(closes, ema_slow)
-    rv = rsi(closes, rsi_period)
+    if values is not None:
+        ef, es, rv = values
+    else:
+        ef = ema(closes, ema_fast)
+        es = ema(closes, ema_slow)
+        rv = rsi(closes, rsi_period)
 
     # In testnet always-buy mode, we don't block on indicator availability.
     if always_buy and closes:
@@ -0,0 +1,302 @@
+"""Parallel parameter sweep over backtest.simulate, with a result cache.
+
+- Grid or random search over StrategyParams fields, across symbols/intervals.
+- Candles and every needed EMA/RSI series are computed once per dataset and
+  placed in shared memory; pool workers map them without copying.
+- Each (dataset, params) point is keyed by a hash. Results land in a local
+  SQLite table, and points already in it are not recomputed on rerun.
+
+Usage:
+  python sweep.py BTCUSDT,ETHUSDT 15m 90            # default grid, 90 days
+  python sweep.py BTCUSDT 1h 180 random 500          # 500 random points
+  SWEEP_GRID='{"ema_fast":[5,9],"ema_slow":[21,34]}' python sweep.py BTCUSDT 15m 30
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from multiprocessing import shared_memory, util
+from typing import Optional
+
+import numpy as np
+
+import backtest as bt
+import indicators_np as inp
+
+DEFAULT_GRID = {
+    "ema_fast": [5, 7, 9, 12],
+    "ema_slow": [21, 26, 34, 50],
+    "rsi_period": [7, 14, 21],
+    "min_score": [0.5, 0.6, 0.7],
+    "tp_pct": [0.004, 0.006, 0.01, 0.015],
+    "sl_pct": [0.003, 0.004, 0.006, 0.01],
+}
+
+_KLINE_FIELDS = ("close", "high", "low", "close_time")
+
+
+def _valid(p: bt.StrategyParams) -> bool:
+    return 0 < p.ema_fast < p.ema_slow and p.rsi_period > 0 and p.tp_pct > 0 and p.sl_pct > 0
+
+
+def param_grid(spec: dict[str, list], base: Optional[bt.StrategyParams] = None) -> list[bt.StrategyParams]:
+    """Cartesian product of `spec` values over `base` (invalid EMA pairs dropped)."""
+    base = base or bt.StrategyParams()
+    names = list(spec)
+    out = [replace(base, **dict(zip(names, combo))) for combo in itertools.product(*(spec[k] for k in names))]
+    return [p for p in out if _valid(p)]
+
+
+def random_params(
+    spec: dict[str, list], n: int, *, seed: int = 0, base: Optional[bt.StrategyParams] = None
+) -> list[bt.StrategyParams]:
+    """`n` distinct random points. A 2-element numeric list is a [lo, hi] range
+    (ints stay ints); longer lists are choices."""
+    base = base or bt.StrategyParams()
+    rnd = random.Random(seed)
+    seen: dict[bt.StrategyParams, None] = {}
+    for _ in range(n * 20):
+        if len(seen) >= n:
+            break
+        pick = {}
+        for k, v in spec.items():
+            if len(v) == 2 and all(isinstance(x, (int, float)) for x in v):
+                lo, hi = v
+                pick[k] = rnd.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) else rnd.uniform(lo, hi)
+            else:
+                pick[k] = rnd.choice(v)
+        p = replace(base, **pick)
+        if _valid(p):
+            seen[p] = None
+    return list(seen)
+
+
+def point_key(dataset_key: str, params: bt.StrategyParams, blog: tuple[float, float]) -> str:
+    payload = json.dumps([dataset_key, asdict(params), list(blog)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Candles for one (symbol, interval) plus the indicator series a sweep needs."""
+
+    symbol: str
+    interval: str
+    key: str  # symbol/interval/first/last open time: identifies the data for caching
+    shm_name: str
+    layout: dict  # array name -> (offset, length, dtype str)
+
+
+def _layout_arrays(kl: np.ndarray, points: list[bt.StrategyParams]) -> dict[str, np.ndarray]:
+    close = np.ascontiguousarray(kl["close"], dtype=np.float64)
+    arrays = {f: np.ascontiguousarray(kl[f]) for f in _KLINE_FIELDS}
+    for period in sorted({p.ema_fast for p in points} | {p.ema_slow for p in points}):
+        arrays[f"ema{period}"] = inp.ema(close, period)
+    for period in sorted({p.rsi_period for p in points}):
+        arrays[f"rsi{period}"] = inp.rsi(close, period)
+    return arrays
+
+
+def share_dataset(symbol: str, interval: str, kl: np.ndarray, points: list[bt.StrategyParams]) -> tuple[Dataset, shared_memory.SharedMemory]:
+    """Copy candles + indicator series into one shared-memory block (caller unlinks it)."""
+    arrays = _layout_arrays(kl, points)
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = (offset, len(a), a.dtype.str)
+        offset += a.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, a in arrays.items():
+        off, n, dt = layout[name]
+        np.ndarray(n, dtype=dt, buffer=shm.buf, offset=off)[:] = a
+    first, last = (int(kl["open_time"][0]), int(kl["open_time"][-1])) if len(kl) else (0, 0)
+    key = f"{symbol}/{interval}/{first}/{last}/{len(kl)}"
+    return Dataset(symbol, interval, key, shm.name, layout), shm
+
+
+# Per worker process: shm name -> (SharedMemory handle, array views)
+_ATTACHED: dict[str, tuple[shared_memory.SharedMemory, dict[str, np.ndarray]]] = {}
+
+
+def _views(ds: Dataset) -> dict[str, np.ndarray]:
+    hit = _ATTACHED.get(ds.shm_name)
+    if hit is None:
+        shm = shared_memory.SharedMemory(name=ds.shm_name)
+        views = {
+            name: np.ndarray(n, dtype=dt, buffer=shm.buf, offset=off) for name, (off, n, dt) in ds.layout.items()
+        }
+        hit = _ATTACHED[ds.shm_name] = (shm, views)
+    return hit[1]
+
+
+def _detach_all() -> None:
+    """Drop the views, then close every attached block (the parent unlinks them)."""
+    while _ATTACHED:
+        _, (shm, views) = _ATTACHED.popitem()
+        views.clear()
+        shm.close()
+
+
+def _init_worker() -> None:
+    # Pool workers leave through os._exit, which skips atexit; Finalize runs on worker shutdown.
+    util.Finalize(None, _detach_all, exitpriority=10)
+
+
+def _run_points(ds: Dataset, points: list[bt.StrategyParams], blog: tuple[float, float]) -> list[tuple[bt.StrategyParams, dict]]:
+    v = _views(ds)
+    kl = {f: v[f] for f in _KLINE_FIELDS}
+    out = []
+    for p in points:
+        ind = (v[f"ema{p.ema_fast}"], v[f"ema{p.ema_slow}"], v[f"rsi{p.rsi_period}"])
+        res = bt.simulate(kl, p, blog_ma_score=blog[0], blog_rsi_score=blog[1], indicators=ind)
+        out.append((p, res.summary()))
+    return out
+
+
+class ResultStore:
+    """Local SQLite table of sweep results, keyed by point hash."""
+
+    def __init__(self, path: str = "sweep_results.sqlite"):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sweep_result (
+              key TEXT PRIMARY KEY,
+              created_at REAL NOT NULL,
+              symbol TEXT NOT NULL,
+              interval TEXT NOT NULL,
+              dataset TEXT NOT NULL,
+              params_json TEXT NOT NULL,
+              trades INTEGER NOT NULL,
+              hit_rate REAL NOT NULL,
+              pnl REAL NOT NULL,
+              max_drawdown REAL NOT NULL,
+              summary_json TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sweep_result_dataset ON sweep_result(dataset, pnl)")
+        self.conn.commit()
+
+    def known(self, keys: list[str]) -> set[str]:
+        found: set[str] = set()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            q = "SELECT key FROM sweep_result WHERE key IN (%s)" % ",".join("?" * len(chunk))
+            found.update(r[0] for r in self.conn.execute(q, chunk))
+        return found
+
+    def add(self, ds: Dataset, rows: list[tuple[str, bt.StrategyParams, dict]]) -> None:
+        now = time.time()
+        self.conn.executemany(
+            """
+            INSERT OR REPLACE INTO sweep_result(key, created_at, symbol, interval, dataset, params_json, trades, hit_rate, pnl, max_drawdown, summary_json)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?)
+            """,
+            [
+                (k, now, ds.symbol, ds.interval, ds.key, json.dumps(asdict(p), sort_keys=True),
+                 s["trades"], s["hit_rate"], s["pnl"], s["max_drawdown"], json.dumps(s))
+                for k, p, s in rows
+            ],
+        )
+        self.conn.commit()
+
+    def top(self, dataset: str, n: int = 10) -> list[tuple]:
+        return self.conn.execute(
+            "SELECT pnl, hit_rate, max_drawdown, trades, params_json FROM sweep_result WHERE dataset=? ORDER BY pnl DESC LIMIT ?",
+            (dataset, n),
+        ).fetchall()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def run_sweep(
+    datasets: dict[tuple[str, str], np.ndarray],
+    points: list[bt.StrategyParams],
+    store: ResultStore,
+    *,
+    blog: tuple[float, float] = (1.0, 1.0),
+    workers: Optional[int] = None,
+    chunk: int = 64,
+) -> dict[str, int]:
+    """Run every uncached point on every dataset; returns {dataset key: points computed}."""
+    done: dict[str, int] = {}
+    shms = []
+    try:
+        jobs = []
+        for (symbol, interval), kl in datasets.items():
+            ds, shm = share_dataset(symbol, interval, kl, points)
+            shms.append(shm)
+            keys = {point_key(ds.key, p, blog): p for p in points}
+            cached = store.known(list(keys))
+            todo = [p for k, p in keys.items() if k not in cached]
+            done[ds.key] = len(todo)
+            jobs.extend((ds, todo[i : i + chunk]) for i in range(0, len(todo), chunk))
+        if not jobs:
+            return done
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [(ds, pool.submit(_run_points, ds, pts, blog)) for ds, pts in jobs]
+            for ds, fut in futures:
+                store.add(ds, [(point_key(ds.key, p, blog), p, s) for p, s in fut.result()])
+        return done
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from binance_api import BinanceApi
+    from kline_store import interval_ms
+
+    load_dotenv(dotenv_path=".env", override=False)
+    symbols = [s.strip().upper() for s in (sys.argv[1] if len(sys.argv) > 1 else "BTCUSDT").split(",") if s.strip()]
+    intervals = [s.strip() for s in (sys.argv[2] if len(sys.argv) > 2 else "15m").split(",") if s.strip()]
+    days = float(sys.argv[3]) if len(sys.argv) > 3 else 90.0
+    mode = sys.argv[4] if len(sys.argv) > 4 else "grid"
+    n_random = int(sys.argv[5]) if len(sys.argv) > 5 else 200
+
+    spec = json.loads(os.getenv("SWEEP_GRID") or "null") or DEFAULT_GRID
+    base = bt.StrategyParams.from_env()
+    if mode == "random":
+        points = random_params(spec, n_random, seed=int(os.getenv("SWEEP_SEED") or "0"), base=base)
+    elif mode == "grid":
+        points = param_grid(spec, base)
+    else:
+        raise RuntimeError(f"unknown sweep mode: {mode} (grid|random)")
+    blog = (float(os.getenv("BACKTEST_BLOG_MA_SCORE") or "1.0"), float(os.getenv("BACKTEST_BLOG_RSI_SCORE") or "1.0"))
+
+    api = BinanceApi("", "", base_url=os.getenv("BINANCE_BASE_URL") or "https://api.binance.com")
+    # End on a day boundary so reruns on the same day see the same candles (and hit the cache).
+    end = int(time.time() // 86400 * 86400 * 1000)
+    datasets = {}
+    for interval in intervals:
+        start = end - int(days * 86_400_000) // interval_ms(interval) * interval_ms(interval)
+        for sym in symbols:
+            datasets[(sym, interval)] = bt.fetch_history(api, sym, interval, start, end)
+
+    store = ResultStore(os.getenv("SWEEP_DB_PATH") or "sweep_results.sqlite")
+    workers = int(os.getenv("SWEEP_WORKERS") or "0") or None
+    t0 = time.perf_counter()
+    done = run_sweep(datasets, points, store, blog=blog, workers=workers)
+    print(f"{len(points)} points x {len(datasets)} datasets in {time.perf_counter() - t0:.1f}s")
+    for key, n in done.items():
+        print(f"\n{key}: computed {n}, cached {len(points) - n}")
+        for pnl, hit, dd, trades, params in store.top(key):
+            print(f"  pnl={pnl:+.4f} hit={hit:.2f} dd={dd:.4f} trades={trades} {params}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Exchange symbol-filter registry (LOT_SIZE / PRICE_FILTER / NOTIONAL / MAX_NUM_ORDERS).
+
+- Loads every needed symbol with one `exchangeInfo?symbols=[...]` call.
+- Caches the raw filters on disk with a TTL, so restarts skip the network.
+  The cache is stamped with its oldest full fetch: symbols added later do
+  not extend the TTL of entries fetched long before them.
+- Optional background refresh swaps in a new table without blocking readers.
+  Installs merge under a lock, so a refresh never drops symbols that
+  add_symbols added while it was fetching.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("binance_filters")
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / "exchange_filters.json"
+
+
+@dataclass(frozen=True)
+class SymbolFilters:
+    symbol: str
+    status: str
+    step: Decimal  # LOT_SIZE.stepSize
+    min_qty: Decimal
+    max_qty: Decimal
+    tick: Decimal  # PRICE_FILTER.tickSize
+    min_notional: Decimal  # NOTIONAL / MIN_NOTIONAL .minNotional (0 if absent)
+    max_notional: Optional[Decimal] = None
+    market_step: Optional[Decimal] = None  # MARKET_LOT_SIZE.stepSize
+    max_num_orders: Optional[int] = None
+    max_num_algo_orders: Optional[int] = None
+
+
+def _dec(v, default: str = "0") -> Decimal:
+    return Decimal(str(v if v not in (None, "") else default))
+
+
+def parse_symbol_filters(entry: dict) -> SymbolFilters:
+    """Parse one exchangeInfo `symbols[]` entry."""
+    by_type = {f.get("filterType"): f for f in (entry.get("filters") or [])}
+    lot = by_type.get("LOT_SIZE")
+    price = by_type.get("PRICE_FILTER")
+    if lot is None or price is None:
+        raise RuntimeError(f"could not find LOT_SIZE/PRICE_FILTER for {entry.get('symbol')}")
+    notional = by_type.get("NOTIONAL") or by_type.get("MIN_NOTIONAL") or {}
+    market_lot = by_type.get("MARKET_LOT_SIZE")
+    max_orders = by_type.get("MAX_NUM_ORDERS")
+    max_algo = by_type.get("MAX_NUM_ALGO_ORDERS")
+    market_step = _dec(market_lot.get("stepSize")) if market_lot else None
+    return SymbolFilters(
+        symbol=str(entry.get("symbol")),
+        status=str(entry.get("status") or "TRADING"),
+        step=_dec(lot.get("stepSize")),
+        min_qty=_dec(lot.get("minQty")),
+        max_qty=_dec(lot.get("maxQty")),
+        tick=_dec(price.get("tickSize")),
+        min_notional=_dec(notional.get("minNotional")),
+        max_notional=_dec(notional["maxNotional"]) if notional.get("maxNotional") else None,
+        market_step=market_step if market_step else None,
+        max_num_orders=int(max_orders["maxNumOrders"]) if max_orders else None,
+        max_num_algo_orders=int(max_algo["maxNumAlgoOrders"]) if max_algo else None,
+    )
+
+
+class FilterRegistry:
+    """symbol -> SymbolFilters, backed by a TTL'd JSON cache file."""
+
+    def __init__(self, api, *, cache_path: Optional[Path] = None, ttl_seconds: float = 86400.0):
+        self.api = api
+        self.cache_path = Path(cache_path) if cache_path else DEFAULT_CACHE_PATH
+        self.ttl_seconds = ttl_seconds
+        self.fetched_at = 0.0
+        self._symbols: list[str] = []
+        self._table: dict[str, SymbolFilters] = {}
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()  # writers only (load/add/refresh); readers use the swapped table
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __getitem__(self, symbol: str) -> SymbolFilters:
+        return self._table[symbol.upper()]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._table
+
+    def get(self, symbol: str) -> Optional[SymbolFilters]:
+        return self._table.get(symbol.upper())
+
+    def load(self, symbols: list[str]) -> None:
+        """Load from the disk cache if fresh and complete, else fetch in one call."""
+        with self._lock:
+            self._symbols = sorted({s.upper() for s in symbols} | set(self._symbols))
+            wanted = list(self._symbols)
+        cached = self._read_cache()
+        if cached is not None and all(s in cached[0] for s in wanted):
+            with self._lock:
+                self._install({**self._entries, **cached[0]}, cached[1], write=False)
+            return
+        fetched, fetched_at = self._fetch(wanted), time.time()
+        with self._lock:
+            self._install({**self._entries, **fetched}, fetched_at)
+
+    def add_symbols(self, symbols: list[str]) -> None:
+        """Ensure filters exist for extra symbols (one bulk call for the missing ones).
+
+        The cache keeps its older stamp: the new entries expire with the rest.
+        """
+        missing = sorted({s.upper() for s in symbols} - set(self._table))
+        if not missing:
+            return
+        fetched = self._fetch(missing)
+        with self._lock:
+            self._symbols = sorted(set(self._symbols) | set(missing))
+            self._install({**self._entries, **fetched}, self.fetched_at or time.time())
+
+    def refresh(self) -> None:
+        """Refetch every symbol and restamp the cache."""
+        started = time.time()
+        with self._lock:
+            wanted = list(self._symbols)
+        fetched = self._fetch(wanted)
+        with self._lock:
+            # Symbols added while we were fetching are kept.
+            self._install({**self._entries, **fetched}, started)
+
+    def start_background_refresh(self, interval_seconds: Optional[float] = None) -> None:
+        if self._thread is not None:
+            return
+        every = interval_seconds or max(60.0, self.ttl_seconds / 2.0)
+
+        def _loop() -> None:
+            while not self._stop.wait(every):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # keep serving the previous table
+                    logger.warning("filter refresh failed: %s", e)
+
+        self._thread = threading.Thread(target=_loop, name="filter-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---- internals ----
+
+    def _install(self, entries: dict[str, dict], fetched_at: float, *, write: bool = True) -> None:
+        """Swap in `entries` stamped `fetched_at`, and write the cache (caller holds the lock)."""
+        table = {sym: parse_symbol_filters(e) for sym, e in entries.items()}
+        self._entries = entries
+        self._table = table  # atomic swap; readers never see a half-built table
+        self.fetched_at = fetched_at
+        if write:
+            self._write_cache(entries)
+
+    def _fetch(self, symbols: list[str]) -> dict[str, dict]:
+        info = self.api.exchange_info_bulk(symbols)
+        entries = {}
+        for e in info.get("symbols") or []:
+            entries[str(e.get("symbol")).upper()] = {
+                "symbol": e.get("symbol"),
+                "status": e.get("status"),
+                "filters": e.get("filters") or [],
+            }
+        if not entries:
+            raise RuntimeError("exchangeInfo missing symbols")
+        return entries
+
+    def _read_cache(self) -> Optional[tuple[dict[str, dict], float]]:
+        """(entries, fetched_at) of a fresh cache file, else None."""
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        fetched_at = float(data.get("fetched_at") or 0.0)
+        if time.time() - fetched_at > self.ttl_seconds:
+            return None
+        return data.get("symbols") or {}, fetched_at
+
+    def _write_cache(self, entries: dict[str, dict]) -> None:
+        tmp = self.cache_path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps({"fetched_at": self.fetched_at, "symbols": entries}), encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            logger.warning("filter cache write failed (%s): %s", self.cache_path, e)
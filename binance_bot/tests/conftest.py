@@ -0,0 +1 @@
+# Empty (reserved for future fixtures)
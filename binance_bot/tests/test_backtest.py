@@ -0,0 +1,124 @@
+import random
+
+import numpy as np
+
+import backtest as bt
+from kline_store import KLINE_DTYPE
+from strategy import decide_signal
+
+
+def _klines(n=400, seed=5, step_ms=900_000):
+    rnd = random.Random(seed)
+    kl = np.zeros(n, dtype=KLINE_DTYPE)
+    px = 100.0
+    for i in range(n):
+        o = px
+        px = px * (1 + rnd.gauss(0, 0.004))
+        kl[i] = (i * step_ms, (i + 1) * step_ms - 1, o, max(o, px) * (1 + abs(rnd.gauss(0, 0.002))),
+                 min(o, px) * (1 - abs(rnd.gauss(0, 0.002))), px, 1.0, px)
+    return kl
+
+
+def test_entries_match_decide_signal():
+    kl = _klines()
+    closes = kl["close"].tolist()
+    blog_ma = np.array([(i // 50) % 3 for i in range(len(kl))], dtype=float)
+    blog_rsi = np.array([1.0 + (i // 70) % 2 for i in range(len(kl))])
+    p = bt.StrategyParams(ema_fast=5, ema_slow=13, rsi_period=7, min_score=0.5)
+    mask = bt.entry_mask(*bt.indicator_arrays(kl["close"], 5, 13, 7), blog_ma, blog_rsi, p.min_score)
+    want = [
+        decide_signal(
+            closes[: i + 1],
+            ema_fast=5,
+            ema_slow=13,
+            rsi_period=7,
+            blog_ma_score=float(blog_ma[i]),
+            blog_rsi_score=float(blog_rsi[i]),
+            tp_pct=p.tp_pct,
+            sl_pct=p.sl_pct,
+            min_score=p.min_score,
+        )
+        is not None
+        for i in range(len(closes))
+    ]
+    assert any(want) and not all(want)
+    assert mask.tolist() == want
+
+
+def _loop_trades(kl, mask, p):
+    """Reference: candle-by-candle replay of one position at a time."""
+    out, pos, i = [], None, 0
+    hold_ms = None if p.hold_seconds is None else p.hold_seconds * 1000
+    for i in range(len(kl)):
+        if pos is not None:
+            e, tp, sl = pos
+            hi, lo = (kl["high"][i], kl["low"][i]) if hold_ms is None else (kl["close"][i], kl["close"][i])
+            if lo <= sl:
+                out.append((e, i, sl if hold_ms is None else kl["close"][i]))
+            elif hi >= tp:
+                out.append((e, i, tp if hold_ms is None else kl["close"][i]))
+            elif hold_ms is not None and kl["close_time"][i] >= kl["close_time"][e] + hold_ms:
+                out.append((e, i, kl["close"][i]))
+            else:
+                continue
+            pos = None
+        if pos is None and mask[i] and i < len(kl) - 1:
+            c = kl["close"][i]
+            pos = (i, c * (1 + p.tp_pct), c * (1 - p.sl_pct))
+    if pos is not None:
+        out.append((pos[0], len(kl) - 1, kl["close"][-1]))
+    return out
+
+
+def test_exits_match_candle_loop():
+    kl = _klines(n=3000, seed=11)
+    for hold in (None, 3600):
+        p = bt.StrategyParams(ema_fast=5, ema_slow=13, rsi_period=7, min_score=0.3, hold_seconds=hold)
+        res = bt.simulate(kl, p, blog_ma_score=1.0, blog_rsi_score=1.0)
+        mask = bt.entry_mask(*bt.indicator_arrays(kl["close"], 5, 13, 7), 1.0, 1.0, p.min_score)
+        want = _loop_trades(kl, mask, p)
+        got = list(zip(res.trades["entry_idx"].tolist(), res.trades["exit_idx"].tolist(), res.trades["exit_price"].tolist()))
+        assert len(got) > 20
+        assert got == [(e, x, float(px)) for e, x, px in want]
+        assert res.max_drawdown >= 0.0 and 0.0 <= res.hit_rate <= 1.0
+
+
+def test_overlapping_positions_follow_the_daemon_limits():
+    kl = _klines(n=3000, seed=11)
+    mask = bt.entry_mask(*bt.indicator_arrays(kl["close"], 5, 13, 7), 1.0, 1.0, 0.3)
+    base = dict(ema_fast=5, ema_slow=13, rsi_period=7, min_score=0.3, quote=1.0)
+    single = bt.simulate(kl, bt.StrategyParams(**base))
+    free = bt.simulate(kl, bt.StrategyParams(**base, max_open_positions=None))
+    assert free.n_trades == int(mask[:-1].sum()) > single.n_trades
+    assert (np.diff(free.trades["entry_idx"]) > 0).all()
+
+    # Two at a time: no candle ever has more than two positions open.
+    two = bt.simulate(kl, bt.StrategyParams(**base, max_open_positions=2))
+    assert single.n_trades < two.n_trades < free.n_trades
+    for e in two.trades["entry_idx"]:
+        still_open = (two.trades["entry_idx"] <= e) & (two.trades["exit_idx"] > e)
+        assert still_open.sum() <= 2
+
+    # OCO mode: overlapping, but at most daily_cap / quote entries per UTC day.
+    capped = bt.simulate(kl, bt.StrategyParams(**base, max_open_positions=None, daily_cap=3.0))
+    days = capped.trades["entry_time"] // 86_400_000
+    assert np.bincount(days - days.min()).max() <= 3
+    assert capped.n_trades < free.n_trades
+
+
+def test_from_env_matches_daemon_gates(monkeypatch):
+    monkeypatch.setenv("DAILY_QUOTE_CAP", "12")
+    monkeypatch.setenv("MAX_OPEN_POSITIONS", "3")
+    monkeypatch.delenv("TESTNET_NO_OCO", raising=False)
+    oco = bt.StrategyParams.from_env()
+    assert (oco.daily_cap, oco.max_open_positions) == (12.0, None)
+    monkeypatch.setenv("TESTNET_NO_OCO", "true")
+    no_oco = bt.StrategyParams.from_env()
+    assert (no_oco.daily_cap, no_oco.max_open_positions) == (None, 3)
+
+
+def test_rolling_blog_scores_window():
+    ev = np.array([0, 10, 20, 30])
+    ma, rs = bt.rolling_blog_scores(np.array([5, 25, 45]), ev, [1, 0, 1, 1], [0, 1, 1, 0], window_ms=15)
+    assert ma.tolist() == [1.0, 1.0, 1.0]
+    assert rs.tolist() == [0.0, 2.0, 0.0]
@@ -0,0 +1,113 @@
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from binance_api import BinanceApi, ClockSync
+
+
+class _Clock:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+class _ServerTime:
+    """Server clock `offset_ms` ahead of local time; each call takes the next RTT."""
+
+    def __init__(self, clock, offset_ms, rtts_ms):
+        self.clock = clock
+        self.offset_ms = offset_ms
+        self.rtts = list(rtts_ms)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        rtt = self.rtts.pop(0)
+        self.clock.t += rtt / 2000.0
+        server_ms = self.clock.t * 1000.0 + self.offset_ms
+        self.clock.t += rtt / 2000.0
+        return int(server_ms)
+
+
+def test_sync_keeps_the_lowest_rtt_sample(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr("binance_api.time.time", clock)
+    fetch = _ServerTime(clock, 1500, [400, 40, 200])
+    sync = ClockSync(fetch, resync_seconds=300)
+
+    assert sync.is_stale()
+    before = clock.t
+    assert sync.now_ms() == pytest.approx(clock.t * 1000 + 1500, abs=2)  # first use syncs
+    assert fetch.calls == 3 and sync.synced_at == clock.t and clock.t > before
+    assert sync.offset_ms == pytest.approx(1500, abs=1) and sync.error_ms == pytest.approx(20)
+
+    clock.t += 10
+    assert sync.now_ms() == pytest.approx(clock.t * 1000 + 1500, abs=2) and fetch.calls == 3
+    assert not sync.maybe_resync()
+    clock.t += 300
+    fetch.rtts, fetch.offset_ms = [10, 10, 10], -250
+    assert sync.maybe_resync() and fetch.calls == 6
+    assert sync.offset_ms == pytest.approx(-250, abs=1) and sync.error_ms == pytest.approx(5)
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+        self.headers = {"X-MBX-USED-WEIGHT-1M": "20"}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class _Session:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.timestamps = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        qs = parse_qs(urlsplit(url).query)
+        self.timestamps.append(int(qs["timestamp"][0]))
+        return self.answers.pop(0)
+
+
+def _api(monkeypatch, answers):
+    clock = _Clock()
+    monkeypatch.setattr("binance_api.time.time", clock)
+    api = BinanceApi("k", "s", base_url="https://testnet.binance.vision")
+    fetch = _ServerTime(clock, 0, [10] * 6)
+    api.clock = ClockSync(fetch)
+    api.session = _Session(answers)
+    return api, fetch
+
+
+def test_signed_resyncs_and_retries_once_on_1021(monkeypatch):
+    stale = _Response(400, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."})
+    api, fetch = _api(monkeypatch, [stale, _Response(200, {"balances": []})])
+    api.clock.sync()
+    fetch.offset_ms = 7000  # the local clock drifts after the first sync
+
+    assert api.account() == {"balances": []}
+    assert fetch.calls == 6 and api.clock.offset_ms == pytest.approx(7000, abs=1)
+    first, retry = api.session.timestamps
+    now_ms = fetch.clock.t * 1000
+    assert first == pytest.approx(now_ms - 30, abs=1)
+    assert retry == pytest.approx(now_ms + 7000, abs=1)  # re-signed with the new offset
+
+
+def test_signed_gives_up_after_one_retry(monkeypatch):
+    stale = _Response(400, {"code": -1021, "msg": "outside of the recvWindow"})
+    api, fetch = _api(monkeypatch, [stale, stale])
+    with pytest.raises(RuntimeError, match="400"):
+        api.account()
+    assert len(api.session.timestamps) == 2 and fetch.calls == 6
+
+
+def test_signed_does_not_retry_other_errors(monkeypatch):
+    api, fetch = _api(monkeypatch, [_Response(400, {"code": -2010, "msg": "insufficient balance"})])
+    with pytest.raises(RuntimeError, match="-2010"):
+        api.account()
+    assert len(api.session.timestamps) == 1 and fetch.calls == 3
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from binance_api import PRIORITY_LOW, BinanceApi, RateLimitedError, WeightGovernor
+from binance_api_async import AsyncBinanceApi
+from mock_exchange import MockConfig, MockExchange
+
+
+@pytest.fixture
+def exchange():
+    ex = MockExchange(MockConfig(seed=1)).start()
+    try:
+        yield ex
+    finally:
+        ex.stop()
+
+
+def test_from_sync_shares_clock_and_governor(exchange):
+    api = BinanceApi("k", "s", base_url=exchange.base_url, recv_window=7000)
+    aapi = AsyncBinanceApi.from_sync(api, max_connections=4)
+    try:
+        assert aapi.clock is api.clock and aapi.governor is api.governor
+        assert (aapi.api_key, aapi.api_secret, aapi.base_url, aapi.recv_window) == ("k", b"s", api.base_url, 7000)
+    finally:
+        asyncio.run(aapi.aclose())
+
+
+def test_klines_many_keeps_failures_per_symbol(exchange):
+    api = BinanceApi("k", "s", base_url=exchange.base_url)
+
+    async def run():
+        aapi = AsyncBinanceApi.from_sync(api)
+        try:
+            return await aapi.klines_many(["MK001USDT", "BAD", "MK002USDT"], "1m", limit=20)
+        finally:
+            await aapi.aclose()
+
+    out = asyncio.run(run())
+    assert list(out) == ["MK001USDT", "BAD", "MK002USDT"]
+    assert len(out["MK001USDT"]) == 20 and len(out["MK002USDT"]) == 20
+    assert isinstance(out["BAD"], httpx.HTTPStatusError) and out["BAD"].response.status_code == 400
+    assert exchange.stats()["requests"]["/api/v3/klines"] == 3
+    assert api.governor.used_weight >= 2  # usage headers reach the shared governor
+
+
+def test_klines_many_drops_what_the_budget_cannot_cover(exchange):
+    api = BinanceApi("k", "s", base_url=exchange.base_url)
+    # LOW may use 60% of 10 weight: three 2-weight kline calls fit, the rest are dropped
+    api.governor = WeightGovernor(weight_limit=10, now=lambda: 1_000_040.0)
+    symbols = [f"MK00{i}USDT" for i in range(1, 6)]
+
+    async def run():
+        aapi = AsyncBinanceApi.from_sync(api)
+        try:
+            return await aapi.klines_many(symbols, "1m", limit=5, priority=PRIORITY_LOW)
+        finally:
+            await aapi.aclose()
+
+    out = asyncio.run(run())
+    assert [isinstance(out[s], list) for s in symbols] == [True, True, True, False, False]
+    assert all(isinstance(out[s], RateLimitedError) for s in symbols[3:])
+    assert api.governor.dropped == 2 and exchange.stats()["requests"]["/api/v3/klines"] == 3
+
+
+def test_clock_sync_runs_off_the_event_loop(exchange):
+    api = BinanceApi("k", "s", base_url=exchange.base_url)
+    fetch, threads = api.clock._fetch, []
+
+    def server_time():
+        threads.append(threading.get_ident())
+        return fetch()
+
+    api.clock._fetch = server_time
+
+    async def run():
+        aapi = AsyncBinanceApi.from_sync(api)
+        try:
+            return threading.get_ident(), await aapi.account()
+        finally:
+            await aapi.aclose()
+
+    loop_thread, account = asyncio.run(run())
+    assert "balances" in account and api.clock.error_ms is not None
+    assert threads and loop_thread not in threads
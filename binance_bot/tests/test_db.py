@@ -0,0 +1,37 @@
+from db import healthy_conn
+
+
+class _Conn:
+    def __init__(self, name, broken=False, closed=False):
+        self.name, self.broken, self.closed = name, broken, closed
+
+
+class _Pool:
+    def __init__(self):
+        self.n, self.returned = 0, []
+
+    def getconn(self):
+        self.n += 1
+        return _Conn(f"c{self.n}")
+
+    def putconn(self, conn):
+        self.returned.append(conn.name)
+
+
+def test_healthy_connection_is_kept():
+    pool, conn = _Pool(), _Conn("c0")
+    assert healthy_conn(pool, conn) is conn
+    assert pool.n == 0 and pool.returned == []
+
+
+def test_broken_or_closed_connection_is_swapped():
+    pool = _Pool()
+    fresh = healthy_conn(pool, _Conn("c0", broken=True))
+    assert fresh.name == "c1" and pool.returned == ["c0"]
+    fresh = healthy_conn(pool, _Conn("cx", closed=True))
+    assert fresh.name == "c2" and pool.returned == ["c0", "cx"]
+
+
+def test_missing_connection_is_checked_out():
+    pool = _Pool()
+    assert healthy_conn(pool, None).name == "c1" and pool.returned == []
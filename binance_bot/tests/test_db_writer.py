@@ -0,0 +1,143 @@
+import time
+
+import psycopg
+
+from db_writer import WriteBehind
+
+
+class _Copy:
+    def __init__(self, conn):
+        self.conn, self.rows = conn, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *a):
+        if exc_type is None:
+            if any("bad" in r for r in self.rows):
+                raise psycopg.errors.InvalidTextRepresentation("invalid input syntax")
+            self.conn.staged.extend(self.rows)
+        return False
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class _Cur:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def copy(self, sql):
+        if self.conn.down:
+            raise psycopg.OperationalError("server closed the connection")
+        return _Copy(self.conn)
+
+    def execute(self, sql, row):
+        if "bad" in row:
+            raise psycopg.errors.InvalidTextRepresentation("invalid input syntax")
+        self.conn.staged.append(row)
+
+
+class _Conn:
+    closed = False
+
+    def __init__(self):
+        self.staged, self.rows, self.down = [], [], False
+
+    def cursor(self):
+        return _Cur(self)
+
+    def commit(self):
+        self.rows.extend(self.staged)
+        self.staged = []
+
+    def rollback(self):
+        self.staged = []
+
+
+def _rows(conn):
+    return [r[1:] for r in conn.rows]  # drop the created_at stamp
+
+
+def test_batches_by_size_and_by_age():
+    conn = _Conn()
+    wb = WriteBehind(lambda: conn, batch_size=3, flush_seconds=0.2).start()
+    try:
+        for i in range(3):
+            wb.add("t", ("v",), (i,))
+        deadline = time.time() + 2
+        while len(conn.rows) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert _rows(conn) == [(0,), (1,), (2,)]
+
+        wb.add("t", ("v",), (3,))  # below batch_size: flushed once it is flush_seconds old
+        time.sleep(0.05)
+        assert len(conn.rows) == 3
+        deadline = time.time() + 2
+        while len(conn.rows) < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        assert _rows(conn)[-1] == (3,)
+    finally:
+        wb.close()
+    assert wb.written == 4 and wb.dropped == 0
+
+
+def test_full_queue_drops_without_blocking():
+    wb = WriteBehind(lambda: _Conn(), batch_size=2, max_rows=2)  # writer not started
+    assert wb.add("t", ("v",), (1,)) and wb.add("t", ("v",), (2,))
+    assert not wb.add("t", ("v",), (3,))
+    assert wb.dropped == 1
+
+
+def test_failed_flush_retries_then_trims_oldest():
+    conn = _Conn()
+    conn.down = True
+    wb = WriteBehind(lambda: conn, batch_size=2, max_rows=3)
+    for i in range(5):
+        wb._take(("t", ("v",), (i,)))
+    wb._flush()
+    assert wb.failed_flushes == 1 and wb.dropped == 2 and wb._n_pending == 3
+
+    conn.down = False
+    wb._flush()
+    assert conn.rows == [(2,), (3,), (4,)] and wb._n_pending == 0
+
+
+def test_poison_row_is_dropped_not_retried_forever():
+    conn = _Conn()
+    wb = WriteBehind(lambda: conn, batch_size=10)
+    for v in ("a", "bad", "c"):
+        wb._take(("t", ("v",), (v,)))
+    wb._take(("u", ("v",), ("x",)))
+    wb._flush()
+    assert sorted(conn.rows) == [("a",), ("c",), ("x",)]
+    assert wb.rejected == 1 and wb.written == 3 and wb._n_pending == 0 and wb.failed_flushes == 0
+
+
+def test_connection_loss_during_row_retry_keeps_unwritten_rows(monkeypatch):
+    conn = _Conn()
+    wb = WriteBehind(lambda: conn, batch_size=10)
+    for v in ("a", "bad", "c"):
+        wb._take(("t", ("v",), (v,)))
+    calls = {"n": 0}
+    execute = _Cur.execute
+
+    def flaky(self, sql, row):
+        calls["n"] += 1
+        if calls["n"] == 3:
+            raise psycopg.OperationalError("connection lost")
+        execute(self, sql, row)
+
+    monkeypatch.setattr(_Cur, "execute", flaky)
+    wb._flush()
+    assert conn.rows == [("a",)] and wb.rejected == 1 and wb._n_pending == 1
+
+    monkeypatch.setattr(_Cur, "execute", execute)
+    wb._flush()
+    assert conn.rows == [("a",), ("c",)] and wb._n_pending == 0
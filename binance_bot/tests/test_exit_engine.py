@@ -0,0 +1,78 @@
+from exit_engine import ExitEngine, OpenPosition
+
+
+def _pos(pid, tp, sl, exit_ms=None, sym="BTCUSDT"):
+    return OpenPosition(id=pid, symbol=sym, base_qty=1.0, tp=tp, sl=sl, planned_exit_ms=exit_ms)
+
+
+def test_price_levels_and_deadlines():
+    woken = []
+    eng = ExitEngine(now_ms=lambda: 0, on_trigger=lambda: woken.append(1))
+    eng.add(_pos(1, tp=110, sl=90, exit_ms=5_000))
+    eng.add(_pos(2, tp=105, sl=95, exit_ms=1_000))
+    eng.add(_pos(3, tp=120, sl=80))
+    eng.add(_pos(4, tp=101, sl=99, sym="ETHUSDT"))
+
+    eng.on_price("BTCUSDT", 100.0)
+    assert eng.drain(now_ms=0) == [] and not woken
+
+    eng.on_price("BTCUSDT", 106.0)
+    assert [(o.position.id, o.reason) for o in eng.drain(now_ms=0)] == [(2, "tp_hit")]
+    assert woken
+
+    eng.remove(3)
+    eng.on_price("BTCUSDT", 70.0)
+    assert [(o.position.id, o.reason, o.last_price) for o in eng.drain(now_ms=0)] == [(1, "sl_hit", 70.0)]
+
+    eng.add(_pos(5, tp=200, sl=10, exit_ms=2_000))
+    assert eng.next_deadline_ms() == 2_000
+    assert eng.drain(now_ms=1_999) == []
+    assert [(o.position.id, o.reason) for o in eng.drain(now_ms=2_000)] == [(5, "timeout")]
+    assert len(eng) == 1 and eng.symbols() == {"ETHUSDT"}
+
+
+def test_remove_symbols_drops_positions_and_pending_exits():
+    eng = ExitEngine(now_ms=lambda: 0)
+    eng.add(_pos(1, tp=110, sl=90))
+    eng.add(_pos(2, tp=101, sl=99, sym="ETHUSDT"))
+    eng.on_price("ETHUSDT", 102.0)  # triggered, not drained yet
+    eng.remove_symbols({"ETHUSDT"})
+    assert eng.drain(now_ms=0) == []
+    assert eng.symbols() == {"BTCUSDT"}
+    assert eng.remove_symbols(["BTCUSDT"]) == [1] and len(eng) == 0
+
+
+def test_failed_sell_is_retried_after_backoff_not_replayed():
+    now = [0]
+    woken = []
+    eng = ExitEngine(now_ms=lambda: now[0], on_trigger=lambda: woken.append(1), retry_base_ms=1_000, retry_max_ms=3_000)
+    eng.add(_pos(1, tp=110, sl=90))
+    eng.on_price("BTCUSDT", 80.0)
+    (order,) = eng.drain()
+    woken.clear()
+
+    assert eng.retry(order) == 1_000
+    eng.on_price("BTCUSDT", 80.0)  # still below SL: a parked position is not re-fired by prices
+    assert not woken and eng.drain() == [] and len(eng) == 1 and eng.symbols() == {"BTCUSDT"}
+    assert eng.next_deadline_ms() == 1_000
+
+    now[0] = 1_000
+    (again,) = eng.drain()
+    assert (again.position.id, again.reason, again.attempt) == (1, "sl_hit", 1)
+    assert eng.retry(again) == 2_000
+    now[0] = 3_000
+    (third,) = eng.drain()
+    assert eng.retry(third) == 3_000  # capped
+
+    eng.remove(1)
+    now[0] = 10_000
+    assert eng.drain() == [] and len(eng) == 0
+
+
+def test_past_due_deadline_retry_waits_for_backoff():
+    eng = ExitEngine(now_ms=lambda: 5_000, retry_base_ms=1_000)
+    eng.add(_pos(1, tp=None, sl=None, exit_ms=1_000))
+    (order,) = eng.drain()
+    eng.retry(order)
+    assert eng.drain() == []
+    assert [o.reason for o in eng.drain(now_ms=6_000)] == ["timeout"]
@@ -0,0 +1,23 @@
+from datetime import date
+
+from exposure import ExposureLedger, ExposureSnapshot
+
+
+def test_ledger_tracks_orders_positions_and_day_rollover():
+    day = [date(2026, 1, 1)]
+    snap = ExposureSnapshot(spent_today=3.0, spent_by_market={"BTCUSDT": 3.0}, open_positions={7: ("BTCUSDT", 3.0)})
+    ledger = ExposureLedger(lambda conn: snap, today=lambda: day[0])
+    ledger.reconcile(None)
+    assert ledger.open_count() == 1 and ledger.market_exposure("BTCUSDT") == 3.0
+
+    ledger.record_order("ETHUSDT", 2.0)
+    ledger.open_position(8, "ETHUSDT", 2.0)
+    assert ledger.spent_today() == 5.0 and ledger.spent_today_market("ETHUSDT") == 2.0
+    assert ledger.can_spend(5.0, 10.0) and not ledger.can_spend(5.01, 10.0)
+
+    ledger.close_position(7)
+    ledger.close_position(7)
+    assert ledger.open_count() == 1 and ledger.open_count("BTCUSDT") == 0 and ledger.market_exposure("BTCUSDT") == 0.0
+
+    day[0] = date(2026, 1, 2)
+    assert ledger.spent_today() == 0.0 and ledger.open_count() == 1
@@ -0,0 +1,42 @@
+from indicator_cache import IndicatorCache
+
+
+def test_unchanged_candle_reuses_values_and_close_is_reported_once():
+    c = IndicatorCache()
+    o = c.observe("BTCUSDT", "1m", 1000, 10.0, now=0.0)
+    assert o.changed and o.values is None and o.closed_open_time is None
+    c.remember("BTCUSDT", "1m", (1.0, 2.0, 50.0))
+
+    o = c.observe("BTCUSDT", "1m", 1000, 10.0, now=1.0)
+    assert not o.changed and o.values == (1.0, 2.0, 50.0) and c.skipped == 1
+
+    o = c.observe("BTCUSDT", "1m", 1000, 10.5, now=2.0)  # price moved: recompute
+    assert o.changed and o.values is None and o.closed_open_time is None
+
+    o = c.observe("BTCUSDT", "1m", 2000, 10.5, now=3.0)  # next candle: 1000 closed
+    assert o.changed and o.closed_open_time == 1000
+    assert c.observe("BTCUSDT", "1m", 2000, 10.5, now=4.0).closed_open_time is None
+
+
+def test_keys_are_independent():
+    c = IndicatorCache()
+    c.observe("BTCUSDT", "1m", 1000, 10.0, now=0.0)
+    c.remember("BTCUSDT", "1m", (1,))
+    assert c.observe("ETHUSDT", "1m", 1000, 10.0, now=0.0).changed
+    assert c.observe("BTCUSDT", "5m", 1000, 10.0, now=0.0).changed
+    assert not c.observe("BTCUSDT", "1m", 1000, 10.0, now=0.0).changed
+
+
+def test_samples_are_sparse_and_only_on_price_moves():
+    c = IndicatorCache(sample_seconds=60.0)
+    assert c.observe("BTCUSDT", "1m", 1000, 10.0, now=100.0).sample_due
+    assert not c.observe("BTCUSDT", "1m", 1000, 10.1, now=130.0).sample_due  # too soon
+    assert c.observe("BTCUSDT", "1m", 1000, 10.2, now=160.0).sample_due
+    assert not c.observe("BTCUSDT", "1m", 1000, 10.2, now=300.0).sample_due  # no move
+    # A new candle restarts sampling even within the interval.
+    assert c.observe("BTCUSDT", "1m", 2000, 10.2, now=301.0).sample_due
+
+
+def test_no_samples_when_disabled():
+    c = IndicatorCache()
+    assert not c.observe("BTCUSDT", "1m", 1000, 10.0, now=100.0).sample_due
@@ -0,0 +1,50 @@
+import random
+
+from indicators import EmaState, IndicatorSet, MacdState, RsiState, ema, rsi
+
+
+def _series(n=300, seed=7):
+    rnd = random.Random(seed)
+    xs = [100.0]
+    for _ in range(n - 1):
+        xs.append(xs[-1] * (1 + rnd.gauss(0, 0.01)))
+    return xs
+
+
+def test_streaming_ema_rsi_match_batch():
+    xs = _series()
+    e = EmaState(9)
+    r = RsiState(14)
+    for i, x in enumerate(xs):
+        assert e.peek(x) == ema(xs[: i + 1], 9)
+        assert r.peek(x) == rsi(xs[: i + 1], 14)
+        e.update(x)
+        r.update(x)
+        assert e.value == ema(xs[: i + 1], 9)
+        assert r.value == rsi(xs[: i + 1], 14)
+
+
+def test_state_round_trip():
+    xs = _series()
+    e, r, m = EmaState(21), RsiState(14), MacdState()
+    for x in xs[:150]:
+        e.update(x)
+        r.update(x)
+        m.update(x)
+    e2, r2, m2 = EmaState.from_dict(e.to_dict()), RsiState.from_dict(r.to_dict()), MacdState.from_dict(m.to_dict())
+    for x in xs[150:]:
+        assert e.update(x) == e2.update(x)
+        assert r.update(x) == r2.update(x)
+        assert m.update(x) == m2.update(x)
+
+
+def test_indicator_set_from_kline_rows():
+    xs = _series(260)
+    rows = [[i * 60_000, "0", "0", "0", str(x), "0", i * 60_000 + 59_999] for i, x in enumerate(xs)]
+    st = IndicatorSet(9, 21, 14)
+    st.sync(rows[:200])
+    ef, es, rv = st.sync(rows[:230])  # 30 new closed candles, last one open
+    closes = [float(k[4]) for k in rows[:230]]
+    assert ef == ema(closes, 9)
+    assert es == ema(closes, 21)
+    assert rv == rsi(closes, 14)
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+
+import indicators_np as inp
+from indicators import AtrState, MacdState, ema, rsi
+
+
+def _series(n=400, seed=3):
+    rnd = random.Random(seed)
+    xs = [100.0]
+    for _ in range(n - 1):
+        xs.append(xs[-1] * (1 + rnd.gauss(0, 0.01)))
+    return xs
+
+
+def test_ema_rsi_match_scalar():
+    xs = _series()
+    for period in (2, 9, 21, 200):
+        series = inp.ema(xs, period)
+        for i in (period - 2, period - 1, period, 250, len(xs) - 1):
+            want = ema(xs[: i + 1], period)
+            if want is None:
+                assert np.isnan(series[i])
+            else:
+                assert abs(series[i] - want) <= 1e-9 * abs(want)
+    series = inp.rsi(xs, 14)
+    for i in (13, 14, 15, 100, len(xs) - 1):
+        want = rsi(xs[: i + 1], 14)
+        if want is None:
+            assert np.isnan(series[i])
+        else:
+            assert abs(series[i] - want) <= 1e-9 * want
+
+
+def test_two_dimensional_rows_match_one_dimensional():
+    data = np.array([_series(seed=s) for s in range(4)])
+    got = inp.rsi(data, 14)
+    for row in range(4):
+        np.testing.assert_allclose(got[row], inp.rsi(data[row], 14), rtol=1e-12, equal_nan=True)
+
+
+def test_macd_atr_match_streaming_state():
+    xs = _series()
+    line, sig, _ = inp.macd(xs)
+    m = MacdState()
+    for x in xs:
+        m.update(x)
+    assert abs(line[-1] - m.value[0]) < 1e-9
+    assert abs(sig[-1] - m.value[1]) < 1e-9
+
+    highs = [x * 1.01 for x in xs]
+    lows = [x * 0.99 for x in xs]
+    a = AtrState(14)
+    for h, lo, c in zip(highs, lows, xs):
+        a.update(h, lo, c)
+    assert abs(inp.atr(highs, lows, xs, 14)[-1] - a.value) < 1e-9
+
+
+def test_sma_bollinger():
+    xs = np.array(_series(60))
+    mid, up, lo = inp.bollinger(xs, 20, 2.0)
+    assert np.isnan(mid[18]) and not np.isnan(mid[19])
+    assert abs(mid[-1] - xs[-20:].mean()) < 1e-9
+    assert abs(up[-1] - (xs[-20:].mean() + 2 * xs[-20:].std())) < 1e-9
+    assert np.all(lo[19:] <= mid[19:])
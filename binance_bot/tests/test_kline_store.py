@@ -0,0 +1,61 @@
+from kline_store import KlineStore, interval_ms
+
+STEP = interval_ms("1m")
+T0 = 1_700_000_040_000
+
+
+def _row(i, close=None):
+    ot = T0 + i * STEP
+    c = float(100 + i if close is None else close)
+    return [ot, str(c), str(c + 1), str(c - 1), str(c), "1.0", ot + STEP - 1, "100.0"]
+
+
+def _now(i):
+    """Candle i is open (not closed) at this time."""
+    return T0 + i * STEP + 1
+
+
+def test_ring_wraps_and_keeps_newest_in_order(tmp_path):
+    s = KlineStore(tmp_path, "btcusdt", "1m", capacity=4)
+    assert s.ingest([_row(i) for i in range(7)], _now(6)) == 6
+    assert len(s) == 4 and s.last_open_time() == T0 + 5 * STEP
+    assert s.live == _row(6)
+    assert [int(r[0]) for r in s.rows(include_live=False)] == [T0 + i * STEP for i in (2, 3, 4, 5)]
+    assert s.closes(3) == [104.0, 105.0, 106.0]  # two closed + the live candle
+
+
+def test_reopen_restores_head_after_wrap(tmp_path):
+    s = KlineStore(tmp_path, "BTCUSDT", "1m", capacity=4)
+    s.ingest([_row(i) for i in range(7)], _now(7))
+    del s
+
+    s = KlineStore(tmp_path, "BTCUSDT", "1m", capacity=4)
+    assert len(s) == 4 and s.last_open_time() == T0 + 6 * STEP
+    assert s.ingest([_row(7)], _now(8)) == 1
+    assert s.closes(include_live=False) == [104.0, 105.0, 106.0, 107.0]
+
+
+def test_reopen_with_new_capacity_carries_newest(tmp_path):
+    KlineStore(tmp_path, "BTCUSDT", "1m", capacity=4).ingest([_row(i) for i in range(6)], _now(6))
+    s = KlineStore(tmp_path, "BTCUSDT", "1m", capacity=3)
+    assert s.closes(include_live=False) == [103.0, 104.0, 105.0]
+    s = KlineStore(tmp_path, "BTCUSDT", "1m", capacity=8)
+    assert s.closes(include_live=False) == [103.0, 104.0, 105.0]
+    assert s.ingest([_row(6)], _now(7)) == 1 and len(s) == 4
+
+
+def test_gap_sets_backfill_and_sync_pages_from_last(tmp_path):
+    s = KlineStore(tmp_path, "BTCUSDT", "1m", capacity=10)
+    s.ingest([_row(0), _row(1)], _now(2))
+    assert s.ingest([_row(4)], _now(5)) == 0 and s.needs_backfill
+
+    calls = []
+
+    class _Api:
+        def klines(self, symbol, interval, *, limit, start_time):
+            calls.append(start_time)
+            return [_row(i) for i in range(2, 6) if T0 + i * STEP >= start_time]
+
+    assert s.sync(_Api(), now_ms=_now(5)) == 3
+    assert calls == [T0 + 2 * STEP] and not s.needs_backfill
+    assert s.closes(include_live=True)[-1] == 105.0  # the open candle
@@ -0,0 +1,118 @@
+import json
+
+import market_stream
+from market_stream import KlineFeed
+
+MIN = 60_000
+
+
+def _rest_row(i, close):
+    t = i * MIN
+    return [t, "1", "1", "1", str(close), "1", t + MIN - 1, "1", 1, "1", "1", "0"]
+
+
+def _frame(sym, i, close, closed):
+    k = {
+        "s": sym, "t": i * MIN, "T": i * MIN + MIN - 1, "o": "1", "h": "1", "l": "1",
+        "c": str(close), "v": "1", "q": "1", "n": 1, "V": "1", "Q": "1", "x": closed,
+    }
+    return json.dumps({"stream": f"{sym.lower()}@kline_1m", "data": {"e": "kline", "s": sym, "k": k}})
+
+
+class _Api:
+    base_url = "https://testnet.binance.vision"
+
+    def __init__(self):
+        self.seeds = 0
+        self.rows = [_rest_row(i, 100 + i) for i in range(5)]
+
+    def klines(self, symbol, interval, limit=None):
+        self.seeds += 1
+        return list(self.rows)
+
+
+class _Clock:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _feed(monkeypatch, **kw):
+    clock = _Clock()
+    monkeypatch.setattr("market_stream.time.time", clock)
+    return KlineFeed(_Api(), ["btcusdt"], "1m", history=10, **kw), clock
+
+
+def test_on_message_updates_live_and_closed_candles(monkeypatch):
+    feed, _ = _feed(monkeypatch)
+    feed._seed()
+    assert feed.closes("BTCUSDT") == [100, 101, 102, 103, 104]
+    seen = []
+    feed.add_listener(lambda sym, px: seen.append((sym, px)))
+
+    feed._on_message(_frame("BTCUSDT", 4, 105.5, False))  # live update of the open candle
+    assert feed.closes("BTCUSDT") == [100, 101, 102, 103, 105.5]
+    feed._on_message(_frame("BTCUSDT", 4, 106, True))  # it closes
+    feed._on_message(_frame("BTCUSDT", 5, 107, False))  # next one opens
+    assert feed.klines("BTCUSDT")[-2][0] == 4 * MIN
+    assert feed.closes("BTCUSDT") == [100, 101, 102, 103, 106, 107]
+    assert feed.closes("BTCUSDT", limit=2) == [106, 107]
+    assert feed.last_price("btcusdt") == 107
+
+    feed._on_message(_frame("ETHUSDT", 5, 1, False))  # not subscribed
+    feed._on_message(json.dumps({"result": None, "id": 1}))  # not a kline event
+    feed._on_message(_frame("BTCUSDT", 5, 108, True))
+    feed._on_message(_frame("BTCUSDT", 5, 109, True))  # a repeated close replaces the row
+    assert feed.closes("BTCUSDT") == [100, 101, 102, 103, 106, 109]
+    assert seen == [("BTCUSDT", px) for px in (105.5, 106, 107, 108, 109)]
+
+
+def test_is_fresh_tracks_the_last_message(monkeypatch):
+    feed, clock = _feed(monkeypatch, stale_seconds=30)
+    assert not feed.is_fresh("BTCUSDT") and feed.klines("BTCUSDT") == []
+    feed._on_message(_frame("BTCUSDT", 1, 100, False))
+    assert feed.is_fresh("btcusdt")
+    clock.t += 31
+    assert not feed.is_fresh("BTCUSDT")
+    feed._on_message(_frame("BTCUSDT", 1, 101, False))
+    assert feed.is_fresh("BTCUSDT") and not feed.is_fresh("ETHUSDT")
+
+
+class _Socket:
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.closed = False
+
+    def recv(self):
+        return self.frames.pop(0) if self.frames else ""
+
+    def close(self):
+        self.closed = True
+
+
+def test_reconnect_reseeds_history(monkeypatch):
+    feed, _ = _feed(monkeypatch)
+    sockets, seen = [], []
+
+    def connect(url, timeout=None):
+        assert url == "wss://stream.testnet.binance.vision/stream?streams=btcusdt@kline_1m"
+        seen.append(feed.closes("BTCUSDT"))
+        if len(sockets) == 2:
+            feed._stop.set()
+            raise OSError("stopped")
+        sockets.append(_Socket([_frame("BTCUSDT", 6, 1, True)]))
+        # REST has the candles that closed while the socket was down
+        feed.api.rows = [_rest_row(i, 100 + i) for i in range(8)]
+        return sockets[-1]
+
+    monkeypatch.setattr(market_stream.websocket, "create_connection", connect)
+    monkeypatch.setattr(market_stream.random, "uniform", lambda a, b: 0.0)
+    monkeypatch.setattr(feed._stop, "wait", lambda delay: None)
+    feed._run()
+
+    assert feed.reconnects == 2 and feed.api.seeds == 3
+    assert all(s.closed for s in sockets)
+    # every reconnect reseeds: the gap is filled and the streamed candle 6 is replaced
+    assert seen == [[100, 101, 102, 103, 104], [100, 101, 102, 103, 104, 105, 106, 107], [100, 101, 102, 103, 104, 105, 106, 107]]
@@ -0,0 +1,68 @@
+import pytest
+
+from migrate import MIGRATIONS_DIR, discover, migrate, runner
+
+
+class _Cur:
+    def __init__(self, log, params, version):
+        self.log, self.params, self.version = log, params, version
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def execute(self, sql, params=None):
+        self.log.append(" ".join(sql.split())[:40])
+        self.params.append(params)
+
+    def fetchone(self):
+        return (self.version,)
+
+
+class _Conn:
+    def __init__(self, version):
+        self.log, self.params, self.version = [], [], version
+
+    def cursor(self):
+        return _Cur(self.log, self.params, self.version)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_discover_orders_by_version(tmp_path):
+    for name in ("0010_later.sql", "0002_second.sql", "0001_baseline.sql"):
+        (tmp_path / name).write_text("SELECT 1;")
+    assert [(m.version, m.name) for m in discover(tmp_path)] == [(1, "baseline"), (2, "second"), (10, "later")]
+
+    (tmp_path / "0002_dup.sql").write_text("SELECT 1;")
+    with pytest.raises(RuntimeError, match="duplicate"):
+        discover(tmp_path)
+
+
+def test_shipped_migrations_start_at_baseline():
+    ms = discover(MIGRATIONS_DIR)
+    assert ms[0].version == 1 and [m.version for m in ms] == list(range(1, len(ms) + 1))
+
+
+def test_up_to_date_runs_only_the_version_check():
+    conn = _Conn(version=discover(MIGRATIONS_DIR)[-1].version)
+    assert migrate(conn) == []
+    assert len(conn.log) == 1 and conn.log[0].startswith("SELECT COALESCE(max(version)")
+
+
+def test_pending_migrations_apply_under_lock(tmp_path):
+    (tmp_path / "0001_baseline.sql").write_text("CREATE TABLE a(x int);")
+    (tmp_path / "0002_more.sql").write_text("CREATE TABLE b(x int);")
+    conn = _Conn(version=1)
+    assert migrate(conn, directory=tmp_path) == [2]
+    assert conn.log[1].startswith("SELECT pg_advisory_lock")
+    # One key for every component: the schema_version bootstrap of both bots is serialized.
+    assert conn.params[1] == conn.params[-1] == (runner.MIGRATION_LOCK_KEY,)
+    assert "CREATE TABLE b(x int);" in conn.log and "CREATE TABLE a(x int);" not in conn.log
+    assert conn.log[-1].startswith("SELECT pg_advisory_unlock")
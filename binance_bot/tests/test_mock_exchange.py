@@ -0,0 +1,27 @@
+from binance_api import BinanceApi
+from mock_exchange import MockConfig, MockExchange
+from symbol_filters import FilterRegistry
+
+
+def test_daemon_endpoints_round_trip(tmp_path):
+    ex = MockExchange(MockConfig(seed=1)).start()
+    try:
+        api = BinanceApi("k", "s", base_url=ex.base_url)
+        api.clock.sync()
+        kl = api.klines("MK001USDT", "1m", limit=50)
+        assert len(kl) == 50 and kl[-1][0] - kl[0][0] == 49 * 60_000
+
+        filters = FilterRegistry(api, cache_path=tmp_path / "exchange_filters.json")
+        filters.load(["MK001USDT", "MK002USDT"])
+        assert filters["MK002USDT"].min_notional == 5
+
+        buy = api.new_order_market_buy_quote("MK001USDT", 6.0)
+        assert buy["status"] == "FILLED" and float(buy["executedQty"]) > 0
+        sell = api.new_order_market_sell_quantity("MK001USDT", buy["executedQty"])
+        assert sell["side"] == "SELL"
+        assert api.governor.used_weight > 0  # usage headers reach the governor
+
+        stats = ex.stats()
+        assert stats["orders"] == 2 and stats["requests"]["/api/v3/order"] == 2
+    finally:
+        ex.stop()
@@ -0,0 +1,61 @@
+import pytest
+
+from order_book import OrderBook
+
+
+def _book():
+    b = OrderBook("BTCUSDT")
+    b.apply_snapshot({
+        "lastUpdateId": 100,
+        "bids": [["99", "1"], ["98", "2"]],
+        "asks": [["101", "1"], ["102", "1"], ["110", "10"]],
+    })
+    return b
+
+
+def test_diff_sequencing():
+    b = _book()
+    assert b.apply_diff({"U": 90, "u": 100, "b": [], "a": []})  # older than the snapshot: ignored
+    assert not b.synced
+    assert not b.apply_diff({"U": 105, "u": 106, "b": [], "a": []})  # gap before the first event
+    assert b.apply_diff({"U": 99, "u": 103, "b": [["99", "0"], ["100", "3"]], "a": [["101", "0"]]})
+    assert b.synced and b.bids.best() == 100.0 and b.asks.best() == 102.0
+    assert not b.apply_diff({"U": 105, "u": 106, "b": [], "a": []})  # gap after sync
+    assert b.apply_diff({"U": 104, "u": 104, "b": [], "a": [["101.5", "2"]]})
+    assert [p for p, _ in b.asks.levels()] == [101.5, 102.0, 110.0]
+
+
+def test_estimate_buy_vwap_and_max_quote():
+    b = _book()
+    est = b.estimate_buy(203.0, max_slippage_pct=0.01)
+    assert est.mid == 100.0 and est.spread_pct == pytest.approx(0.02)
+    assert est.vwap == pytest.approx(203.0 / 2.0)
+    assert est.slippage_pct == pytest.approx(0.015)
+    # Within 1% of mid (101) only the first ask level fits.
+    assert est.max_quote == pytest.approx(101.0)
+
+    wide = b.estimate_buy(2000.0, max_slippage_pct=0.05)
+    assert wide.quote == pytest.approx(101 + 102 + 1100)  # thinner than the order
+    x = wide.max_quote - 203.0
+    assert (203.0 + x) / (2.0 + x / 110.0) == pytest.approx(105.0)
+
+
+def test_max_quote_is_capped_by_a_thin_level_above_the_limit():
+    b = OrderBook("BTCUSDT")
+    b.apply_snapshot({
+        "lastUpdateId": 1,
+        "bids": [["99.5", "1"]],
+        "asks": [["100", "10"], ["101.5", "0.001"], ["130", "100"]],
+    })
+    est = b.estimate_buy(5000.0, max_slippage_pct=0.0151)
+    limit = est.mid * 1.0151
+    # 101.5 is above the limit, but the formula allows more than its 0.1015 of quote:
+    # the level is taken whole and the walk goes on to 130.
+    lvl_quote, lvl_base = 1000.0 + 0.1015, 10.001
+    x = (limit * lvl_base - lvl_quote) / (1.0 - limit / 130.0)
+    assert est.max_quote == pytest.approx(lvl_quote + x)
+    assert est.max_quote < 1100.0  # not ~3045
+
+    # Spending max_quote on the book keeps the vwap at the limit.
+    spend = b.estimate_buy(est.max_quote, max_slippage_pct=0.0151)
+    assert spend.vwap == pytest.approx(limit)
@@ -0,0 +1,22 @@
+from portfolio import value_portfolio
+
+
+def test_routes_and_single_bulk_fetch():
+    balances = {"USDT": 10.0, "BTC": 0.5, "ETH": 2.0, "XYZ": 100.0, "DOGE": 1000.0, "NOPE": 1.0}
+    ticker = {"BTCUSDT": 60000.0, "ETHBTC": 0.05, "XYZBTC": 0.00001, "USDTDOGE": 10.0}
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return ticker
+
+    v = value_portfolio(balances, fetch, live_price={"BTCUSDT": 61000.0}.get)
+    assert len(calls) == 1
+    assert v.assets["BTC"]["price_usdt"] == 61000.0  # live cache wins over the ticker
+    assert v.assets["ETH"]["route"] == "ETHBTC*BTCUSDT"
+    assert v.assets["DOGE"]["price_usdt"] == 0.1
+    assert v.unpriced == ["NOPE"]
+    assert abs(v.total_usdt - (10 + 0.5 * 61000 + 2 * 0.05 * 61000 + 100 * 0.00001 * 61000 + 100)) < 1e-6
+
+    v = value_portfolio({"USDT": 1.0, "BTC": 1.0}, fetch, live_price={"BTCUSDT": 61000.0}.get)
+    assert len(calls) == 1 and v.total_usdt == 61001.0
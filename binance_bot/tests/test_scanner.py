@@ -0,0 +1,38 @@
+import numpy as np
+
+from scanner import Candidate, rank, shortlist
+
+
+def _ticker(sym, qv, bid, ask):
+    return {"symbol": sym, "quoteVolume": str(qv), "bidPrice": str(bid), "askPrice": str(ask)}
+
+
+def test_shortlist_filters_and_orders_by_volume():
+    tickers = [
+        _ticker("BTCUSDT", 9e8, 100.0, 100.01),
+        _ticker("ETHUSDT", 5e8, 10.0, 10.001),
+        _ticker("THINUSDT", 1e3, 1.0, 1.001),  # volume
+        _ticker("WIDEUSDT", 9e7, 1.0, 1.1),  # spread
+        _ticker("USDCUSDT", 9e8, 1.0, 1.0001),  # stable
+        _ticker("BTCUPUSDT", 9e7, 1.0, 1.0001),  # leveraged token
+        _ticker("ETHBEARUSDT", 9e7, 1.0, 1.0001),  # leveraged token
+        _ticker("JUPUSDT", 8e7, 1.0, 1.0001),  # ends in "UP" but is a plain coin
+        _ticker("ETHBTC", 9e8, 0.05, 0.05001),  # other quote
+    ]
+    out = shortlist(tickers, min_quote_volume=1e6, max_spread_pct=0.001, max_candidates=10)
+    assert [c.symbol for c in out] == ["BTCUSDT", "ETHUSDT", "JUPUSDT"]
+    assert shortlist(tickers, min_quote_volume=1e6, max_spread_pct=0.001, max_candidates=1)[0].symbol == "BTCUSDT"
+
+
+def test_rank_puts_crossed_trend_first():
+    t = np.arange(60, dtype=float)
+    series = {
+        "UPUSDT": 100 + t,  # ema_fast > ema_slow
+        "DOWNUSDT": 200 - t,
+        "SHORTUSDT": 100 + t[:10],  # not enough history: dropped
+    }
+    klines = {s: [[0, 0, 0, 0, str(c)] for c in closes] for s, closes in series.items()}
+    cands = [Candidate(s, 1e7, 0.0001) for s in ("DOWNUSDT", "UPUSDT", "SHORTUSDT")]
+    out = rank(cands, klines, ema_fast=5, ema_slow=20, rsi_period=14, blog_ma_score=1.0, blog_rsi_score=0.0)
+    assert [c.symbol for c in out] == ["UPUSDT", "DOWNUSDT"]
+    assert out[0].score > 0 and out[0].ema_spread > 0 > out[1].ema_spread
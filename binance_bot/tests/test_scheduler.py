@@ -0,0 +1,40 @@
+from scheduler import Scheduler
+
+
+class _Clock:
+    def __init__(self, t):
+        self.t = t
+
+    def now(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += int(seconds * 1000)
+
+
+def test_aligned_task_fires_after_each_boundary():
+    clock = _Clock(10 * 900_000 + 123_456)
+    s = Scheduler(clock.now, sleep=clock.sleep)
+    s.add("signal", 900, align=True, delay_ms=1500, run_now=False)
+    s.add("exits", 20)
+    assert set(s.wait()) == {"exits"}
+    fired = []
+    while len(fired) < 2:
+        runs = s.wait()
+        if "signal" in runs:
+            fired.append((clock.t, runs["signal"].late_ms))
+    assert fired == [(11 * 900_000 + 1500, 0), (12 * 900_000 + 1500, 0)]
+
+
+def test_overrun_is_coalesced_and_marked_stale():
+    clock = _Clock(0)
+    s = Scheduler(clock.now, sleep=clock.sleep)
+    s.add("signal", 60, align=True, max_late_ms=5_000, run_now=False)
+    s.add("exits", 10)
+    s.wait()
+    clock.t = 60_000 * 3 + 7_000  # one pass took more than three minutes
+    runs = s.wait()
+    assert runs["signal"].missed == 2 and runs["signal"].stale
+    assert runs["exits"].missed == 17
+    assert s.tasks["signal"].next_due_ms == 60_000 * 4
+    assert s.tasks["exits"].next_due_ms == 190_000
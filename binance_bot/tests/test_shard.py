@@ -0,0 +1,188 @@
+import hashlib
+
+from shard import EXPOSURE_LOCK_KEY, ShardLeases, reserve_buy
+
+SYMBOLS = ["ADAUSDT", "BNBUSDT", "BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT"]
+
+
+class _LeaseDb:
+    """daemon_shard_member / daemon_symbol_lease in memory, for the statements renew() runs."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.members: dict[str, float] = {}
+        self.leases: dict[str, tuple[str, float]] = {}
+        self.commits = 0
+
+    def cursor(self):
+        return _LeaseCur(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def held(self, owner):
+        return {s for s, (o, exp) in self.leases.items() if o == owner and exp >= self.now}
+
+
+class _LeaseCur:
+    def __init__(self, db):
+        self.db, self.rows = db, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def fetchall(self):
+        return self.rows
+
+    def execute(self, sql, params=()):
+        db, sql = self.db, " ".join(sql.split())
+        now = db.now
+        self.rows = []
+        if sql.startswith("INSERT INTO daemon_shard_member"):
+            db.members[params[0]] = now
+        elif sql.startswith("DELETE FROM daemon_shard_member WHERE heartbeat_at"):
+            ttl = float(params[0].split()[0])
+            db.members = {o: hb for o, hb in db.members.items() if hb >= now - 4 * ttl}
+        elif sql.startswith("DELETE FROM daemon_shard_member WHERE owner"):
+            db.members.pop(params[0], None)
+        elif sql.startswith("SELECT owner FROM daemon_shard_member"):
+            ttl = float(params[0].split()[0])
+            self.rows = [(o,) for o in sorted(db.members) if db.members[o] >= now - ttl]
+        elif sql.startswith("UPDATE daemon_symbol_lease"):
+            ttl, owner, symbols = params
+            for s in symbols:
+                if db.leases.get(s, ("",))[0] == owner:
+                    db.leases[s] = (owner, now + float(ttl.split()[0]))
+                    self.rows.append((s,))
+        elif sql.startswith("DELETE FROM daemon_symbol_lease WHERE owner=%s AND NOT"):
+            owner, symbols = params
+            db.leases = {s: v for s, v in db.leases.items() if v[0] != owner or s in symbols}
+        elif sql.startswith("DELETE FROM daemon_symbol_lease WHERE owner=%s AND symbol"):
+            owner, symbols = params
+            db.leases = {s: v for s, v in db.leases.items() if not (v[0] == owner and s in symbols)}
+        elif sql.startswith("DELETE FROM daemon_symbol_lease WHERE owner"):
+            db.leases = {s: v for s, v in db.leases.items() if v[0] != params[0]}
+        elif sql.startswith("INSERT INTO daemon_symbol_lease"):
+            owner, ttl, symbols, salt, limit = params
+            free = [s for s in symbols if s not in db.leases or db.leases[s][1] < now]
+            free.sort(key=lambda s: hashlib.md5((s + salt).encode()).hexdigest())
+            for s in free[:limit]:
+                db.leases[s] = (owner, now + float(ttl.split()[0]))
+                self.rows.append((s,))
+        else:
+            raise AssertionError(f"unexpected SQL: {sql}")
+
+
+def test_single_shard_claims_everything_and_leads():
+    db = _LeaseDb()
+    a = ShardLeases(list(SYMBOLS), owner="a", ttl_seconds=30)
+    gained, lost = a.renew(db)
+    assert gained == set(SYMBOLS) and not lost
+    assert a.leader and a.members == 1 and db.commits == 1
+    assert all(a.owns(s) for s in SYMBOLS)
+
+
+def test_second_shard_gets_half_after_the_first_shrinks():
+    db = _LeaseDb()
+    a = ShardLeases(list(SYMBOLS), owner="a", ttl_seconds=30)
+    b = ShardLeases(list(SYMBOLS), owner="b", ttl_seconds=30)
+    a.renew(db)
+    assert b.renew(db) == (set(), set())  # everything is leased to a
+    assert not b.leader and b.members == 2
+
+    _, lost = a.renew(db)  # quota 3: a gives three back
+    assert len(lost) == 3 and len(a.owned) == 3
+    gained, _ = b.renew(db)
+    assert gained == lost
+    assert a.owned.isdisjoint(b.owned) and a.owned | b.owned == set(SYMBOLS)
+    assert db.held("a") == a.owned and db.held("b") == b.owned
+
+
+def test_dead_shard_leases_expire_and_are_taken_over():
+    db = _LeaseDb()
+    a = ShardLeases(list(SYMBOLS), owner="a", ttl_seconds=30)
+    b = ShardLeases(list(SYMBOLS), owner="b", ttl_seconds=30)
+    a.renew(db)
+    b.renew(db)
+    a.renew(db)
+    b.renew(db)
+    assert len(b.owned) == 3
+
+    db.now += 31  # a stops renewing: its heartbeat and leases lapse
+    gained, _ = b.renew(db)
+    assert gained == a.owned and b.owned == set(SYMBOLS) and b.leader
+
+
+def test_symbols_dropped_from_the_list_are_released():
+    db = _LeaseDb()
+    a = ShardLeases(list(SYMBOLS), owner="a", ttl_seconds=30)
+    a.renew(db)
+    a.symbols = ["BTCUSDT", "ETHUSDT"]
+    _, lost = a.renew(db)
+    assert lost == set(SYMBOLS) - {"BTCUSDT", "ETHUSDT"}
+    assert set(db.leases) == {"BTCUSDT", "ETHUSDT"}
+
+    a.release_all(db)
+    assert not db.leases and not db.members and not a.owned
+
+
+class _ExposureCur:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def execute(self, sql, params=()):
+        self.db.sql.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        sql = self.db.sql[-1][0]
+        if "SUM(quote_qty)" in sql:
+            return (self.db.spent,)
+        if "count(*)" in sql:
+            return (self.db.open_count,)
+        return (42,)
+
+
+class _ExposureDb:
+    def __init__(self, spent=0.0, open_count=0):
+        self.spent, self.open_count = spent, open_count
+        self.sql, self.commits, self.rollbacks = [], 0, 0
+
+    def cursor(self):
+        return _ExposureCur(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_reserve_buy_checks_global_limits_under_the_lock():
+    db = _ExposureDb(spent=80.0, open_count=1)
+    assert reserve_buy(db, "BTCUSDT", 20.0, "{}", daily_cap=100.0, max_open_positions=2) == 42
+    assert db.sql[0] == ("SELECT pg_advisory_xact_lock(%s)", (EXPOSURE_LOCK_KEY,))
+    insert = [p for s, p in db.sql if s.startswith("INSERT INTO binance_order")]
+    assert insert == [("BTCUSDT", 20.0, "{}")] and db.commits == 1
+
+
+def test_reserve_buy_refuses_over_cap_or_open_limit():
+    db = _ExposureDb(spent=90.0)
+    assert reserve_buy(db, "BTCUSDT", 20.0, "{}", daily_cap=100.0) is None
+    assert db.rollbacks == 1 and not any(s.startswith("INSERT") for s, _ in db.sql)
+
+    db = _ExposureDb(open_count=2)  # open positions + in-flight BUYs
+    assert reserve_buy(db, "BTCUSDT", 20.0, "{}", max_open_positions=2) is None
+    assert db.rollbacks == 1
+
+    db = _ExposureDb(spent=1e9, open_count=99)  # no limits configured: nothing is checked
+    assert reserve_buy(db, "BTCUSDT", 20.0, "{}") == 42
+    assert [s for s, _ in db.sql if s.startswith("SELECT")] == ["SELECT pg_advisory_xact_lock(%s)"]
@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+
+from storage import TABLES, Partition, TickTable, maintain, parse_bound, period_start, plan_partitions
+
+UTC = timezone.utc
+
+
+def test_bounds_and_period_start():
+    assert parse_bound("MINVALUE") is None
+    assert parse_bound("'2026-10-17 00:00:00+00'") == datetime(2026, 10, 17, tzinfo=UTC)
+    now = datetime(2026, 10, 16, 13, 5, tzinfo=UTC)  # a Friday
+    assert period_start(now, "day") == datetime(2026, 10, 16, tzinfo=UTC)
+    assert period_start(now, "week") == datetime(2026, 10, 12, tzinfo=UTC)
+
+
+def test_plan_continues_after_legacy_partition():
+    now = datetime(2026, 10, 16, 13, 5, tzinfo=UTC)
+    legacy = Partition("t_legacy", None, datetime(2026, 10, 17, tzinfo=UTC))
+    default = Partition("t_default", None, None, default=True)
+
+    daily = plan_partitions(TickTable("t", "created_at", "day"), [legacy, default], now, ahead=2)
+    assert [(n, lo.day, hi.day) for n, lo, hi in daily] == [("t_p20261017", 17, 18), ("t_p20261018", 18, 19)]
+
+    # Weekly: a short first partition up to Monday, then whole weeks.
+    weekly = plan_partitions(TickTable("t", "created_at", "week"), [legacy], now, ahead=1)
+    assert [(lo.day, hi.day) for _, lo, hi in weekly] == [(17, 19), (19, 26)]
+
+    # Nothing to do once the horizon is covered.
+    done = Partition("t_p20261018", daily[-1][1], daily[-1][2])
+    assert plan_partitions(TickTable("t", "created_at", "day"), [legacy, done], now, ahead=2) == []
+
+
+class _Cur:
+    def __init__(self, db):
+        self.db, self.rowcount = db, 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def execute(self, query, params=None):
+        text = query if isinstance(query, str) else query.as_string(None)
+        self.db.log.append(" ".join(text.split()))
+        self.rowcount = 2
+
+    def fetchone(self):
+        last = self.db.log[-1]
+        if last.startswith("SELECT relkind"):
+            return ("p",)
+        if last.startswith("SELECT EXISTS"):
+            return (bool(self.db.stranded) and self.db.stranded in last,)
+        return None
+
+    def fetchall(self):
+        return self.db.bounds
+
+
+class _Db:
+    def __init__(self, stranded=""):
+        self.log, self.stranded, self.commits, self.rollbacks = [], stranded, 0, 0
+        self.bounds = [
+            ("t_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-10-17 00:00:00+00')"),
+            ("t_default", "DEFAULT"),
+        ]
+
+    def cursor(self):
+        return _Cur(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+NOW = datetime(2026, 10, 16, 13, 5, tzinfo=UTC)
+
+
+def test_maintain_creates_partitions_ahead():
+    db = _Db()
+    report = maintain(db, (TickTable("t", "created_at", "day"),), ahead=2, now=NOW)
+    assert report == {"t": {"created": ["t_p20261017", "t_p20261018"], "dropped": []}}
+    assert not any("DETACH" in q for q in db.log) and db.commits == 1
+
+
+def test_rows_stranded_in_default_are_moved_into_the_new_partition():
+    db = _Db(stranded="'2026-10-18 00:00:00+00:00'::timestamptz AND")  # rows for the 18th sit in DEFAULT
+    report = maintain(db, (TickTable("t", "created_at", "day"),), ahead=2, now=NOW)
+    assert report["t"]["created"] == ["t_p20261017", "t_p20261018"] and db.rollbacks == 0
+
+    start = next(i for i, q in enumerate(db.log) if q.startswith('ALTER TABLE "t" DETACH PARTITION "t_default"'))
+    detach, create, move, attach = db.log[start : start + 4]
+    assert create.startswith('CREATE TABLE "t_p20261018" PARTITION OF "t"')
+    assert move.startswith('WITH moved AS (DELETE FROM "t_default" WHERE "created_at" >= \'2026-10-18')
+    assert move.endswith('INSERT INTO "t" SELECT * FROM moved')
+    assert attach == 'ALTER TABLE "t" ATTACH PARTITION "t_default" DEFAULT'
+    # The 17th had nothing in DEFAULT: a plain CREATE, no detach.
+    assert sum("DETACH" in q for q in db.log) == 1 and db.commits == 1
+
+
+def test_rollups_merge_into_an_existing_hour():
+    for t in TABLES:
+        q = " ".join(t.rollup_sql.split())
+        assert "n = h.n + EXCLUDED.n" in q
+        assert "first_at = LEAST(h.first_at, EXCLUDED.first_at)" in q
+        assert "last_at = GREATEST(h.last_at, EXCLUDED.last_at)" in q
+        assert "CASE WHEN EXCLUDED.last_at < h.last_at THEN h." in q
+        assert "=EXCLUDED." not in q.replace(" ", "")  # no column is simply overwritten
@@ -0,0 +1,40 @@
+import backtest as bt
+import sweep
+from tests.test_backtest import _klines
+
+
+def test_sweep_matches_simulate_and_caches(tmp_path):
+    kl = _klines(n=1500, seed=2)
+    points = sweep.param_grid({"ema_fast": [5, 9], "ema_slow": [9, 21], "min_score": [0.3, 0.7]})
+    assert len(points) == 6  # ema_fast=9/ema_slow=9 dropped
+    store = sweep.ResultStore(str(tmp_path / "sweep.sqlite"))
+    done = sweep.run_sweep({("TESTUSDT", "15m"): kl}, points, store, workers=2, chunk=2)
+    (key, n), = done.items()
+    assert n == len(points)
+
+    best = store.top(key, n=1)[0]
+    want = max(bt.simulate(kl, p).pnl for p in points)
+    assert abs(best[0] - want) < 1e-12
+
+    extra = points + sweep.param_grid({"ema_fast": [7], "ema_slow": [21]})
+    assert sweep.run_sweep({("TESTUSDT", "15m"): kl}, extra, store, workers=2) == {key: 1}
+    store.close()
+
+
+def test_random_params_distinct_and_valid():
+    pts = sweep.random_params({"ema_fast": [3, 15], "ema_slow": [10, 60], "tp_pct": [0.002, 0.02]}, 40, seed=1)
+    assert len(pts) == len(set(pts)) == 40
+    assert all(p.ema_fast < p.ema_slow and 0.002 <= p.tp_pct <= 0.02 for p in pts)
+
+
+def test_detach_all_closes_attached_blocks():
+    kl = _klines(n=200, seed=3)
+    ds, shm = sweep.share_dataset("TESTUSDT", "15m", kl, [bt.StrategyParams()])
+    try:
+        assert sweep._views(ds)["close"][-1] == kl["close"][-1]
+        (attached, _), = sweep._ATTACHED.values()
+        sweep._detach_all()
+        assert sweep._ATTACHED == {} and attached.buf is None
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,102 @@
+import json
+import threading
+
+from symbol_filters import FilterRegistry
+
+
+def _entry(sym, step="0.001"):
+    return {
+        "symbol": sym,
+        "status": "TRADING",
+        "filters": [
+            {"filterType": "PRICE_FILTER", "tickSize": "0.01"},
+            {"filterType": "LOT_SIZE", "stepSize": step, "minQty": step, "maxQty": "9000"},
+            {"filterType": "NOTIONAL", "minNotional": "5"},
+        ],
+    }
+
+
+class _Api:
+    def __init__(self):
+        self.calls = []
+        self.step = "0.001"
+
+    def exchange_info_bulk(self, symbols):
+        self.calls.append(sorted(symbols))
+        return {"symbols": [_entry(s, self.step) for s in symbols]}
+
+
+class _Clock:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _registry(tmp_path, monkeypatch, api=None, ttl=100.0):
+    clock = _Clock()
+    monkeypatch.setattr("symbol_filters.time.time", clock)
+    return FilterRegistry(api or _Api(), cache_path=tmp_path / "filters.json", ttl_seconds=ttl), clock
+
+
+def test_cache_is_reused_until_the_ttl_expires(tmp_path, monkeypatch):
+    reg, clock = _registry(tmp_path, monkeypatch)
+    reg.load(["btcusdt", "ETHUSDT"])
+    assert reg.api.calls == [["BTCUSDT", "ETHUSDT"]] and reg["BTCUSDT"].min_notional == 5
+
+    clock.t += 50
+    again = FilterRegistry(reg.api, cache_path=reg.cache_path, ttl_seconds=100.0)
+    again.load(["BTCUSDT"])
+    assert len(reg.api.calls) == 1 and "ETHUSDT" in again and again.fetched_at == 1_000_000.0
+
+    clock.t += 51  # past the TTL
+    FilterRegistry(reg.api, cache_path=reg.cache_path, ttl_seconds=100.0).load(["BTCUSDT"])
+    assert reg.api.calls[-1] == ["BTCUSDT"]
+
+
+def test_partial_add_keeps_the_cache_stamp(tmp_path, monkeypatch):
+    reg, clock = _registry(tmp_path, monkeypatch)
+    reg.load(["BTCUSDT"])
+    clock.t += 90
+    reg.add_symbols(["BTCUSDT", "solusdt"])
+    assert reg.api.calls[-1] == ["SOLUSDT"] and "SOLUSDT" in reg and "BTCUSDT" in reg
+    reg.add_symbols(["SOLUSDT"])  # nothing missing: no call
+    assert len(reg.api.calls) == 2
+
+    data = json.loads(reg.cache_path.read_text())
+    assert data["fetched_at"] == 1_000_000.0 and set(data["symbols"]) == {"BTCUSDT", "SOLUSDT"}
+    clock.t += 11  # the BTCUSDT entry is now past its TTL: the whole cache is
+    fresh = FilterRegistry(reg.api, cache_path=reg.cache_path, ttl_seconds=100.0)
+    fresh.load(["BTCUSDT", "SOLUSDT"])
+    assert reg.api.calls[-1] == ["BTCUSDT", "SOLUSDT"]
+
+
+def test_refresh_restamps_and_keeps_symbols_added_meanwhile(tmp_path, monkeypatch):
+    api = _Api()
+    reg, clock = _registry(tmp_path, monkeypatch, api=api)
+    reg.load(["BTCUSDT"])
+    clock.t += 60
+
+    # add_symbols runs while refresh() is waiting on its exchangeInfo call.
+    in_fetch, release = threading.Event(), threading.Event()
+    plain = api.exchange_info_bulk
+
+    def slow(symbols):
+        if symbols == ["BTCUSDT"]:
+            in_fetch.set()
+            release.wait(5)
+        return plain(symbols)
+
+    api.exchange_info_bulk = slow
+    api.step = "0.01"
+    t = threading.Thread(target=reg.refresh)
+    t.start()
+    assert in_fetch.wait(5)
+    reg.add_symbols(["ETHUSDT"])
+    release.set()
+    t.join(5)
+
+    assert "ETHUSDT" in reg and str(reg["BTCUSDT"].step) == "0.01"
+    assert reg.fetched_at == 1_000_060.0
+    assert set(json.loads(reg.cache_path.read_text())["symbols"]) == {"BTCUSDT", "ETHUSDT"}
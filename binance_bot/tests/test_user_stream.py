@@ -0,0 +1,150 @@
+import json
+
+from user_stream import UserDataStream, apply_events, reconcile_oco_positions
+
+
+class _Api:
+    base_url = "https://testnet.binance.vision"
+
+    def account(self):
+        return {"balances": [{"asset": "USDT", "free": "10", "locked": "0"}, {"asset": "BTC", "free": "0", "locked": "0"}]}
+
+
+def test_balance_cache_and_event_queue():
+    woken = []
+    us = UserDataStream(_Api(), on_event=lambda: woken.append(1))
+    assert us.balances() is None
+
+    us._seed_balances()
+    assert us.balances() == {"USDT": 10.0}
+
+    us._on_message(json.dumps({"e": "outboundAccountPosition", "B": [{"a": "BTC", "f": "0.001", "l": "0.002"}]}))
+    assert us.balances() == {"USDT": 10.0, "BTC": 0.003}
+    assert us.drain() == [] and not woken
+
+    fill = {"e": "executionReport", "s": "BTCUSDT", "S": "SELL", "X": "FILLED", "i": 7, "g": 3}
+    us._on_message(json.dumps(fill))
+    us._on_message(json.dumps({"e": "listStatus", "g": 3, "L": "ALL_DONE"}))
+    us._on_message(json.dumps({"e": "balanceUpdate", "a": "USDT", "d": "1"}))
+    assert [e["e"] for e in us.drain()] == ["executionReport", "listStatus"]
+    assert len(woken) == 2
+
+
+class _Cur:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def execute(self, sql, params=None):
+        self.db.sql.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        sql = self.db.sql[-1][0]
+        if "FOR UPDATE" not in sql or self.db.pid is None:
+            return None
+        if sql.startswith("SELECT COALESCE"):  # reconcile: the position id is the query parameter
+            return (self.db.entry_quote,)
+        return (self.db.pid, self.db.entry_quote)
+
+    def fetchall(self):
+        return self.db.open_positions
+
+
+class _Db:
+    def __init__(self, pid=5, entry_quote=100.0, open_positions=()):
+        self.pid, self.entry_quote, self.open_positions = pid, entry_quote, list(open_positions)
+        self.sql, self.commits = [], 0
+
+    def cursor(self):
+        return _Cur(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def params(self, prefix):
+        return [p for s, p in self.sql if s.startswith(prefix)]
+
+
+def _trade(n, status, z, Z, fee):
+    return {"e": "executionReport", "s": "BTCUSDT", "S": "SELL", "o": "LIMIT_MAKER", "x": "TRADE", "X": status,
+            "i": 7, "g": 3, "z": z, "Z": Z, "n": fee, "N": "USDT"}
+
+
+def test_fee_is_summed_across_fills_and_closes_position():
+    us = UserDataStream(_Api())
+    us._on_message(json.dumps(_trade(1, "PARTIALLY_FILLED", "0.4", "40", "0.04")))
+    us._on_message(json.dumps(_trade(2, "FILLED", "1.0", "110", "0.07")))
+    events = us.drain()
+    assert round(events[-1]["fee_quote"], 8) == 0.11
+    assert us._fees == {}  # final status drops the accumulator
+
+    db, closed = _Db(pid=5, entry_quote=100.0), []
+    assert apply_events(db, events, on_closed=closed.append) == 1
+    assert closed == [5] and db.commits == 1
+
+    (upd,) = db.params("UPDATE binance_position SET status='closed'")
+    order_id, exit_price, quote, pnl, _raw, pid = upd
+    assert (order_id, pid, quote) == ("7", 5, 110.0)
+    assert round(exit_price, 8) == 110.0 and round(pnl, 8) == round(110.0 - 0.11 - 100.0, 8)
+    (sell,) = db.params("INSERT INTO binance_order")
+    assert sell[:3] == ("BTCUSDT", "7", 110.0) and sell[5] == 5
+    assert [p[0] for p in db.params("UPDATE binance_order")] == ["PARTIALLY_FILLED", "FILLED"]
+
+
+def test_fill_without_open_position_is_not_closed_twice():
+    db = _Db(pid=None)
+    assert apply_events(db, [_trade(1, "FILLED", "1", "110", "0.1")]) == 0
+    assert not db.params("UPDATE binance_position SET status='closed'")
+
+
+class _RestApi(_Api):
+    def __init__(self, lists, trades):
+        self.lists, self.trades, self.calls = lists, trades, []
+
+    def order_list(self, order_list_id):
+        self.calls.append(("orderList", order_list_id))
+        return self.lists[order_list_id]
+
+    def my_trades(self, symbol, order_id):
+        self.calls.append(("myTrades", order_id))
+        return self.trades.get(order_id, [])
+
+
+def test_reconnect_reconciles_oco_filled_during_gap():
+    us = UserDataStream(_Api())
+    assert not us.take_reconcile()
+    us._reconcile.set()  # what _run does after each (re)connect
+    assert us.take_reconcile() and not us.take_reconcile()
+
+    api = _RestApi(
+        lists={
+            "3": {"listOrderStatus": "ALL_DONE", "orders": [{"orderId": 7}, {"orderId": 8}]},
+            "4": {"listOrderStatus": "EXECUTING", "orders": [{"orderId": 9}, {"orderId": 10}]},
+            "6": {"listOrderStatus": "ALL_DONE", "orders": [{"orderId": 11}, {"orderId": 12}]},
+        },
+        trades={
+            "8": [
+                {"qty": "0.5", "quoteQty": "45", "commission": "0.045", "commissionAsset": "USDT"},
+                {"qty": "0.5", "quoteQty": "44", "commission": "0.044", "commissionAsset": "USDT"},
+            ]
+        },
+    )
+    db = _Db(entry_quote=100.0, open_positions=[(1, "BTCUSDT", "3"), (2, "BTCUSDT", "4"), (3, "BTCUSDT", "6")])
+    closed = []
+    assert reconcile_oco_positions(db, api, on_closed=closed.append) == 2
+    assert closed == [1, 3]
+
+    (upd,) = db.params("UPDATE binance_position SET status='closed'")
+    order_id, exit_price, quote, pnl, _raw, pid = upd
+    assert (order_id, pid, quote, exit_price) == ("8", 1, 89.0, 89.0)
+    assert round(pnl, 8) == round(89.0 - 0.089 - 100.0, 8)
+    assert db.params("UPDATE binance_position SET status='oco_canceled'") == [(3,)]
+    assert ("myTrades", "9") not in api.calls  # still executing: legs are not queried
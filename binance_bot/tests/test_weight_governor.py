@@ -0,0 +1,83 @@
+import pytest
+
+from binance_api import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, RateLimitedError, WeightGovernor
+
+
+class _Clock:
+    def __init__(self, t=1_000_040.0):  # 20s into a minute
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def test_priority_shares_leave_headroom_for_exits():
+    clock = _Clock()
+    g = WeightGovernor(weight_limit=100, now=clock)
+    assert g.try_acquire(60, PRIORITY_LOW) == 0.0
+    # LOW may use 60% of the budget and never waits: dropped.
+    with pytest.raises(RateLimitedError):
+        g.try_acquire(1, PRIORITY_LOW)
+    assert g.dropped == 1
+    assert g.try_acquire(25, PRIORITY_NORMAL) == 0.0
+    # NORMAL is capped at 85: a wait until the next minute (40s) is longer than it may wait.
+    with pytest.raises(RateLimitedError):
+        g.try_acquire(1, PRIORITY_NORMAL)
+    # HIGH gets the rest of the budget, then waits for the minute to roll.
+    assert g.try_acquire(15, PRIORITY_HIGH) == 0.0
+    assert g.try_acquire(1, PRIORITY_HIGH) == pytest.approx(40.0)
+    assert g.used_weight == 100
+
+    clock.t += 40.0
+    assert g.try_acquire(1, PRIORITY_LOW) == 0.0 and g.used_weight == 1
+
+
+def test_normal_waits_when_the_window_is_about_to_roll():
+    clock = _Clock(1_000_077.0)  # 3s before the minute rolls
+    g = WeightGovernor(weight_limit=100, now=clock)
+    g.try_acquire(85, PRIORITY_NORMAL)
+    assert g.try_acquire(1, PRIORITY_NORMAL) == pytest.approx(3.0)
+    assert g.dropped == 0
+
+
+def test_order_budget_per_10s():
+    clock = _Clock(1_000_024.0)
+    g = WeightGovernor(weight_limit=100, order_limit_10s=2, now=clock)
+    assert g.try_acquire(1, PRIORITY_HIGH, orders=2) == 0.0
+    assert g.try_acquire(1, PRIORITY_HIGH, orders=1) == pytest.approx(6.0)
+    assert g.try_acquire(1, PRIORITY_HIGH) == 0.0  # non-order calls are not held back
+
+
+def test_headers_are_authoritative_and_retry_after_blocks_everyone():
+    clock = _Clock()
+    g = WeightGovernor(weight_limit=100, now=clock)
+    g.try_acquire(10, PRIORITY_HIGH)
+    g.observe(200, {"X-MBX-USED-WEIGHT-1M": "80", "X-MBX-ORDER-COUNT-10S": "3"})
+    assert (g.used_weight, g.order_count_10s) == (80, 3)
+    with pytest.raises(RateLimitedError):
+        g.try_acquire(1, PRIORITY_LOW)
+
+    g.observe(429, {"Retry-After": "12"})
+    assert g.try_acquire(1, PRIORITY_HIGH) == pytest.approx(12.0)
+    with pytest.raises(RateLimitedError):
+        g.try_acquire(1, PRIORITY_NORMAL)  # 12s > NORMAL's 5s
+    clock.t += 12.0
+    assert g.try_acquire(1, PRIORITY_NORMAL) == 0.0
+
+    g.observe(418, {"Retry-After": "soon"})  # unparsable: a full minute
+    assert g.try_acquire(1, PRIORITY_HIGH) == pytest.approx(60.0)
+
+
+def test_acquire_sleeps_until_budget_frees(monkeypatch):
+    clock = _Clock()
+    g = WeightGovernor(weight_limit=10, now=clock)
+    g.try_acquire(10, PRIORITY_HIGH)
+    slept = []
+
+    def sleep(s):
+        slept.append(s)
+        clock.t += s
+
+    monkeypatch.setattr("binance_api.time.sleep", sleep)
+    g.acquire(5, PRIORITY_HIGH)
+    assert slept == [pytest.approx(40.0)] and g.used_weight == 5
@@ -0,0 +1,42 @@
+import json
+
+from binance_api import WeightGovernor
+from ws_orders import WsOrderGateway, _Pending
+
+
+class _Api:
+    base_url = "https://testnet.binance.vision"
+
+    def __init__(self):
+        self.governor = WeightGovernor(now=lambda: 0.0)
+        self.rest = []
+
+    def new_order_market_buy_quote(self, symbol, quote_qty):
+        self.rest.append((symbol, quote_qty))
+        return {"orderId": 1}
+
+
+def test_rest_fallback_and_response_matching():
+    api = _Api()
+    gw = WsOrderGateway(api)
+    assert gw.ws_url.startswith("wss://ws-api.testnet")
+
+    # Not connected: the order goes over REST.
+    assert gw.new_order_market_buy_quote("BTCUSDT", 10.0) == {"orderId": 1}
+    assert api.rest == [("BTCUSDT", 10.0)] and gw.fallbacks == 1
+    assert gw.latency_stats()["rest"][0] == 1
+
+    p = _Pending()
+    gw._pending["7"] = p
+    gw._on_message(json.dumps({
+        "id": "7",
+        "status": 200,
+        "result": {"orderId": 2},
+        "rateLimits": [
+            {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "count": 42},
+            {"rateLimitType": "ORDERS", "interval": "SECOND", "intervalNum": 10, "count": 3},
+        ],
+    }))
+    assert p.done.is_set() and p.response["result"] == {"orderId": 2}
+    assert api.governor.used_weight == 42 and api.governor.order_count_10s == 3
+    assert gw._result("order.place", p, 0.0) == {"orderId": 2}
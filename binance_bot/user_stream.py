@@ -0,0 +1,373 @@
+"""User-data stream (listenKey) consumer: fills, OCO state and balances.
+
+A background thread holds the WebSocket to /ws/<listenKey>. It keeps the key
+alive every 30 minutes and reconnects with backoff, using a fresh key after a
+failure. What it does with each event:
+- outboundAccountPosition updates the local balance cache, so the daemon no
+  longer polls /api/v3/account for balances;
+- executionReport and listStatus are queued, and the daemon applies them to
+  binance_order / binance_position on its own thread (apply_events).
+
+Events sent while disconnected are lost. So after every (re)connect, the
+balance cache is reseeded from one REST account call, and the daemon is
+asked (take_reconcile) to run reconcile_oco_positions. That re-reads every
+open OCO position's order list over REST and closes the ones that finished
+during the gap.
+
+An order can fill in several trades, and each executionReport carries only
+that trade's commission. The stream sums them per order, so the FILLED
+event's `fee_quote` is the order's total fee in the quote asset.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+import websocket
+
+from market_stream import default_stream_url
+
+logger = logging.getLogger("binance_user_stream")
+
+KEEPALIVE_SECONDS = 30 * 60
+QUOTE_ASSET = "USDT"
+_FINAL_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "EXPIRED_IN_MATCH", "REJECTED")
+
+
+class UserDataStream:
+    def __init__(
+        self,
+        api,
+        *,
+        stream_url: Optional[str] = None,
+        on_event: Optional[Callable[[], None]] = None,
+        max_queue: int = 10000,
+    ):
+        self.api = api
+        self.stream_url = (stream_url or default_stream_url(api.base_url)).rstrip("/")
+        self._on_event = on_event
+        self._events: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._balances: dict[str, tuple[float, float]] = {}  # asset -> (free, locked)
+        self._balances_ready = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self._listen_key: Optional[str] = None
+        self._fees: dict[tuple[str, int], float] = {}  # (symbol, orderId) -> quote commission so far
+        self._reconcile = threading.Event()
+        self.connected = False
+        self.reconnects = 0
+        self.dropped = 0
+
+    # ---- lifecycle ----
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="user-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._listen_key:
+            try:
+                self.api.close_listen_key(self._listen_key)
+            except Exception:
+                pass
+
+    def _seed_balances(self) -> None:
+        acct = self.api.account()
+        with self._lock:
+            self._balances = {
+                str(b.get("asset")): (float(b.get("free") or 0), float(b.get("locked") or 0))
+                for b in (acct.get("balances") or [])
+            }
+            self._balances_ready = True
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                if self._listen_key is None:
+                    self._listen_key = self.api.new_listen_key()
+                self._ws = websocket.create_connection(f"{self.stream_url}/ws/{self._listen_key}", timeout=60)
+                self._seed_balances()
+                self.connected = True
+                logger.info("user data stream connected")
+                self._reconcile.set()
+                if self._on_event is not None:
+                    self._on_event()
+                attempt = 0
+                last_keepalive = time.time()
+                while not self._stop.is_set():
+                    if time.time() - last_keepalive > KEEPALIVE_SECONDS:
+                        self.api.keepalive_listen_key(self._listen_key)
+                        last_keepalive = time.time()
+                    try:
+                        raw = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        continue
+                    if not raw:
+                        raise RuntimeError("stream closed")
+                    self._on_message(raw)
+            except Exception as e:
+                self.connected = False
+                if self._stop.is_set():
+                    break
+                self.reconnects += 1
+                self._listen_key = None  # expired or invalid keys are the usual cause: start fresh
+                delay = min(60.0, 1.0 * (2 ** attempt)) + random.uniform(0, 1.0)
+                attempt += 1
+                logger.warning("user data stream error (reconnect in %.1fs): %s", delay, e)
+                self._stop.wait(delay)
+            finally:
+                self.connected = False
+                ws, self._ws = self._ws, None
+                if ws is not None:
+                    try:
+                        ws.close()
+                    except Exception:
+                        pass
+
+    def _on_message(self, raw: str) -> None:
+        ev = json.loads(raw)
+        kind = ev.get("e")
+        if kind == "outboundAccountPosition":
+            with self._lock:
+                for b in ev.get("B") or []:
+                    self._balances[str(b["a"])] = (float(b["f"]), float(b["l"]))
+            return
+        if kind == "listenKeyExpired":
+            raise RuntimeError("listenKey expired")
+        if kind not in ("executionReport", "listStatus"):
+            return
+        if kind == "executionReport":
+            key = (str(ev.get("s")), int(ev.get("i") or 0))
+            fee = self._fees.get(key, 0.0)
+            if ev.get("x") == "TRADE" and ev.get("N") == QUOTE_ASSET:
+                fee += float(ev.get("n") or 0)
+            if ev.get("X") in _FINAL_STATUSES:
+                self._fees.pop(key, None)
+            else:
+                self._fees[key] = fee
+            ev["fee_quote"] = fee
+        try:
+            self._events.put_nowait(ev)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("user event queue full: dropped=%s", self.dropped)
+            return
+        if self._on_event is not None:
+            self._on_event()
+
+    # ---- readers ----
+
+    def take_reconcile(self) -> bool:
+        """True once after each (re)connect: run reconcile_oco_positions for events lost in the gap."""
+        if self._reconcile.is_set():
+            self._reconcile.clear()
+            return True
+        return False
+
+    def drain(self) -> list[dict]:
+        out = []
+        while True:
+            try:
+                out.append(self._events.get_nowait())
+            except queue.Empty:
+                return out
+
+    def balances(self) -> Optional[dict[str, float]]:
+        """{asset: free + locked} for non-zero balances, or None until the first seed."""
+        with self._lock:
+            if not self._balances_ready:
+                return None
+            return {a: f + l for a, (f, l) in self._balances.items() if f + l > 0}
+
+
+def _commission_in_quote(ev: dict) -> float:
+    """Total quote-asset fee of the order (summed by the stream); only this trade's when unknown."""
+    if "fee_quote" in ev:
+        return float(ev["fee_quote"] or 0)
+    # Only fees paid in the quote asset reduce quote proceeds directly.
+    return float(ev.get("n") or 0) if ev.get("N") == QUOTE_ASSET else 0.0
+
+
+def _close_position(cur, pid: int, entry_quote: float, symbol: str, order_id: str, base: float, quote: float, fee: float, reason: str, raw: dict) -> None:
+    """Close an OCO position at its exit fill and record the SELL row."""
+    exit_price = quote / base if base > 0 else None
+    cur.execute(
+        """
+        UPDATE binance_position
+        SET status='closed',
+            exit_order_id=%s,
+            exit_price=%s,
+            exit_quote_qty=%s,
+            pnl_quote=%s,
+            raw_json = COALESCE(raw_json,'{}'::jsonb) || %s::jsonb
+        WHERE id=%s
+        """,
+        (order_id, exit_price, quote, quote - fee - entry_quote, json.dumps({"exit_reason": reason, "exit_event": raw}), pid),
+    )
+    cur.execute(
+        """
+        INSERT INTO binance_order(symbol, side, status, order_id, quote_qty, base_qty, price, position_id, exec_status, executed_qty, cum_quote_qty, raw_response_json)
+        VALUES (%s,'SELL','submitted',%s,%s,%s,%s,%s,'FILLED',%s,%s,%s::jsonb)
+        """,
+        (symbol, order_id, quote, base, exit_price, pid, base, quote, json.dumps(raw)),
+    )
+
+
+def apply_events(conn, events: list[dict], *, on_closed: Optional[Callable[[int], None]] = None) -> int:
+    """Apply executionReport/listStatus events to binance_order and binance_position.
+
+    - Any order we know (binance_order.order_id) gets its execution status,
+      filled quantity and cumulative quote updated.
+    - A SELL leg of a position's OCO that is FILLED closes the position with
+      its realized PnL (sell quote - commission in USDT - entry quote), and is
+      recorded as a SELL row.
+    - listStatus updates the position's OCO status.
+    The position row is locked before closing, so several shards applying the
+    same event close it once.
+    Returns the number of positions closed.
+    """
+    closed = 0
+    with conn.cursor() as cur:
+        for ev in events:
+            if ev.get("e") == "listStatus":
+                cur.execute(
+                    "UPDATE binance_position SET oco_status=%s WHERE oco_order_list_id=%s",
+                    (ev.get("L"), str(ev.get("g"))),
+                )
+                continue
+
+            order_id = str(ev.get("i"))
+            status = ev.get("X")
+            cur.execute(
+                """
+                UPDATE binance_order
+                SET exec_status=%s, executed_qty=%s, cum_quote_qty=%s, updated_at=now()
+                WHERE order_id=%s AND symbol=%s
+                """,
+                (status, float(ev.get("z") or 0), float(ev.get("Z") or 0), order_id, ev.get("s")),
+            )
+            list_id = ev.get("g")
+            if ev.get("S") != "SELL" or status != "FILLED" or list_id in (None, -1):
+                continue
+
+            cur.execute(
+                """
+                SELECT id, COALESCE(entry_quote_qty,0)::float8
+                FROM binance_position
+                WHERE oco_order_list_id=%s AND status='open'
+                FOR UPDATE
+                """,
+                (str(list_id),),
+            )
+            row = cur.fetchone()
+            if row is None:
+                continue
+            pid = int(row[0])
+            _close_position(
+                cur,
+                pid,
+                float(row[1]),
+                ev.get("s"),
+                order_id,
+                float(ev.get("z") or 0),
+                float(ev.get("Z") or 0),
+                _commission_in_quote(ev),
+                f"oco_{str(ev.get('o') or '').lower()}",
+                ev,
+            )
+            closed += 1
+            if on_closed is not None:
+                on_closed(pid)
+    conn.commit()
+    return closed
+
+
+def reconcile_oco_positions(conn, api, *, on_closed: Optional[Callable[[int], None]] = None) -> int:
+    """Close open OCO positions whose order list finished while the stream was down.
+
+    For each open position with an OCO: GET /api/v3/orderList. When the list is
+    ALL_DONE, the fills of its legs (myTrades) give the exit quantity, quote and
+    fee, and the position is closed like a streamed fill would close it. When
+    no leg traded (the OCO was cancelled), the position is marked
+    'oco_canceled', so it no longer holds an open slot. Returns the number of
+    positions closed.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, symbol, oco_order_list_id
+            FROM binance_position
+            WHERE status='open' AND oco_order_list_id IS NOT NULL
+            """
+        )
+        rows = cur.fetchall() or []
+    conn.commit()
+
+    closed = 0
+    for pid, symbol, list_id in rows:
+        try:
+            ol = api.order_list(str(list_id))
+            if ol.get("listOrderStatus") != "ALL_DONE":
+                continue
+            base = quote = fee = 0.0
+            exit_order_id = None
+            for leg in ol.get("orders") or []:
+                trades = api.my_trades(symbol, str(leg["orderId"]))
+                for t in trades:
+                    base += float(t.get("qty") or 0)
+                    quote += float(t.get("quoteQty") or 0)
+                    if t.get("commissionAsset") == QUOTE_ASSET:
+                        fee += float(t.get("commission") or 0)
+                if trades:
+                    exit_order_id = str(leg["orderId"])
+        except Exception as e:
+            logger.warning("oco reconcile failed pos=%s list=%s: %s", pid, list_id, e)
+            continue
+
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COALESCE(entry_quote_qty,0)::float8 FROM binance_position WHERE id=%s AND status='open' FOR UPDATE",
+                (int(pid),),
+            )
+            row = cur.fetchone()
+            if row is not None:
+                if exit_order_id is None:
+                    cur.execute(
+                        "UPDATE binance_position SET status='oco_canceled', oco_status='ALL_DONE' WHERE id=%s",
+                        (int(pid),),
+                    )
+                    logger.warning("oco list=%s finished without a fill: position %s marked oco_canceled", list_id, pid)
+                else:
+                    _close_position(
+                        cur, int(pid), float(row[0]), symbol, exit_order_id, base, quote, fee, "oco_reconciled", ol
+                    )
+                    cur.execute("UPDATE binance_position SET oco_status='ALL_DONE' WHERE id=%s", (int(pid),))
+        conn.commit()
+        if row is not None:
+            closed += 1
+            if on_closed is not None:
+                on_closed(int(pid))
+    if closed:
+        logger.info("oco reconcile: closed=%s of open=%s", closed, len(rows))
+    return closed
@@ -0,0 +1,291 @@
+"""Order entry over the Binance WebSocket API (order.place / orderList.place).
+
+One authenticated connection stays open, so an order costs one frame on an
+established TLS session instead of an HTTP request. Responses are matched to
+requests by id. A background thread reads the socket and reconnects with
+backoff.
+
+`WsOrderGateway` has the same order methods as `BinanceApi`. If the socket is
+down, or a request cannot be written, it sends the order over REST instead. A
+request that was written but got no answer is not resent, because the order
+may have been placed; it raises RuntimeError. Weight and order counts go
+through the shared governor, and each response's rateLimits update it.
+
+Submit latency is kept per transport (`latency_stats()`), so the WS and REST
+paths can be compared on a live daemon.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlencode
+
+import websocket
+
+from binance_api import PRIORITY_HIGH, PRIORITY_NORMAL, BinanceApi
+
+logger = logging.getLogger("binance_ws_orders")
+
+WS_API_URL = "wss://ws-api.binance.com:443/ws-api/v3"
+TESTNET_WS_API_URL = "wss://ws-api.testnet.binance.vision/ws-api/v3"
+
+
+def default_ws_api_url(base_url: str) -> str:
+    return TESTNET_WS_API_URL if "testnet" in base_url else WS_API_URL
+
+
+class _Pending:
+    __slots__ = ("done", "response")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[dict] = None
+
+
+class _NotSent(Exception):
+    """The request never reached the socket: safe to send it over REST."""
+
+
+class WsOrderGateway:
+    def __init__(self, api: BinanceApi, *, ws_url: Optional[str] = None, timeout: float = 5.0):
+        self.api = api
+        self.ws_url = ws_url or default_ws_api_url(api.base_url)
+        self.timeout = float(timeout)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending: dict[str, _Pending] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self.connected = threading.Event()
+        self.reconnects = 0
+        self.fallbacks = 0
+        self._latency: dict[str, list[float]] = {"ws": [0, 0.0], "rest": [0, 0.0]}
+
+    # ---- lifecycle ----
+
+    def start(self) -> "WsOrderGateway":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ws-orders", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                self._ws = websocket.create_connection(self.ws_url, timeout=30, enable_multithread=True)
+                self.connected.set()
+                logger.info("ws order gateway connected url=%s", self.ws_url)
+                attempt = 0
+                while not self._stop.is_set():
+                    try:
+                        raw = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        continue
+                    if not raw:
+                        raise RuntimeError("connection closed")
+                    self._on_message(raw)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.reconnects += 1
+                delay = min(30.0, 0.5 * (2 ** attempt)) + random.uniform(0, 0.5)
+                attempt += 1
+                logger.warning("ws order gateway error (reconnect in %.1fs): %s", delay, e)
+                self._fail_pending()
+                self._stop.wait(delay)
+            finally:
+                self.connected.clear()
+                ws, self._ws = self._ws, None
+                if ws is not None:
+                    try:
+                        ws.close()
+                    except Exception:
+                        pass
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        # Wake callers still waiting: their answers are lost with the connection.
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for p in pending.values():
+            p.done.set()
+
+    def _on_message(self, raw: str) -> None:
+        msg = json.loads(raw)
+        rate_limits = msg.get("rateLimits") or []
+        if rate_limits:
+            self.api.governor.observe(int(msg.get("status") or 200), _limits_as_headers(rate_limits))
+        with self._lock:
+            p = self._pending.pop(str(msg.get("id")), None)
+        if p is not None:
+            p.response = msg
+            p.done.set()
+
+    # ---- requests ----
+
+    def _signed_params(self, params: dict) -> dict:
+        p = {
+            **params,
+            "apiKey": self.api.api_key,
+            "timestamp": self.api.clock.now_ms(),
+            "recvWindow": self.api.recv_window,
+        }
+        payload = urlencode(sorted(p.items()))
+        p["signature"] = hmac.new(self.api.api_secret, payload.encode("utf-8"), hashlib.sha256).hexdigest()
+        return p
+
+    def _submit(self, method: str, params: dict, *, priority: int, orders: int) -> tuple[_Pending, float]:
+        ws = self._ws
+        if ws is None or not self.connected.is_set():
+            raise _NotSent("not connected")
+        self.api.governor.acquire(1, priority, orders=orders)
+        rid = str(next(self._ids))
+        p = _Pending()
+        with self._lock:
+            self._pending[rid] = p
+        t0 = time.perf_counter()
+        try:
+            ws.send(json.dumps({"id": rid, "method": method, "params": self._signed_params(params)}))
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(rid, None)
+            raise _NotSent(str(e)) from e
+        return p, t0
+
+    def _result(self, method: str, p: _Pending, t0: float) -> dict:
+        if not p.done.wait(self.timeout) or p.response is None:
+            raise RuntimeError(f"{method}: no response (order state unknown, check open orders)")
+        self._record("ws", t0)
+        msg = p.response
+        if int(msg.get("status") or 0) != 200:
+            raise RuntimeError(f"{method} failed: {msg.get('status')} {json.dumps(msg.get('error'))}")
+        return msg["result"]
+
+    def _place(self, method: str, params: dict, rest_call, *, priority: int, orders: int) -> dict:
+        for attempt in range(2):
+            try:
+                p, t0 = self._submit(method, params, priority=priority, orders=orders)
+            except _NotSent as e:
+                return self._rest(rest_call, method, e)
+            try:
+                return self._result(method, p, t0)
+            except RuntimeError as e:
+                if attempt == 0 and '"code": -1021' in str(e):
+                    self.api.clock.sync()
+                    continue
+                raise
+        raise RuntimeError(f"{method} failed: timestamp outside recvWindow after resync")
+
+    def _rest(self, rest_call, method: str, reason) -> dict:
+        self.fallbacks += 1
+        logger.info("%s over REST: %s", method, reason)
+        t0 = time.perf_counter()
+        out = rest_call()
+        self._record("rest", t0)
+        return out
+
+    def _record(self, transport: str, t0: float) -> None:
+        s = self._latency[transport]
+        s[0] += 1
+        s[1] += (time.perf_counter() - t0) * 1000.0
+
+    def latency_stats(self) -> dict[str, tuple[int, float]]:
+        """transport -> (orders, mean submit latency in ms)."""
+        return {k: (int(n), (total / n) if n else 0.0) for k, (n, total) in self._latency.items()}
+
+    # ---- BinanceApi order interface ----
+
+    def new_order_market_buy_quote(self, symbol: str, quote_qty: float) -> dict:
+        params = {"symbol": symbol, "side": "BUY", "type": "MARKET", "quoteOrderQty": f"{quote_qty:.2f}"}
+        return self._place(
+            "order.place",
+            params,
+            lambda: self.api.new_order_market_buy_quote(symbol, quote_qty),
+            priority=PRIORITY_NORMAL,
+            orders=1,
+        )
+
+    def new_order_market_sell_quantity(self, symbol: str, quantity: str) -> dict:
+        params = {"symbol": symbol, "side": "SELL", "type": "MARKET", "quantity": quantity}
+        return self._place(
+            "order.place",
+            params,
+            lambda: self.api.new_order_market_sell_quantity(symbol, quantity),
+            priority=PRIORITY_HIGH,
+            orders=1,
+        )
+
+    def new_oco_sell(self, symbol: str, quantity: str, price: str, stop_price: str, stop_limit_price: str) -> dict:
+        params = {
+            "symbol": symbol,
+            "side": "SELL",
+            "quantity": quantity,
+            "price": price,
+            "stopPrice": stop_price,
+            "stopLimitPrice": stop_limit_price,
+            "stopLimitTimeInForce": "GTC",
+        }
+        return self._place(
+            "orderList.place",
+            params,
+            lambda: self.api.new_oco_sell(symbol, quantity, price, stop_price, stop_limit_price),
+            priority=PRIORITY_HIGH,
+            orders=2,
+        )
+
+    def market_sell_many(self, items: list[tuple[str, str]]) -> list:
+        """Pipeline several market sells on the socket; dict or Exception per item."""
+        sent = []
+        for sym, qty in items:
+            params = {"symbol": sym, "side": "SELL", "type": "MARKET", "quantity": qty}
+            try:
+                sent.append(self._submit("order.place", params, priority=PRIORITY_HIGH, orders=1))
+            except _NotSent:
+                sent.append(None)
+            except Exception as e:
+                sent.append(e)
+        out = []
+        for (sym, qty), s in zip(items, sent):
+            try:
+                if s is None:
+                    out.append(self._rest(lambda: self.api.new_order_market_sell_quantity(sym, qty), "order.place", "not sent"))
+                elif isinstance(s, Exception):
+                    out.append(s)
+                else:
+                    out.append(self._result("order.place", *s))
+            except Exception as e:
+                out.append(e)
+        return out
+
+
+def _limits_as_headers(rate_limits: list[dict]) -> dict:
+    """WS API rateLimits -> the REST usage headers WeightGovernor.observe reads."""
+    h = {}
+    for rl in rate_limits:
+        if rl.get("rateLimitType") == "REQUEST_WEIGHT" and rl.get("interval") == "MINUTE" and rl.get("intervalNum") == 1:
+            h["X-MBX-USED-WEIGHT-1M"] = rl.get("count")
+        elif rl.get("rateLimitType") == "ORDERS" and rl.get("interval") == "SECOND" and rl.get("intervalNum") == 10:
+            h["X-MBX-ORDER-COUNT-10S"] = rl.get("count")
+    return h
@@ -0,0 +1,7 @@
+"""Code shared by binance_bot and polymarket_bot.
+
+Each bot imports it through its own `_botcommon` module, which puts the
+repository root on sys.path (the bots run from their own directories).
+Bot-specific parts — SQL loaders, table lists, lock keys — stay in the bot
+and are passed in.
+"""
@@ -0,0 +1,136 @@
+"""In-memory exposure ledger (daily spend, open positions, per-market exposure).
+
+Loaded from the DB once at startup, through a bot-specific loader that
+returns an ExposureSnapshot. After that it is updated in memory on every
+submitted buy and on every position open/close, so risk checks are
+dictionary lookups instead of per-tick SQL aggregates. A slow timer reloads
+it from the DB, which picks up orders placed by other processes and manual
+fixes, and logs any drift.
+
+Days roll over at UTC midnight, the same as date_trunc('day', now()) on a
+UTC database.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Callable, Optional
+
+logger = logging.getLogger("exposure")
+
+
+def _utc_day() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+@dataclass
+class ExposureSnapshot:
+    spent_today: float = 0.0
+    spent_by_market: dict[str, float] = field(default_factory=dict)
+    open_positions: dict[int, tuple[str, float]] = field(default_factory=dict)  # id -> (market, notional)
+
+
+class ExposureLedger:
+    def __init__(
+        self,
+        loader: Callable[[object], ExposureSnapshot],
+        *,
+        reconcile_seconds: float = 300.0,
+        today: Callable[[], date] = _utc_day,
+    ):
+        self._loader = loader
+        self._today = today
+        self.reconcile_seconds = float(reconcile_seconds)
+        self._day = today()
+        self._spent = 0.0
+        self._spent_by_market: dict[str, float] = {}
+        self._positions: dict[int, tuple[str, float]] = {}
+        self._exposure: dict[str, float] = {}
+        self._open_by_market: dict[str, int] = {}
+        self.last_reconcile = 0.0
+
+    def _roll(self) -> None:
+        day = self._today()
+        if day != self._day:
+            self._day = day
+            self._spent = 0.0
+            self._spent_by_market = {}
+
+    # ---- updates ----
+
+    def record_order(self, market: str, notional: float) -> None:
+        """A BUY was submitted (counts toward today's spend)."""
+        self._roll()
+        self._spent += float(notional)
+        self._spent_by_market[market] = self._spent_by_market.get(market, 0.0) + float(notional)
+
+    def open_position(self, pos_id: int, market: str, notional: float) -> None:
+        if pos_id in self._positions:
+            return
+        self._positions[pos_id] = (market, float(notional))
+        self._exposure[market] = self._exposure.get(market, 0.0) + float(notional)
+        self._open_by_market[market] = self._open_by_market.get(market, 0) + 1
+
+    def close_position(self, pos_id: int) -> None:
+        hit = self._positions.pop(pos_id, None)
+        if hit is None:
+            return
+        market, notional = hit
+        self._exposure[market] = self._exposure.get(market, 0.0) - notional
+        self._open_by_market[market] = self._open_by_market.get(market, 1) - 1
+        if self._open_by_market[market] <= 0:
+            self._open_by_market.pop(market, None)
+            self._exposure.pop(market, None)
+
+    # ---- checks (O(1)) ----
+
+    def spent_today(self) -> float:
+        self._roll()
+        return self._spent
+
+    def spent_today_market(self, market: str) -> float:
+        self._roll()
+        return self._spent_by_market.get(market, 0.0)
+
+    def can_spend(self, notional: float, daily_cap: float) -> bool:
+        return self.spent_today() + float(notional) <= float(daily_cap)
+
+    def open_count(self, market: Optional[str] = None) -> int:
+        if market is None:
+            return len(self._positions)
+        return self._open_by_market.get(market, 0)
+
+    def market_exposure(self, market: str) -> float:
+        return self._exposure.get(market, 0.0)
+
+    # ---- DB reconciliation ----
+
+    def reconcile(self, conn) -> None:
+        snap = self._loader(conn)
+        self._roll()
+        drift = abs(snap.spent_today - self._spent)
+        if self.last_reconcile and (drift > 1e-6 or len(snap.open_positions) != len(self._positions)):
+            logger.info(
+                "exposure drift: spent mem=%.2f db=%.2f open mem=%s db=%s",
+                self._spent,
+                snap.spent_today,
+                len(self._positions),
+                len(snap.open_positions),
+            )
+        self._spent = float(snap.spent_today)
+        self._spent_by_market = dict(snap.spent_by_market)
+        self._positions = {}
+        self._exposure = {}
+        self._open_by_market = {}
+        for pid, (market, notional) in snap.open_positions.items():
+            self.open_position(pid, market, notional)
+        self.last_reconcile = time.time()
+
+    def maybe_reconcile(self, conn) -> bool:
+        if time.time() - self.last_reconcile < self.reconcile_seconds:
+            return False
+        self.reconcile(conn)
+        return True
@@ -0,0 +1,118 @@
+"""Versioned schema migrations (runner shared by both bots).
+
+Migrations are the files <bot>/migrations/NNNN_<name>.sql, applied in
+version order. Every applied version is recorded in schema_version under the
+bot's component name, so the Binance and Polymarket bots can share one
+database.
+
+When the database is up to date, startup is a single SELECT and runs no
+DDL, so it takes no catalog locks. Otherwise the runner takes a session
+advisory lock, so concurrent starts don't apply the same migration twice.
+It re-reads the version under the lock, then applies each pending file in
+its own transaction together with its schema_version row.
+
+The lock key is the same for every component: both bots bootstrap
+schema_version with CREATE TABLE IF NOT EXISTS, which is not safe to run
+concurrently, so a Binance and a Polymarket start are serialized too.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import psycopg
+
+logger = logging.getLogger("migrate")
+
+MIGRATION_LOCK_KEY = 0x626F6D67  # "bomg", one key for every component
+_FILE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+
+def discover(directory: Path) -> list[Migration]:
+    """Migration files in version order. Versions must be unique."""
+    out: dict[int, Migration] = {}
+    for p in sorted(directory.glob("*.sql")):
+        m = _FILE.match(p.name)
+        if not m:
+            raise RuntimeError(f"bad migration file name: {p.name} (expected NNNN_name.sql)")
+        v = int(m.group(1))
+        if v in out:
+            raise RuntimeError(f"duplicate migration version {v}: {out[v].path.name}, {p.name}")
+        out[v] = Migration(v, m.group(2), p)
+    return [out[v] for v in sorted(out)]
+
+
+def current_version(conn, component: str) -> int:
+    """Latest applied version; 0 on a database without schema_version."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(max(version), 0) FROM schema_version WHERE component=%s", (component,))
+            v = int(cur.fetchone()[0])
+        conn.commit()
+        return v
+    except psycopg.errors.UndefinedTable:
+        conn.rollback()
+        return 0
+
+
+def migrate(
+    conn,
+    *,
+    directory: Path,
+    component: str,
+    lock_key: int = MIGRATION_LOCK_KEY,
+) -> list[int]:
+    """Apply pending migrations. Returns the versions applied (empty when up to date)."""
+    migrations = discover(directory)
+    if not migrations or current_version(conn, component) >= migrations[-1].version:
+        return []
+
+    applied: list[int] = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (lock_key,))
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                  component TEXT NOT NULL,
+                  version INTEGER NOT NULL,
+                  name TEXT NOT NULL,
+                  applied_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                  PRIMARY KEY (component, version)
+                )
+                """
+            )
+        conn.commit()
+        done = current_version(conn, component)  # another process may have migrated while we waited
+        for m in migrations:
+            if m.version <= done:
+                continue
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(m.path.read_text(encoding="utf-8"))
+                    cur.execute(
+                        "INSERT INTO schema_version(component, version, name) VALUES (%s,%s,%s)",
+                        (component, m.version, m.name),
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(m.version)
+            logger.info("migration applied component=%s version=%s name=%s", component, m.version, m.name)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (lock_key,))
+        conn.commit()
+    return applied
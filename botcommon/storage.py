@@ -0,0 +1,212 @@
+"""Time-partitioned tick tables: partitions ahead, hourly rollup, retention.
+
+Each bot lists its range-partitioned tables as TickTable tuples (storage.py)
+and passes them in with its own advisory-lock key. maintain():
+- creates the partitions for the next STORAGE_PARTITIONS_AHEAD periods, so
+  inserts never land in the DEFAULT partition. If rows already landed there
+  (maintenance fell behind), Postgres refuses the CREATE. In that case the
+  same transaction detaches DEFAULT, creates the partition, moves the rows
+  into it and re-attaches DEFAULT;
+- with STORAGE_RETAIN_DAYS > 0, rolls raw rows older than that into the
+  *_hourly tables, then drops their partitions. Old rows that landed in
+  DEFAULT are rolled up and deleted instead. Rollups merge into an existing
+  hourly row (counts add up, min/max widen, last_* follow the latest row).
+
+Queries bounded on the time column (created_at >= now() - interval ...) are
+pruned to the hot partitions.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from psycopg import sql
+
+logger = logging.getLogger("storage")
+
+PERIODS = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+_RANGE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+@dataclass(frozen=True)
+class TickTable:
+    name: str
+    time_column: str
+    period: str  # "day" | "week"
+    # INSERT ... SELECT ... FROM {source} WHERE {where} ... ON CONFLICT DO UPDATE, merging with
+    # the hour's existing row: each raw row is rolled up once, right before it is dropped.
+    rollup_sql: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    lower: Optional[datetime]  # None: MINVALUE
+    upper: Optional[datetime]  # None: MAXVALUE
+    default: bool = False
+
+
+def period_start(ts: datetime, period: str) -> datetime:
+    """UTC midnight of the day (or the Monday of the week) containing ts."""
+    day = ts.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "week":
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def parse_bound(text: str) -> Optional[datetime]:
+    """One side of pg_get_expr(relpartbound): 'MINVALUE', or a quoted timestamptz."""
+    text = text.strip()
+    if text in ("MINVALUE", "MAXVALUE"):
+        return None
+    text = text.strip("'")
+    if re.search(r"[+-]\d\d$", text):
+        text += ":00"
+    return datetime.fromisoformat(text)
+
+
+def plan_partitions(
+    table: TickTable, existing: list[Partition], now: datetime, ahead: int
+) -> list[tuple[str, datetime, datetime]]:
+    """(name, from, to) of the partitions to create, contiguous from the last existing upper bound.
+
+    The first one may be shorter than a period (e.g. after the legacy partition's boundary).
+    """
+    step = PERIODS[table.period]
+    horizon = period_start(now, table.period) + step * (ahead + 1)
+    uppers = [p.upper for p in existing if not p.default and p.upper is not None]
+    nxt = max(uppers) if uppers else period_start(now, table.period)
+    out = []
+    while nxt < horizon:
+        hi = period_start(nxt, table.period) + step
+        out.append((f"{table.name}_p{nxt:%Y%m%d}", nxt, hi))
+        nxt = hi
+    return out
+
+
+def partitions(cur, table: str) -> Optional[list[Partition]]:
+    """Partitions of `table`; None when it is not a partitioned table."""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table,))
+    row = cur.fetchone()
+    if not row or row[0] != "p":
+        return None
+    cur.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        (table,),
+    )
+    out = []
+    for name, bound in cur.fetchall() or []:
+        if bound == "DEFAULT":
+            out.append(Partition(name, None, None, default=True))
+            continue
+        m = _RANGE.search(bound or "")
+        if m:
+            out.append(Partition(name, parse_bound(m.group(1)), parse_bound(m.group(2))))
+    return out
+
+
+def _rollup(cur, table: TickTable, source: str, where: sql.Composable) -> None:
+    if table.rollup_sql:
+        cur.execute(sql.SQL(table.rollup_sql).format(source=sql.Identifier(source), where=where))
+
+
+def _create_partition(cur, table: TickTable, name: str, lo: datetime, hi: datetime, default: Optional[str]) -> None:
+    """CREATE the partition [lo, hi); first move its rows out of DEFAULT when some landed there."""
+    parent = sql.Identifier(table.name)
+    create = sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})").format(
+        sql.Identifier(name), parent, sql.Literal(lo), sql.Literal(hi)
+    )
+    stranded = False
+    if default is not None:
+        col = sql.Identifier(table.time_column)
+        in_range = sql.SQL("{} >= {} AND {} < {}").format(col, sql.Literal(lo), col, sql.Literal(hi))
+        cur.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE {})").format(sql.Identifier(default), in_range))
+        stranded = bool(cur.fetchone()[0])
+    if not stranded:
+        cur.execute(create)
+        return
+    # Postgres refuses a partition whose rows sit in DEFAULT. Detached, DEFAULT is a plain
+    # table: create the partition, route the rows back through the parent, re-attach.
+    cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(parent, sql.Identifier(default)))
+    cur.execute(create)
+    cur.execute(
+        sql.SQL("WITH moved AS (DELETE FROM {} WHERE {} RETURNING *) INSERT INTO {} SELECT * FROM moved").format(
+            sql.Identifier(default), in_range, parent
+        )
+    )
+    moved = cur.rowcount
+    cur.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} DEFAULT").format(parent, sql.Identifier(default)))
+    logger.info("storage %s: moved %s rows from %s into %s", table.name, moved, default, name)
+
+
+def maintain(
+    conn,
+    tables: tuple[TickTable, ...],
+    *,
+    lock_key: int,
+    ahead: int = 3,
+    retain_days: float = 0.0,
+    now: Optional[datetime] = None,
+) -> dict[str, dict[str, list[str]]]:
+    """Create partitions ahead; roll up and drop raw data older than retain_days (0 keeps it).
+
+    One transaction per table. Returns {table: {"created": [...], "dropped": [...]}}.
+    """
+    now = now or datetime.now(timezone.utc)
+    # Hour-aligned so an hourly bucket is never split between two runs.
+    cutoff = (now - timedelta(days=retain_days)).replace(minute=0, second=0, microsecond=0)
+    report: dict[str, dict[str, list[str]]] = {}
+    for t in tables:
+        created: list[str] = []
+        dropped: list[str] = []
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL timezone = 'UTC'")
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (lock_key,))
+                parts = partitions(cur, t.name)
+                if parts is None:
+                    conn.rollback()
+                    logger.info("storage: %s is not partitioned (migration pending?)", t.name)
+                    continue
+                default = next((p.name for p in parts if p.default), None)
+                for name, lo, hi in plan_partitions(t, parts, now, ahead):
+                    _create_partition(cur, t, name, lo, hi, default)
+                    created.append(name)
+                if retain_days > 0:
+                    old = sql.SQL("{} < {}").format(sql.Identifier(t.time_column), sql.Literal(cutoff))
+                    for p in parts:
+                        if p.default:
+                            _rollup(cur, t, p.name, old)
+                            cur.execute(sql.SQL("DELETE FROM {} WHERE {}").format(sql.Identifier(p.name), old))
+                        elif p.upper is not None and p.upper <= cutoff:
+                            _rollup(cur, t, p.name, sql.SQL("TRUE"))
+                            cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(p.name)))
+                            dropped.append(p.name)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning("storage maintenance failed for %s: %s", t.name, e)
+            continue
+        if created or dropped:
+            logger.info("storage %s: created=%s dropped=%s", t.name, created, dropped)
+        report[t.name] = {"created": created, "dropped": dropped}
+    return report
+
+
+def maintain_from_env(conn, tables: tuple[TickTable, ...], *, lock_key: int) -> dict[str, dict[str, list[str]]]:
+    return maintain(
+        conn,
+        tables,
+        lock_key=lock_key,
+        ahead=int(os.getenv("STORAGE_PARTITIONS_AHEAD") or "3"),
+        retain_days=float(os.getenv("STORAGE_RETAIN_DAYS") or "0"),
+    )
@@ -46,6 +46,7 @@ export default async function Page() {
     `
     SELECT created_at, symbol, interval, close, ema_fast, ema_slow, rsi, blog_ma_score, blog_rsi_score
     FROM binance_indicator_point
+    WHERE created_at >= now() - interval '2 days'
     ORDER BY created_at DESC
     LIMIT 200
     `
@@ -55,6 +56,7 @@ export default async function Page() {
     `
     SELECT created_at, total_usdt_est
     FROM binance_balance_snapshot
+    WHERE created_at >= now() - interval '2 days'
     ORDER BY created_at DESC
     LIMIT 50
     `
@@ -38,6 +38,7 @@ export default async function Page() {
     `
     SELECT snapshot_at, mid, position_size, avg_entry_price, unrealized_pnl
     FROM paper_pnl_point
+    WHERE snapshot_at >= now() - interval '7 days'
     ORDER BY snapshot_at DESC
     LIMIT 300
     `
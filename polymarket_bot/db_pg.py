@@ -1,12 +1,14 @@
 """Postgres persistence for Polymarket bot.
 
 - Designed for GitHub Actions + cloud Postgres (Neon/Supabase)
-- Idempotent schema apply via schema_postgres.sql
+- Versioned schema migrations (migrations/NNNN_*.sql, see migrate.py)
 
 Env:
 - DATABASE_URL (preferred)
 
-This module does NOT manage connection pooling; keep it simple for cron-style runs.
+Cron-style runs use connect(). Resident daemons use open_pool() (psycopg_pool):
+connections outlive a tick, so their prepared statements do too, and a
+connection broken by a DB restart is replaced on the next checkout.
 """
 
 from __future__ import annotations
@@ -14,13 +16,11 @@ from __future__ import annotations
 import os
 import uuid
 from dataclasses import dataclass
-from pathlib import Path
 from typing import Optional
 
 import psycopg
 
-
-SCHEMA_PATH = Path(__file__).resolve().parent / "schema_postgres.sql"
+from migrate import migrate
 
 
 @dataclass
@@ -39,11 +39,30 @@ def connect(url: Optional[str] = None) -> psycopg.Connection:
     return psycopg.connect(url or database_url())
 
 
+def open_pool(url: Optional[str] = None, *, min_size: int = 1, max_size: int = 4, timeout: float = 30.0):
+    """Open a connection pool and wait for its first connection.
+
+    A connection that comes back broken (server restart, network drop) is
+    discarded by the pool, which opens replacements in the background with
+    backoff. Callers only need to check out a connection per unit of work.
+    """
+    from psycopg_pool import ConnectionPool
+
+    pool = ConnectionPool(
+        url or database_url(),
+        min_size=min_size,
+        max_size=max_size,
+        timeout=timeout,
+        name="polymarket",
+        open=False,
+    )
+    pool.open(wait=True, timeout=timeout)
+    return pool
+
+
 def init_db(conn: psycopg.Connection) -> None:
-    schema_sql = SCHEMA_PATH.read_text(encoding="utf-8")
-    with conn.cursor() as cur:
-        cur.execute(schema_sql)
-    conn.commit()
+    """Apply pending migrations; a single SELECT when the schema is up to date."""
+    migrate(conn)
 
 
 def start_run(conn: psycopg.Connection, run_id: Optional[str] = None) -> BotRun:
@@ -64,3 +83,36 @@ def finish_run(conn: psycopg.Connection, run: BotRun, status: str = "ok", error:
             (status, error, run.run_id),
         )
     conn.commit()
+
+
+def record_tick(conn, market_id: str, token_id: str, best_bid, best_ask, mid, raw_json: str) -> int:
+    """Persist the price point and count bullish signals of the last 30m in one round trip.
+
+    Both statements go out in pipeline mode behind a single Sync, as prepared
+    statements. Autocommit keeps BEGIN/COMMIT out of the flight; the two
+    statements don't need to share a transaction.
+    """
+    conn.autocommit = True
+    try:
+        with conn.cursor() as ins, conn.cursor() as sig:
+            with conn.pipeline():
+                ins.execute(
+                    """
+                    INSERT INTO market_price_point(market_id, token_id, best_bid, best_ask, mid, snapshot_at, raw_json)
+                    VALUES (%s,%s,%s,%s,%s, now(), %s::jsonb)
+                    """,
+                    (market_id, token_id, best_bid, best_ask, mid, raw_json),
+                    prepare=True,
+                )
+                sig.execute(
+                    """
+                    SELECT COUNT(*)::int
+                    FROM content_signal
+                    WHERE label='bullish'
+                      AND created_at >= now() - interval '30 minutes'
+                    """,
+                    prepare=True,
+                )
+            return int(sig.fetchone()[0] or 0)
+    finally:
+        conn.autocommit = False
@@ -0,0 +1,35 @@
+"""Exposure ledger loader for this bot (the ledger itself: botcommon.exposure).
+
+load_polymarket_exposure reads today's submitted buys per market into the
+ExposureSnapshot that ExposureLedger reconciles against.
+"""
+
+from __future__ import annotations
+
+import _botcommon  # puts the repository root on sys.path
+from botcommon.exposure import ExposureLedger, ExposureSnapshot
+
+
+def load_polymarket_exposure(conn) -> ExposureSnapshot:
+    """Today's submitted buys (price*size) per market, as the old per-tick SUM saw them.
+
+    Polymarket positions are not tracked in a table yet, so open_positions stays
+    empty until the bot records them via open_position/close_position.
+    """
+    snap = ExposureSnapshot()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT condition_id, COALESCE(SUM(price*size),0)::float8
+            FROM orders
+            WHERE status='submitted'
+              AND side='buy'
+              AND created_at >= date_trunc('day', now())
+              AND created_at <  date_trunc('day', now()) + interval '1 day'
+            GROUP BY condition_id
+            """
+        )
+        for market, spent in cur.fetchall() or []:
+            snap.spent_by_market[str(market)] = float(spent or 0.0)
+    snap.spent_today = sum(snap.spent_by_market.values())
+    return snap
@@ -28,8 +28,10 @@ import uuid
 import logging
 from datetime import datetime, timezone
 
-from db_pg import connect, init_db
+from db_pg import init_db, open_pool, record_tick
+from exposure import ExposureLedger, load_polymarket_exposure
 from infra import Infra, load_config_from_env
+from storage import maintain_from_env as maintain_storage
 from gamma import extract_outcome_token_ids
 
 logging.basicConfig(level=logging.INFO)
@@ -104,9 +106,10 @@ def main() -> None:
     # MARKET_SLUG is optional for the daemon (we resolve via /markets/{id})
     slug = (os.getenv("MARKET_SLUG") or "").strip()
 
-    # Connect DB + infra
-    conn = connect()
-    init_db(conn)
+    # Connect DB + infra. One pooled connection is checked out per tick, so a DB restart costs a tick, not the daemon.
+    pool = open_pool(max_size=2)
+    with pool.connection() as conn:
+        init_db(conn)
 
     cfg = load_config_from_env()
     infra = Infra(cfg)
@@ -116,6 +119,14 @@ def main() -> None:
     token_id, question = resolve_outcome_token_id(market_id=allow_market_id, outcome_name=outcome_name)
     logger.info("Resolved market %s: %s (outcome=%s token=%s)", allow_market_id, question, outcome_name, token_id)
 
+    ledger = ExposureLedger(load_polymarket_exposure, reconcile_seconds=_env_float("EXPOSURE_RECONCILE_SECONDS", 300.0))
+    with pool.connection() as conn:
+        ledger.reconcile(conn)
+
+    # Tick-table partitions ahead + rollup/retention (storage.py), on a slow timer.
+    storage_every = _env_float("STORAGE_MAINTENANCE_SECONDS", 3600.0)
+    last_storage_ts = 0.0
+
     last_trade_ts = 0.0
     loop_i = 0
 
@@ -133,158 +144,137 @@ def main() -> None:
             if best_bid is not None and best_ask is not None:
                 mid = (best_bid + best_ask) / 2.0
 
-            # Persist price point
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO market_price_point(market_id, token_id, best_bid, best_ask, mid, snapshot_at, raw_json)
-                    VALUES (%s,%s,%s,%s,%s, now(), %s::jsonb)
-                    """,
-                    (
-                        str(allow_market_id),
-                        str(token_id),
+            with pool.connection() as conn:
+                raw = {"bids": [getattr(b, "__dict__", {}) for b in bids[:3]], "asks": [getattr(a, "__dict__", {}) for a in asks[:3]]}
+                signals_last_30m = record_tick(conn, str(allow_market_id), str(token_id), best_bid, best_ask, mid, json.dumps(raw))
+
+                # Housekeeping must not cost the tick: on failure roll back and keep trading.
+                if time.time() - last_storage_ts >= storage_every:
+                    last_storage_ts = time.time()
+                    try:
+                        maintain_storage(conn)
+                    except Exception as e:
+                        conn.rollback()
+                        logger.warning("storage maintenance failed: %s", e)
+
+                # Today's notional already submitted (in memory; the DB is re-read on a slow timer)
+                try:
+                    ledger.maybe_reconcile(conn)
+                except Exception as e:
+                    conn.rollback()
+                    logger.warning("exposure reconcile failed (using in-memory totals): %s", e)
+                todays_notional = ledger.spent_today()
+
+                # Periodic status log
+                if loop_i % 15 == 0:
+                    logger.info(
+                        "tick market=%s outcome=%s bid=%s ask=%s mid=%s signals30m=%s todays_notional=%.2f enable_live=%s",
+                        allow_market_id,
+                        outcome_name,
                         best_bid,
                         best_ask,
                         mid,
-                        json.dumps({"bids": [getattr(b, "__dict__", {}) for b in bids[:3]], "asks": [getattr(a, "__dict__", {}) for a in asks[:3]]}),
-                    ),
-                )
-
-                # Recent bullish signals (last 30m)
-                cur.execute(
-                    """
-                    SELECT COUNT(*)::int
-                    FROM content_signal
-                    WHERE label='bullish'
-                      AND created_at >= now() - interval '30 minutes'
-                    """
-                )
-                signals_last_30m = int(cur.fetchone()[0] or 0)
-
-                # Today's notional already submitted
-                cur.execute(
-                    """
-                    SELECT COALESCE(SUM(price*size),0)::float8
-                    FROM orders
-                    WHERE status='submitted'
-                      AND side='buy'
-                      AND created_at >= date_trunc('day', now())
-                      AND created_at <  date_trunc('day', now()) + interval '1 day'
-                    """
-                )
-                todays_notional = float(cur.fetchone()[0] or 0.0)
-
-            conn.commit()
-
-            # Periodic status log
-            if loop_i % 15 == 0:
-                logger.info(
-                    "tick market=%s outcome=%s bid=%s ask=%s mid=%s signals30m=%s todays_notional=%.2f enable_live=%s",
-                    allow_market_id,
-                    outcome_name,
-                    best_bid,
-                    best_ask,
-                    mid,
-                    signals_last_30m,
-                    todays_notional,
-                    enable_live,
-                )
-
-            # Simple entry gate (v1)
-            if enable_live and best_ask is not None and signals_last_30m >= min_signals_last_30m:
-                spread = None
-                if best_bid is not None:
-                    spread = best_ask - best_bid
-
-                # Prevent ultra-frequent orders
-                if time.time() - last_trade_ts < 60:
-                    continue
-
-                # Stop spamming if we keep hitting balance/allowance issues.
-                # (We record errors in DB; no need to hammer the API.)
-
-                # Tight spread gate
-                if spread is not None and spread > 0.05:
-                    continue
-
-                price = min(best_ask, max_price)
-                if price <= 0:
-                    continue
-                # Avoid float artifacts (0.029999999) that can break amount precision checks.
-                price = float(f"{price:.3f}")
-
-                # Polymarket enforces amount precision:
-                # - maker amount (USDC) up to 2 decimals
-                # - taker amount (shares) up to 5 decimals
-                from decimal import Decimal, ROUND_DOWN
-
-                notional_cap = Decimal(str(round(max_notional, 2)))  # e.g. 1.05
-                notional_min = Decimal(str(round(min_notional, 2)))  # e.g. 1.00
-                p = Decimal(str(price))
-                if p <= 0:
-                    continue
-
-                # Choose an *integer* number of tokens so that (price * size) lands on 2-decimal USDC exactly.
-                # Use CEILING to satisfy min $1 order requirement.
-                size_d = (notional_min / p).to_integral_value(rounding=__import__('decimal').ROUND_CEILING)
-                if size_d <= 0:
-                    continue
-
-                notional_d = (p * size_d).quantize(Decimal("0.01"), rounding=ROUND_DOWN)
-                if notional_d > notional_cap:
-                    continue
-
-                size = float(size_d)
-                notional = float(notional_d)
-                if todays_notional + notional > daily_cap:
-                    continue
-
-                client_order_id = f"live-{uuid.uuid4().hex[:10]}"
-                evidence = {
-                    "signals_last_30m": signals_last_30m,
-                    "best_bid": best_bid,
-                    "best_ask": best_ask,
-                    "mid": mid,
-                    "spread": spread,
-                    "question": question,
-                    "strategy": "v1_signals_and_tight_spread",
-                }
-
-                with conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        INSERT INTO orders(client_order_id, condition_id, token_id, side, price, size, status, raw_request_json)
-                        VALUES (%s,%s,%s,'buy',%s,%s,'created',%s::jsonb)
-                        """,
-                        (client_order_id, str(allow_market_id), str(token_id), float(price), float(size), json.dumps(evidence)),
+                        signals_last_30m,
+                        todays_notional,
+                        enable_live,
                     )
 
-                    try:
-                        from py_clob_client.clob_types import OrderArgs  # type: ignore
-
-                        order_args = OrderArgs(token_id=str(token_id), price=float(price), size=float(size), side="BUY")
-                        order = infra.clob.create_order(order_args)
-                        resp = infra.clob.post_order(order, orderType="FOK", post_only=False)
-
-                        order_id = None
-                        if isinstance(resp, dict):
-                            order_id = resp.get("orderID") or resp.get("orderId") or resp.get("id")
-
-                        cur.execute(
-                            "UPDATE orders SET status='submitted', order_id=%s, raw_response_json=%s::jsonb, updated_at=now() WHERE client_order_id=%s",
-                            (str(order_id) if order_id else None, json.dumps(resp), client_order_id),
-                        )
-                        last_trade_ts = time.time()
-                    except Exception as e:
-                        err_s = str(e)
+                # Simple entry gate (v1)
+                if enable_live and best_ask is not None and signals_last_30m >= min_signals_last_30m:
+                    spread = None
+                    if best_bid is not None:
+                        spread = best_ask - best_bid
+
+                    # Prevent ultra-frequent orders
+                    if time.time() - last_trade_ts < 60:
+                        continue
+
+                    # Stop spamming if we keep hitting balance/allowance issues.
+                    # (We record errors in DB; no need to hammer the API.)
+
+                    # Tight spread gate
+                    if spread is not None and spread > 0.05:
+                        continue
+
+                    price = min(best_ask, max_price)
+                    if price <= 0:
+                        continue
+                    # Avoid float artifacts (0.029999999) that can break amount precision checks.
+                    price = float(f"{price:.3f}")
+
+                    # Polymarket enforces amount precision:
+                    # - maker amount (USDC) up to 2 decimals
+                    # - taker amount (shares) up to 5 decimals
+                    from decimal import Decimal, ROUND_DOWN
+
+                    notional_cap = Decimal(str(round(max_notional, 2)))  # e.g. 1.05
+                    notional_min = Decimal(str(round(min_notional, 2)))  # e.g. 1.00
+                    p = Decimal(str(price))
+                    if p <= 0:
+                        continue
+
+                    # Choose an *integer* number of tokens so that (price * size) lands on 2-decimal USDC exactly.
+                    # Use CEILING to satisfy min $1 order requirement.
+                    size_d = (notional_min / p).to_integral_value(rounding=__import__('decimal').ROUND_CEILING)
+                    if size_d <= 0:
+                        continue
+
+                    notional_d = (p * size_d).quantize(Decimal("0.01"), rounding=ROUND_DOWN)
+                    if notional_d > notional_cap:
+                        continue
+
+                    size = float(size_d)
+                    notional = float(notional_d)
+                    if not ledger.can_spend(notional, daily_cap):
+                        continue
+
+                    client_order_id = f"live-{uuid.uuid4().hex[:10]}"
+                    evidence = {
+                        "signals_last_30m": signals_last_30m,
+                        "best_bid": best_bid,
+                        "best_ask": best_ask,
+                        "mid": mid,
+                        "spread": spread,
+                        "question": question,
+                        "strategy": "v1_signals_and_tight_spread",
+                    }
+
+                    with conn.cursor() as cur:
                         cur.execute(
-                            "UPDATE orders SET status='error', error=%s, updated_at=now() WHERE client_order_id=%s",
-                            (err_s, client_order_id),
+                            """
+                            INSERT INTO orders(client_order_id, condition_id, token_id, side, price, size, status, raw_request_json)
+                            VALUES (%s,%s,%s,'buy',%s,%s,'created',%s::jsonb)
+                            """,
+                            (client_order_id, str(allow_market_id), str(token_id), float(price), float(size), json.dumps(evidence)),
                         )
-                        # Backoff hard on balance/allowance errors
-                        if "balance" in err_s.lower() or "allowance" in err_s.lower():
-                            last_trade_ts = time.time() + 60 * 30  # 30 min backoff
-                    conn.commit()
+
+                        try:
+                            from py_clob_client.clob_types import OrderArgs  # type: ignore
+
+                            order_args = OrderArgs(token_id=str(token_id), price=float(price), size=float(size), side="BUY")
+                            order = infra.clob.create_order(order_args)
+                            resp = infra.clob.post_order(order, orderType="FOK", post_only=False)
+
+                            order_id = None
+                            if isinstance(resp, dict):
+                                order_id = resp.get("orderID") or resp.get("orderId") or resp.get("id")
+
+                            cur.execute(
+                                "UPDATE orders SET status='submitted', order_id=%s, raw_response_json=%s::jsonb, updated_at=now() WHERE client_order_id=%s",
+                                (str(order_id) if order_id else None, json.dumps(resp), client_order_id),
+                            )
+                            ledger.record_order(str(allow_market_id), notional)
+                            last_trade_ts = time.time()
+                        except Exception as e:
+                            err_s = str(e)
+                            cur.execute(
+                                "UPDATE orders SET status='error', error=%s, updated_at=now() WHERE client_order_id=%s",
+                                (err_s, client_order_id),
+                            )
+                            # Backoff hard on balance/allowance errors
+                            if "balance" in err_s.lower() or "allowance" in err_s.lower():
+                                last_trade_ts = time.time() + 60 * 30  # 30 min backoff
+                        conn.commit()
 
         except Exception as e:
             logger.warning("loop error: %s", e)
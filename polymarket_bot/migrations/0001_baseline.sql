@@ -1,5 +1,7 @@
 -- Postgres schema for Polymarket bot (orders / fills / positions)
--- v0: keep it simple; evolve as requirements become clear.
+-- Baseline migration: the schema init_db used to re-apply at every start.
+-- Idempotent, so it also brings a database created before migrations up to date.
+-- Later changes go in new NNNN_<name>.sql files; never edit an applied one.
 
 -- bot_run: one row per loop invocation
 CREATE TABLE IF NOT EXISTS bot_run (
@@ -14,10 +14,12 @@ import os
 import uuid
 
 from db_pg import connect, finish_run, init_db, start_run
+from exposure import ExposureLedger, load_polymarket_exposure
 from gamma import TokenPair, discover_markets, extract_yes_no_token_ids, fetch_events
 from infra import Infra, load_config_from_env
 from content_ingest import ingest_default_feeds
 from signal import score_text
+from storage import maintain_from_env as maintain_storage
 from tagger import extract_tags
 
 
@@ -60,6 +62,8 @@ logger = logging.getLogger("run_bot_once")
 def main() -> None:
     conn = connect()
     init_db(conn)
+    # Keeps paper_pnl_point partitions ahead of the cron writes (cheap when nothing is due).
+    maintain_storage(conn)
 
     run = start_run(conn)
     try:
@@ -328,23 +332,12 @@ def main() -> None:
             live_orders_submitted = 0
             live_orders_blocked = 0
 
-            # Pre-compute today's notional spent (safety cap)
-            todays_notional = 0.0
+            # Today's notional spent (safety cap): loaded once, then updated in memory per order
+            ledger = ExposureLedger(load_polymarket_exposure)
             try:
-                with conn.cursor() as cur2:
-                    cur2.execute(
-                        """
-                        SELECT COALESCE(SUM(price*size),0)::float8
-                        FROM orders
-                        WHERE status='submitted'
-                          AND side='buy'
-                          AND created_at >= date_trunc('day', now())
-                          AND created_at <  date_trunc('day', now()) + interval '1 day'
-                        """
-                    )
-                    todays_notional = float(cur2.fetchone()[0] or 0.0)
-            except Exception:
-                todays_notional = 0.0
+                ledger.reconcile(conn)
+            except Exception as e:
+                logger.warning("exposure load failed: %s", e)
 
             for plan in plans:
                 client_order_id = f"plan-{run.run_id}-{uuid.uuid4().hex[:8]}"
@@ -442,7 +435,7 @@ def main() -> None:
                     try:
                         # Safety cap
                         notional = float(plan["limit_price"]) * float(plan["size"])
-                        if todays_notional + notional > DAILY_NOTIONAL_CAP_USD:
+                        if not ledger.can_spend(notional, DAILY_NOTIONAL_CAP_USD):
                             live_orders_blocked += 1
                         else:
                             from py_clob_client.clob_types import OrderArgs  # type: ignore
@@ -468,7 +461,7 @@ def main() -> None:
                                 (str(order_id) if order_id else None, __import__("json").dumps(resp), client_order_id),
                             )
                             live_orders_submitted += 1
-                            todays_notional += notional
+                            ledger.record_order(str(plan["market_id"]), notional)
                     except Exception as e:
                         live_orders_blocked += 1
                         cur.execute(
@@ -16,7 +16,7 @@ import logging
 import os
 import time
 
-from db_pg import connect, init_db
+from db_pg import init_db, open_pool
 from content_ingest import ingest_default_feeds
 
 logging.basicConfig(level=logging.INFO)
@@ -30,22 +30,20 @@ def main() -> None:
     if not os.getenv("DATABASE_URL"):
         raise RuntimeError("DATABASE_URL is not set (required for crawler)")
 
-    conn = connect()
-    init_db(conn)
+    pool = open_pool(max_size=1)
+    with pool.connection() as conn:
+        init_db(conn)
 
     logger.info("crawler loop started (interval=%ss)", interval_s)
 
     while True:
         try:
-            inserted, flagged = ingest_default_feeds(conn)
-            conn.commit()
+            # Commits on success, rolls back on error; a connection lost to a DB restart is replaced.
+            with pool.connection() as conn:
+                inserted, flagged = ingest_default_feeds(conn)
             logger.info("ingest ok: inserted=%s flagged=%s", inserted, flagged)
         except Exception as e:
             logger.exception("ingest error: %s", e)
-            try:
-                conn.rollback()
-            except Exception:
-                pass
 
         time.sleep(interval_s)
 
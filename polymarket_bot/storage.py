@@ -0,0 +1,100 @@
+"""Time-partitioned tick tables of this bot (maintenance: botcommon.storage).
+
+market_price_point (daily) and paper_pnl_point (weekly) are range-partitioned
+on snapshot_at (migration 0002), and roll up into the *_hourly
+tables. maintain_from_env() keeps STORAGE_PARTITIONS_AHEAD periods of
+partitions ahead and, with STORAGE_RETAIN_DAYS > 0, rolls up and drops
+older raw data.
+
+CLI: python storage.py     # run maintenance once and print what changed
+"""
+
+from __future__ import annotations
+
+import logging
+
+import _botcommon  # puts the repository root on sys.path
+from botcommon import storage as _storage
+from botcommon.storage import Partition, TickTable, partitions, parse_bound, period_start, plan_partitions
+
+STORAGE_LOCK_KEY = 0x706D7374  # "pmst"
+
+TABLES = (
+    TickTable(
+        "market_price_point",
+        "snapshot_at",
+        "day",
+        rollup_sql="""
+        INSERT INTO market_price_hourly AS h(
+          market_id, token_id, bucket, open_mid, high_mid, low_mid, last_mid, avg_spread, n, first_at, last_at)
+        SELECT market_id, token_id, date_trunc('hour', snapshot_at),
+               (array_agg(mid ORDER BY snapshot_at))[1], max(mid), min(mid),
+               (array_agg(mid ORDER BY snapshot_at DESC))[1],
+               avg(best_ask - best_bid), count(*), min(snapshot_at), max(snapshot_at)
+        FROM {source} WHERE {where}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (market_id, token_id, bucket) DO UPDATE SET
+          open_mid = CASE WHEN EXCLUDED.first_at < h.first_at THEN EXCLUDED.open_mid ELSE h.open_mid END,
+          high_mid = GREATEST(h.high_mid, EXCLUDED.high_mid),
+          low_mid = LEAST(h.low_mid, EXCLUDED.low_mid),
+          last_mid = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_mid ELSE EXCLUDED.last_mid END,
+          avg_spread = COALESCE((h.avg_spread * h.n + EXCLUDED.avg_spread * EXCLUDED.n) / (h.n + EXCLUDED.n), h.avg_spread, EXCLUDED.avg_spread),
+          n = h.n + EXCLUDED.n,
+          first_at = LEAST(h.first_at, EXCLUDED.first_at),
+          last_at = GREATEST(h.last_at, EXCLUDED.last_at)
+        """,
+    ),
+    TickTable(
+        "paper_pnl_point",
+        "snapshot_at",
+        "week",
+        rollup_sql="""
+        INSERT INTO paper_pnl_hourly AS h(
+          market_id, token_id, bucket, last_mid, last_position_size, last_unrealized_pnl,
+          min_unrealized_pnl, max_unrealized_pnl, n, first_at, last_at)
+        SELECT COALESCE(market_id, ''), token_id, date_trunc('hour', snapshot_at),
+               (array_agg(mid ORDER BY snapshot_at DESC))[1],
+               (array_agg(position_size ORDER BY snapshot_at DESC))[1],
+               (array_agg(unrealized_pnl ORDER BY snapshot_at DESC))[1],
+               min(unrealized_pnl), max(unrealized_pnl), count(*), min(snapshot_at), max(snapshot_at)
+        FROM {source} WHERE {where}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (market_id, token_id, bucket) DO UPDATE SET
+          last_mid = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_mid ELSE EXCLUDED.last_mid END,
+          last_position_size = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_position_size ELSE EXCLUDED.last_position_size END,
+          last_unrealized_pnl = CASE WHEN EXCLUDED.last_at < h.last_at THEN h.last_unrealized_pnl ELSE EXCLUDED.last_unrealized_pnl END,
+          min_unrealized_pnl = LEAST(h.min_unrealized_pnl, EXCLUDED.min_unrealized_pnl),
+          max_unrealized_pnl = GREATEST(h.max_unrealized_pnl, EXCLUDED.max_unrealized_pnl),
+          n = h.n + EXCLUDED.n,
+          first_at = LEAST(h.first_at, EXCLUDED.first_at),
+          last_at = GREATEST(h.last_at, EXCLUDED.last_at)
+        """,
+    ),
+)
+
+
+def maintain(conn, tables: tuple[TickTable, ...] = TABLES, **kwargs) -> dict[str, dict[str, list[str]]]:
+    return _storage.maintain(conn, tables, lock_key=STORAGE_LOCK_KEY, **kwargs)
+
+
+def maintain_from_env(conn) -> dict[str, dict[str, list[str]]]:
+    return _storage.maintain_from_env(conn, TABLES, lock_key=STORAGE_LOCK_KEY)
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from db_pg import connect
+
+    load_dotenv(override=False)
+    logging.basicConfig(level=logging.INFO)
+    conn = connect()
+    try:
+        for table, changes in maintain_from_env(conn).items():
+            print(f"{table}: created={changes['created']} dropped={changes['dropped']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import pytest
+
+from db_pg import record_tick
+
+
+class _Cur:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def execute(self, sql, params=None, *, prepare=None):
+        self.conn.log.append(("execute", " ".join(sql.split())[:30], params, prepare, self.conn.autocommit, self.conn.in_pipeline))
+
+    def fetchone(self):
+        # Results are only available once the pipeline has synced.
+        assert not self.conn.in_pipeline
+        return (3,)
+
+
+class _Pipeline:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.in_pipeline = True
+        self.conn.log.append(("pipeline",))
+        return self
+
+    def __exit__(self, *a):
+        self.conn.in_pipeline = False
+        self.conn.log.append(("sync",))
+        return False
+
+
+class _Conn:
+    def __init__(self, fail=False):
+        self.autocommit, self.in_pipeline, self.log, self.fail = False, False, [], fail
+
+    def cursor(self):
+        if self.fail:
+            raise RuntimeError("connection lost")
+        return _Cur(self)
+
+    def pipeline(self):
+        return _Pipeline(self)
+
+
+def test_record_tick_pipelines_both_statements_prepared_in_autocommit():
+    conn = _Conn()
+    assert record_tick(conn, "m1", "t1", 0.4, 0.6, 0.5, "{}") == 3
+    assert [e[0] for e in conn.log] == ["pipeline", "execute", "execute", "sync"]
+    insert, count = conn.log[1], conn.log[2]
+    assert insert[1].startswith("INSERT INTO market_price_point") and insert[2] == ("m1", "t1", 0.4, 0.6, 0.5, "{}")
+    assert count[1].startswith("SELECT COUNT(*)::int")
+    assert all(e[3] is True and e[4] is True and e[5] is True for e in (insert, count))
+    assert conn.autocommit is False  # restored for the rest of the tick
+
+
+def test_record_tick_restores_autocommit_on_error():
+    conn = _Conn(fail=True)
+    with pytest.raises(RuntimeError):
+        record_tick(conn, "m1", "t1", 0.4, 0.6, 0.5, "{}")
+    assert conn.autocommit is False